@@ -0,0 +1,146 @@
+import io
+import random
+import zipfile
+from typing import List
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "the a an and are is in of to which what who where how much many has have "
+    "cerrado dry rainy season seasons brazil brazilian rainforests rainforest "
+    "countries peru colombia amazon elephants elephant strong skilled animals "
+    "spaniel man bookseller temperature average degrees rainwater medicines"
+).split()
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+DOCX_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    "</Relationships>"
+)
+WORD_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def synthetic_paragraphs(count: int, seed: int = 0, words: int = 60) -> List[str]:
+    """
+    Generate reproducible paragraphs of vocabulary words.
+
+    Args:
+        count (int): Number of paragraphs.
+        seed (int): Seed of the generator.
+        words (int): Number of words per paragraph.
+
+    Returns:
+        List[str]: Paragraphs.
+    """
+    generator = random.Random(seed)
+    return [
+        " ".join(generator.choice(WORDS) for _ in range(words)) + "."
+        for _ in range(count)
+    ]
+
+
+def build_docx(paragraphs: List[str]) -> bytes:
+    """
+    Build a minimal DOCX file, as exported by Google Docs, with one paragraph
+    per entry.
+
+    Args:
+        paragraphs (List[str]): Text of each paragraph.
+
+    Returns:
+        bytes: Content of the DOCX file.
+    """
+    body = "".join(
+        f"<w:p><w:r><w:t>{escape(paragraph)}</w:t></w:r></w:p>"
+        for paragraph in paragraphs
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{WORD_NAMESPACE}"><w:body>{body}</w:body>'
+        "</w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        docx.writestr("_rels/.rels", DOCX_RELATIONSHIPS)
+        docx.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """
+    Build a PDF file with one page per entry, each line set in Helvetica.
+
+    Args:
+        pages (List[List[str]]): Lines of text of each page.
+
+    Returns:
+        bytes: Content of the PDF file.
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        text = " T* ".join(
+            "("
+            + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            + ") Tj"
+            for line in lines
+        )
+        stream = f"BT /F1 9 Tf 11 TL 36 756 Td {text} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, pdf_object in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n{pdf_object}\nendobj\n".encode("latin-1")
+    xref_offset = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        content += f"{offset:010d} 00000 n \n".encode("latin-1")
+    content += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode("latin-1")
+    return content
+
+
+def build_synthetic_pdf(pages: int, seed: int = 0) -> bytes:
+    """
+    Build a PDF of `pages` pages of 60 short lines of vocabulary words.
+    """
+    generator = random.Random(seed)
+    return build_pdf(
+        [
+            [" ".join(generator.choice(WORDS) for _ in range(12)) for _ in range(60)]
+            for _ in range(pages)
+        ]
+    )
+
+
+def build_synthetic_docx(pages: int, seed: int = 0) -> bytes:
+    """
+    Build a DOCX holding about as much text as a PDF of `pages` pages.
+    """
+    return build_docx(synthetic_paragraphs(pages * 12, seed))
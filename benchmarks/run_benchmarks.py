@@ -0,0 +1,269 @@
+"""
+Offline benchmarks of the ingest and query hot paths.
+
+Documents from `examples/` and synthetic DOCX/PDF files are served by a fake
+Drive service, and queries are answered by a tiny randomly initialized QA
+model, so the numbers measure this code rather than the network or BERT-large.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--documents=10] [--pages=10]
+        [--baseline=benchmarks/baseline.json] [--update_baseline=true]
+        [--tolerance=0.2] [--fail_on_regression=true]
+"""
+
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "tests"), BENCHMARKS_DIR]
+
+from corpora import build_synthetic_docx, build_synthetic_pdf  # noqa: E402
+from fake_drive import DOC_MIME_TYPE, PDF_MIME_TYPE, FakeDriveService  # noqa: E402
+from tiny_qa_model import build_tiny_qa_model  # noqa: E402
+
+from hudson_utils.args import get_from_args  # noqa: E402
+from hudson_utils.google_drive import GoogleDriveService  # noqa: E402
+from hudson_utils.text_extraction import extract_passages_from_file  # noqa: E402
+from hudson_utils.text_processing import TextProcessor  # noqa: E402
+
+DEFAULT_BASELINE_FILE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+DEFAULT_DOCUMENTS = 10
+DEFAULT_PAGES = 10
+DEFAULT_TOLERANCE = 0.2
+FOLDER_NAME = "hudson_dias"
+
+EXAMPLE_FILES = {
+    "cerrado.docx": DOC_MIME_TYPE,
+    "rain-forest.docx": DOC_MIME_TYPE,
+    "Elephant.pdf": PDF_MIME_TYPE,
+}
+
+QUERIES = [
+    "What are the two dominant seasons in the Brazilian Cerrado?",
+    "Which countries can rainforests be found in?",
+    "What is the average temperature in the Cerrado?",
+    "How much rainwater is stored in the Amazon rainforest?",
+    "Which percentage of medicines are derived from the Amazon rainforest?",
+    "Who records the strength and skills of elephants?",
+    "What comparison is made between man and the spaniel?",
+    "What does the elephant suggest the bookseller is?",
+]
+
+# Whether a larger value of each metric is an improvement.
+HIGHER_IS_BETTER = {
+    "extraction_docx_mb_per_s": True,
+    "extraction_pdf_mb_per_s": True,
+    "listing_seconds": False,
+    "ingest_seconds": False,
+    "drive_calls_per_document": False,
+    "query_p50_ms": False,
+    "query_p95_ms": False,
+    "peak_rss_mb": False,
+}
+# Absolute change below which a metric is never flagged, for metrics so small
+# that scheduling noise alone exceeds the relative tolerance.
+NOISE_FLOOR = {
+    "listing_seconds": 0.01,
+}
+
+
+def build_corpus(documents: int, pages: int) -> List[Tuple[str, str, bytes]]:
+    corpus = []
+    for name, mime_type in EXAMPLE_FILES.items():
+        with open(os.path.join(REPO_DIR, "examples", name), "rb") as example:
+            corpus.append((name, mime_type, example.read()))
+    for seed in range(documents):
+        if seed % 2:
+            content = build_synthetic_pdf(pages, seed)
+            corpus.append((f"synthetic-{seed}.pdf", PDF_MIME_TYPE, content))
+        else:
+            content = build_synthetic_docx(pages, seed)
+            corpus.append((f"synthetic-{seed}.docx", DOC_MIME_TYPE, content))
+    return corpus
+
+
+def benchmark_extraction(
+    corpus: List[Tuple[str, str, bytes]], work_dir: str
+) -> Dict[str, float]:
+    processed = {DOC_MIME_TYPE: [0, 0.0], PDF_MIME_TYPE: [0, 0.0]}
+    for name, mime_type, content in corpus:
+        path = os.path.join(work_dir, name)
+        with open(path, "wb") as document_file:
+            document_file.write(content)
+        started = time.perf_counter()
+        extract_passages_from_file(path, mime_type)
+        processed[mime_type][0] += len(content)
+        processed[mime_type][1] += time.perf_counter() - started
+
+    def throughput(mime_type: str) -> float:
+        size, seconds = processed[mime_type]
+        return size / (1024 * 1024) / seconds if seconds else 0.0
+
+    return {
+        "extraction_docx_mb_per_s": throughput(DOC_MIME_TYPE),
+        "extraction_pdf_mb_per_s": throughput(PDF_MIME_TYPE),
+    }
+
+
+def benchmark_ingest_and_queries(
+    corpus: List[Tuple[str, str, bytes]], work_dir: str
+) -> Dict[str, float]:
+    fake_drive = FakeDriveService(page_size=100)
+    folder_id = fake_drive.add_folder(FOLDER_NAME)
+    for name, mime_type, content in corpus:
+        fake_drive.add_file(name, mime_type, parent_id=folder_id, content=content)
+    with patch(
+        "hudson_utils.drive_clients.build_drive_client", return_value=fake_drive
+    ):
+        google_drive_service = GoogleDriveService(credentials=None)
+
+    model_dir = build_tiny_qa_model(os.path.join(work_dir, "tiny-qa-model"))
+    text_processor = TextProcessor(
+        drive_service=fake_drive,
+        threshold=0.0,
+        model=model_dir,
+        extraction_workers=1,
+    )
+    # The model is loaded up front so it is not counted as ingest time.
+    text_processor.reader
+
+    started = time.perf_counter()
+    documents = google_drive_service.get_documents_from_drive(FOLDER_NAME)
+    listing_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    text_processor.update_corpus(documents)
+    ingest_seconds = time.perf_counter() - started
+    drive_calls = len(fake_drive.calls) + len(fake_drive.media_requests)
+
+    latencies = []
+    for _ in range(3):
+        for query in QUERIES:
+            started = time.perf_counter()
+            text_processor.answer_queries([query])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "listing_seconds": listing_seconds,
+        "ingest_seconds": ingest_seconds,
+        "drive_calls_per_document": drive_calls / max(1, len(documents)),
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak / unit
+
+
+def run_benchmarks(documents: int, pages: int) -> Dict[str, float]:
+    """
+    Run every benchmark.
+
+    Args:
+        documents (int): Number of synthetic documents added to the examples.
+        pages (int): Number of pages of each synthetic document.
+
+    Returns:
+        Dict[str, float]: Value of each metric.
+    """
+    corpus = build_corpus(documents, pages)
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = benchmark_extraction(corpus, work_dir)
+        results.update(benchmark_ingest_and_queries(corpus, work_dir))
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """
+    Print the results next to the baseline.
+
+    Args:
+        results (Dict[str, float]): Value of each metric.
+        baseline (Dict[str, float]): Baseline value of each metric.
+        tolerance (float): Relative change beyond which a metric regressed,
+            unless the absolute change is within the metric's `NOISE_FLOOR`.
+
+    Returns:
+        List[str]: Names of the metrics that regressed.
+    """
+    regressions = []
+    print(f"{'metric':<28}{'value':>12}{'baseline':>12}{'change':>10}")
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            print(f"{name:<28}{value:>12.3f}{'-':>12}{'-':>10}")
+            continue
+
+        change = (value - reference) / reference
+        worse = -change if HIGHER_IS_BETTER[name] else change
+        flag = ""
+        if worse > tolerance and abs(value - reference) > NOISE_FLOOR.get(name, 0):
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28}{value:>12.3f}{reference:>12.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    documents = int(
+        get_from_args(
+            args=sys.argv, arg_name="documents", default_value=DEFAULT_DOCUMENTS
+        )
+    )
+    pages = int(
+        get_from_args(args=sys.argv, arg_name="pages", default_value=DEFAULT_PAGES)
+    )
+    baseline_file = get_from_args(
+        args=sys.argv, arg_name="baseline", default_value=DEFAULT_BASELINE_FILE
+    )
+    update_baseline = (
+        get_from_args(
+            args=sys.argv, arg_name="update_baseline", default_value="false"
+        ).lower()
+        == "true"
+    )
+    tolerance = float(
+        get_from_args(
+            args=sys.argv, arg_name="tolerance", default_value=DEFAULT_TOLERANCE
+        )
+    )
+    fail_on_regression = (
+        get_from_args(
+            args=sys.argv, arg_name="fail_on_regression", default_value="false"
+        ).lower()
+        == "true"
+    )
+
+    results = run_benchmarks(documents, pages)
+
+    baseline = {}
+    if os.path.exists(baseline_file):
+        with open(baseline_file, "r", encoding="utf-8") as baseline_json:
+            baseline = json.load(baseline_json)
+    regressions = compare(results, baseline, tolerance)
+
+    if update_baseline:
+        with open(baseline_file, "w", encoding="utf-8") as baseline_json:
+            json.dump(results, baseline_json, indent=2)
+            baseline_json.write("\n")
+        print(f"Baseline written to {baseline_file}.")
+    if regressions and fail_on_regression:
+        sys.exit(1)
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from hudson_utils.document_cache import REVISION_FIELDS
+
+DEFAULT_ANSWER_CACHE_SIZE = 1024
+DEFAULT_ANSWER_CACHE_TTL = 24 * 60 * 60
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different phrasings share a cache entry.
+
+    Args:
+        query (str): Natural language query.
+
+    Returns:
+        str: Lowercase query with collapsed whitespace and no trailing
+            punctuation.
+    """
+    return " ".join(query.lower().split()).rstrip(" ?!.")
+
+
+def corpus_fingerprint(
+    documents: Iterable[Dict[str, str]], settings: Iterable[object] = ()
+) -> str:
+    """
+    Fingerprint a corpus from the revisions of its documents.
+
+    Args:
+        documents (Iterable[Dict[str, str]]): Drive metadata of the documents.
+        settings (Iterable[object]): Settings that change the answers, such as
+            the model or the number of retrieved passages.
+
+    Returns:
+        str: Hex digest that changes whenever a document is added, removed or
+            modified, or a setting changes.
+    """
+    revisions = sorted(
+        ":".join(
+            [str(document["id"])]
+            + [str(document.get(field, "")) for field in REVISION_FIELDS]
+        )
+        for document in documents
+    )
+    digest = hashlib.sha256(json.dumps([str(s) for s in settings]).encode("utf-8"))
+    for revision in revisions:
+        digest.update(b"\0" + revision.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_ANSWER_CACHE_SIZE,
+        ttl_seconds: float = DEFAULT_ANSWER_CACHE_TTL,
+        db_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Memoize query results per corpus version.
+
+        Entries are keyed by the normalized query and the corpus fingerprint, so
+        any change to the documents makes older answers unreachable; `retain`
+        also drops them. Recent entries are kept in an in-memory LRU, and all
+        of them in an optional SQLite database so they survive restarts.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory.
+            ttl_seconds (float): Time after which an entry expires.
+            db_path (str, optional): Path of the SQLite database backing the
+                cache, or None to keep it in memory only.
+            clock (Callable[[], float]): Function returning the current time.
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.db = None
+        if db_path:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            # Guarded by self.lock, so it can be shared with the server thread.
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (query TEXT, fingerprint TEXT, "
+                "result TEXT, expires_at REAL, PRIMARY KEY (query, fingerprint))"
+            )
+            self.db.commit()
+
+    def get(self, query: str, fingerprint: str) -> Optional[Dict]:
+        """
+        Look up the cached result of a query.
+
+        Args:
+            query (str): Natural language query.
+            fingerprint (str): Fingerprint of the corpus being queried.
+
+        Returns:
+            Dict or None: Cached result, with 'query' set to `query`, or None on a
+                miss.
+        """
+        key = (normalize_query(query), fingerprint)
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                entry = self.load(key)
+                if entry is not None:
+                    self.remember(key, entry)
+            if entry is None:
+                return None
+
+            expires_at, result = entry
+            if expires_at <= now:
+                self.entries.pop(key, None)
+                if self.db is not None:
+                    self.db.execute(
+                        "DELETE FROM answers WHERE query = ? AND fingerprint = ?", key
+                    )
+                    self.db.commit()
+                return None
+
+            self.entries.move_to_end(key)
+            return dict(result, query=query)
+
+    def put(self, query: str, fingerprint: str, result: Dict):
+        """
+        Cache the result of a query.
+
+        Args:
+            query (str): Natural language query.
+            fingerprint (str): Fingerprint of the corpus the query was answered
+                against.
+            result (Dict): JSON serializable result.
+        """
+        key = (normalize_query(query), fingerprint)
+        entry = (self.clock() + self.ttl_seconds, result)
+        with self.lock:
+            self.remember(key, entry)
+            if self.db is not None:
+                try:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                        (*key, json.dumps(result), entry[0]),
+                    )
+                    self.db.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    logging.warning(f"Could not persist cached answer: {str(e)}")
+
+    def retain(self, fingerprint: str):
+        """
+        Drop every entry of a corpus version other than `fingerprint`.
+
+        Args:
+            fingerprint (str): Fingerprint of the current corpus.
+        """
+        with self.lock:
+            for key in [key for key in self.entries if key[1] != fingerprint]:
+                del self.entries[key]
+            if self.db is not None:
+                self.db.execute(
+                    "DELETE FROM answers WHERE fingerprint != ? OR expires_at <= ?",
+                    (fingerprint, self.clock()),
+                )
+                self.db.commit()
+
+    def invalidate(self):
+        """
+        Drop every entry.
+        """
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM answers")
+                self.db.commit()
+
+    def remember(self, key: Tuple[str, str], entry: Tuple[float, Dict]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def load(self, key: Tuple[str, str]) -> Optional[Tuple[float, Dict]]:
+        row = self.db.execute(
+            "SELECT expires_at, result FROM answers "
+            "WHERE query = ? AND fingerprint = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
@@ -18,6 +18,6 @@ def get_from_args(args: List[str], arg_name: str, default_value: str) -> str:
     """
     for arg in args:
         if arg.startswith(f"--{arg_name}="):
-            return arg.split("=")[1]
+            return arg.split("=", 1)[1]
 
     return default_value
@@ -5,6 +5,8 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+from hudson_utils.instrumentation import metrics
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
@@ -75,7 +77,9 @@ class GoogleDriveAuthenticator:
             google.oauth2.credentials.Credentials: Refreshed credentials.
         """
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+            metrics.increment("auth.token_refreshes")
+            with metrics.span("auth.refresh"):
+                creds.refresh(Request())
         return creds
 
     @staticmethod
@@ -92,7 +96,8 @@ class GoogleDriveAuthenticator:
             google.oauth2.credentials.Credentials: Newly created user credentials.
         """
         flow = InstalledAppFlow.from_client_secrets_file(app_credentials_file, SCOPES)
-        return flow.run_local_server(port=0)
+        with metrics.span("auth.oauth_flow"):
+            return flow.run_local_server(port=0)
 
     @staticmethod
     def save_credentials_to_file(
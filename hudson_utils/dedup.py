@@ -0,0 +1,144 @@
+import hashlib
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from hudson_utils.retrieval import tokenize
+
+DEFAULT_DEDUP_THRESHOLD = 0.8
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_NUM_PERMUTATIONS = 128
+DEFAULT_LSH_BANDS = 16
+MINHASH_SEED = 1
+
+
+class PassageDeduplicator:
+    def __init__(
+        self,
+        threshold: float = DEFAULT_DEDUP_THRESHOLD,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+        bands: int = DEFAULT_LSH_BANDS,
+    ):
+        """
+        Group passages that are exact or near duplicates of each other.
+
+        Exact duplicates, up to case, punctuation and whitespace, are found by
+        hashing the tokens of each passage. Near duplicates are found with
+        MinHash signatures of word shingles: passages sharing a band of their
+        signature are candidates, kept when the share of equal signature values,
+        an estimate of the Jaccard similarity of their shingles, reaches
+        `threshold`.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of near
+                duplicates.
+            shingle_size (int): Number of words per shingle.
+            num_permutations (int): Number of values of a MinHash signature.
+            bands (int): Number of LSH bands the signature is split into; more
+                bands find less similar candidates.
+        """
+        if num_permutations % bands:
+            raise ValueError("num_permutations must be a multiple of bands.")
+        self.threshold = threshold
+        self.shingle_size = max(1, shingle_size)
+        self.bands = bands
+        self.rows = num_permutations // bands
+        # Multiply-shift hash functions, with a fixed seed so the same corpus
+        # always collapses the same way.
+        random = np.random.RandomState(MINHASH_SEED)
+        self.a = random.randint(0, 2**63, num_permutations, dtype=np.uint64) * 2 + 1
+        self.b = random.randint(0, 2**63, num_permutations, dtype=np.uint64)
+        # Signatures of the passages of the last call, as most of them are
+        # grouped again when the corpus is updated.
+        self.signatures: Dict[bytes, np.ndarray] = {}
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        """
+        Compute the MinHash signature of the word shingles of a passage.
+
+        Args:
+            tokens (List[str]): Tokens of the passage, at least one.
+
+        Returns:
+            np.ndarray: One minimum hash per permutation.
+        """
+        size = min(self.shingle_size, len(tokens))
+        shingles = {
+            " ".join(words) for words in zip(*(tokens[i:] for i in range(size)))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # Products wrap around 2**64; the high 32 bits are the hash.
+        permuted = (np.outer(hashes, self.a) + self.b) >> np.uint64(32)
+        return permuted.min(axis=0)
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        keys = []
+        for band in range(self.bands):
+            start = band * self.rows
+            end = start + self.rows
+            keys.append((band, signature[start:end].tobytes()))
+        return keys
+
+    def group(self, passages: List[str]) -> List[List[int]]:
+        """
+        Group duplicate passages.
+
+        Args:
+            passages (List[str]): Texts of the passages.
+
+        Returns:
+            List[List[int]]: Indexes of the passages of each group, in order;
+                groups are ordered by their first passage, which is the one to
+                keep.
+        """
+        groups: List[List[int]] = []
+        signatures: List[Optional[np.ndarray]] = []
+        exact_groups: Dict[bytes, int] = {}
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        known_signatures, self.signatures = self.signatures, {}
+
+        for passage_id, passage in enumerate(passages):
+            tokens = tokenize(passage)
+            key = hashlib.sha1(" ".join(tokens).encode("utf-8")).digest()
+            group_id = exact_groups.get(key)
+            if group_id is None:
+                signature = None
+                if tokens:
+                    signature = known_signatures.get(key)
+                    if signature is None:
+                        signature = self.signature(tokens)
+                    self.signatures[key] = signature
+                keys = self.band_keys(signature) if tokens else []
+                group_id = self.find_similar(signature, keys, buckets, signatures)
+                if group_id is None:
+                    group_id = len(groups)
+                    groups.append([])
+                    signatures.append(signature)
+                    for band_key in keys:
+                        buckets[band_key].append(group_id)
+                exact_groups[key] = group_id
+            groups[group_id].append(passage_id)
+        return groups
+
+    def find_similar(
+        self,
+        signature: Optional[np.ndarray],
+        keys: List[Tuple[int, bytes]],
+        buckets: Dict[Tuple[int, bytes], List[int]],
+        signatures: List[Optional[np.ndarray]],
+    ) -> Optional[int]:
+        candidates = set()
+        for band_key in keys:
+            candidates.update(buckets.get(band_key, ()))
+        # The earliest group wins, so grouping does not depend on hash order.
+        for group_id in sorted(candidates):
+            if np.mean(signatures[group_id] == signature) >= self.threshold:
+                return group_id
+        return None
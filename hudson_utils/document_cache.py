@@ -0,0 +1,253 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional, TextIO
+
+DEFAULT_CACHE_DIR = os.path.join("config", "cache")
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+REVISION_FIELDS = ("md5Checksum", "modifiedTime", "version")
+
+
+class DocumentTextCache:
+    INDEX_FILE = "index.json"
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_size_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    ):
+        """
+        Initialize an on-disk cache of extracted document text.
+
+        Entries are keyed by the Drive file ID plus its revision fields
+        (md5Checksum, modifiedTime and version), so a new revision of a file
+        never hits a stale entry. The least recently used entries are evicted
+        once the total size of the cached text exceeds `max_size_bytes`.
+
+        Args:
+            cache_dir (str): Directory where the cached text is stored.
+            max_size_bytes (int): Maximum total size of the cached text.
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.lock = threading.RLock()
+        self.index = self.load_index()
+        # Whether the index in memory has changes not saved yet.
+        self.dirty = False
+
+    @staticmethod
+    def cache_key(metadata: Dict[str, str]) -> str:
+        """
+        Build the cache key of a file revision.
+
+        Args:
+            metadata (Dict[str, str]): Drive file metadata with at least 'id'.
+
+        Returns:
+            str: Hex digest identifying the file revision.
+        """
+        parts = [str(metadata["id"])]
+        parts.extend(str(metadata.get(field, "")) for field in REVISION_FIELDS)
+        return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def has_revision(metadata: Dict[str, str]) -> bool:
+        """
+        Check whether the metadata carries enough information to key the cache.
+
+        Args:
+            metadata (Dict[str, str]): Drive file metadata.
+
+        Returns:
+            bool: True if at least one revision field is present.
+        """
+        return any(metadata.get(field) for field in REVISION_FIELDS)
+
+    def get(self, metadata: Dict[str, str]) -> Optional[str]:
+        """
+        Load the cached text of a file revision.
+
+        Args:
+            metadata (Dict[str, str]): Drive file metadata.
+
+        Returns:
+            str or None: Cached text, or None on a cache miss.
+        """
+        cached_file = self.open(metadata)
+        if cached_file is None:
+            return None
+        with cached_file:
+            return cached_file.read()
+
+    def open(self, metadata: Dict[str, str]) -> Optional[TextIO]:
+        """
+        Open the cached text of a file revision, to read it without holding it
+        all in memory.
+
+        The file stays readable if the entry is evicted while it is open. The
+        access time of the entry is only updated in memory, and saved by the
+        next write of the index or by `flush`.
+
+        Args:
+            metadata (Dict[str, str]): Drive file metadata.
+
+        Returns:
+            TextIO or None: Text file, closed by the caller, or None on a cache
+                miss.
+        """
+        with self.lock:
+            key = self.cache_key(metadata)
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+
+            try:
+                cached_file = open(self.entry_path(key), "r", encoding="utf-8")
+            except OSError:
+                self.index.pop(key, None)
+                self.dirty = True
+                return None
+
+            entry["last_access"] = time.time()
+            self.dirty = True
+            return cached_file
+
+    def flush(self):
+        """
+        Save the access times updated by cache hits since the index was last
+        saved.
+        """
+        with self.lock:
+            if self.dirty:
+                self.save_index()
+
+    def put(self, metadata: Dict[str, str], text: str):
+        """
+        Store the extracted text of a file revision, evicting older entries if
+        the cache grows beyond its size limit.
+
+        Args:
+            metadata (Dict[str, str]): Drive file metadata.
+            text (str): Extracted text to cache.
+        """
+        data = text.encode("utf-8")
+        if len(data) > self.max_size_bytes:
+            return
+
+        with self.lock:
+            temp_path = self.entry_path(self.cache_key(metadata)) + ".tmp"
+            with open(temp_path, "wb") as cached_file:
+                cached_file.write(data)
+            self.add_entry(metadata, temp_path, len(data))
+
+    def put_file(self, metadata: Dict[str, str], text_path: str):
+        """
+        Store extracted text already written to a file, without reading it
+        into memory. The file is moved into the cache, or left in place when it
+        is too large to be cached.
+
+        Args:
+            metadata (Dict[str, str]): Drive file metadata.
+            text_path (str): Path of a UTF-8 file holding the extracted text.
+        """
+        size = os.path.getsize(text_path)
+        if size > self.max_size_bytes:
+            return
+
+        with self.lock:
+            temp_path = self.entry_path(self.cache_key(metadata)) + ".tmp"
+            shutil.move(text_path, temp_path)
+            self.add_entry(metadata, temp_path, size)
+
+    def add_entry(self, metadata: Dict[str, str], temp_path: str, size: int):
+        key = self.cache_key(metadata)
+        # Older revisions of the same file can never be hit again.
+        for stale_key in self.keys_for_file(metadata["id"]):
+            if stale_key != key:
+                self.remove_entry(stale_key)
+
+        os.replace(temp_path, self.entry_path(key))
+        self.index[key] = {
+            "file_id": metadata["id"],
+            "size": size,
+            "last_access": time.time(),
+        }
+        self.evict()
+        self.save_index()
+
+    def invalidate(self, file_id: Optional[str] = None):
+        """
+        Drop cached entries.
+
+        Args:
+            file_id (str, optional): Only drop the entries of this file. When not
+                given, the whole cache is cleared.
+        """
+        with self.lock:
+            if file_id is None:
+                keys = list(self.index)
+            else:
+                keys = self.keys_for_file(file_id)
+            for key in keys:
+                self.remove_entry(key)
+            self.save_index()
+
+    def total_size(self) -> int:
+        """
+        Get the total size of the cached text.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return sum(entry["size"] for entry in self.index.values())
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits its limit.
+        """
+        total_size = self.total_size()
+        by_last_access = sorted(
+            self.index.items(), key=lambda item: item[1]["last_access"]
+        )
+        for key, entry in by_last_access:
+            if total_size <= self.max_size_bytes:
+                break
+            total_size -= entry["size"]
+            self.remove_entry(key)
+
+    def keys_for_file(self, file_id: str) -> list:
+        return [key for key, entry in self.index.items() if entry["file_id"] == file_id]
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def remove_entry(self, key: str):
+        self.index.pop(key, None)
+        try:
+            os.remove(self.entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def load_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable document cache index: {str(e)}")
+            return {}
+
+    def save_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(self.index, index_file)
+        os.replace(temp_path, self.index_path)
+        self.dirty = False
@@ -0,0 +1,124 @@
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hudson_utils.drive_requests import DriveRequestExecutor, is_retryable
+from hudson_utils.instrumentation import metrics
+
+MAX_BATCH_SIZE = 100
+
+
+class DriveBatchExecutor:
+    def __init__(
+        self,
+        drive_service,
+        batch_size: int = MAX_BATCH_SIZE,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep,
+        request_executor: Optional[DriveRequestExecutor] = None,
+    ):
+        """
+        Execute many Drive API calls through the batch endpoint.
+
+        Requests are grouped into batches of up to `batch_size` calls, each sent
+        as a single HTTP round trip. Items that fail with a retryable error are
+        sent again in a later batch with exponential backoff; other failures are
+        reported per item without affecting the rest of the batch. Round trips
+        go through `request_executor`, taking one token of its rate limit per
+        call they carry, and are retried as a whole when the batch endpoint
+        itself fails.
+
+        Args:
+            drive_service: Google Drive API client.
+            batch_size (int): Maximum number of calls per batch, at most 100.
+            max_retries (int): Number of times a failing item is retried.
+            backoff_seconds (float): Delay before the first retry, doubled on every
+                following one.
+            sleep (Callable[[float], None]): Function used to wait between retries.
+            request_executor (DriveRequestExecutor, optional): Executor of the
+                round trips, shared with the other Drive calls of the app.
+        """
+        self.drive_service = drive_service
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+        self.request_executor = request_executor or DriveRequestExecutor(
+            max_retries=max_retries, backoff_seconds=backoff_seconds, sleep=sleep
+        )
+
+    def execute(self, requests: Dict[str, object]) -> Tuple[Dict, Dict]:
+        """
+        Execute requests in batches.
+
+        Args:
+            requests (Dict[str, HttpRequest]): Requests keyed by a caller chosen ID.
+
+        Returns:
+            Tuple[Dict, Dict]: Responses keyed by request ID, and the exceptions of
+                the requests that still failed after every retry.
+        """
+        responses = {}
+        errors = {}
+        pending = list(requests)
+
+        for attempt in range(self.max_retries + 1):
+            failed = {}
+            for start in range(0, len(pending), self.batch_size):
+                end = start + self.batch_size
+                self.execute_batch(
+                    pending[start:end], requests, responses, failed, errors
+                )
+
+            pending = [
+                request_id
+                for request_id, exception in failed.items()
+                if is_retryable(exception) and attempt < self.max_retries
+            ]
+            for request_id, exception in failed.items():
+                if request_id not in pending:
+                    errors[request_id] = exception
+
+            if not pending:
+                break
+            delay = self.backoff_seconds * (2**attempt)
+            logging.warning(
+                f"Retrying {len(pending)} batched Drive requests in {delay:.1f}s."
+            )
+            self.sleep(delay)
+
+        return responses, errors
+
+    def execute_batch(
+        self,
+        request_ids: List[str],
+        requests: Dict[str, object],
+        responses: Dict[str, dict],
+        failed: Dict[str, Exception],
+        errors: Dict[str, Exception],
+    ):
+        def callback(request_id, response, exception):
+            if exception is not None:
+                failed[request_id] = exception
+            else:
+                # A round trip may be sent again after a partial response.
+                failed.pop(request_id, None)
+                responses[request_id] = response
+
+        batch = self.drive_service.new_batch_http_request(callback=callback)
+        for request_id in request_ids:
+            batch.add(requests[request_id], request_id=request_id)
+
+        # However many calls it carries, a batch is one round trip, but Drive
+        # counts every call of the batch against the quota.
+        metrics.increment("drive.api_calls")
+        try:
+            self.request_executor.call(batch.execute, cost=len(request_ids))
+        except Exception as e:
+            # The round trip failed after the executor's retries, so every item
+            # of the batch failed for good.
+            for request_id in request_ids:
+                if request_id not in responses:
+                    failed.pop(request_id, None)
+                    errors[request_id] = e
@@ -0,0 +1,153 @@
+import json
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from hudson_utils.instrumentation import metrics
+
+DEFAULT_HTTP_TIMEOUT = 120
+
+
+@lru_cache(maxsize=None)
+def discovery_document(service_name: str = "drive", version: str = "v3") -> Dict:
+    """
+    Load a discovery document bundled with googleapiclient, parsed once per
+    process.
+
+    Args:
+        service_name (str): Name of the API.
+        version (str): Version of the API.
+
+    Returns:
+        Dict: Parsed discovery document.
+    """
+    document = get_static_doc(service_name, version)
+    if document is None:
+        raise ValueError(f"No bundled discovery document for {service_name} {version}.")
+    return json.loads(document)
+
+
+def build_drive_client(http=None):
+    """
+    Build a Drive v3 client without fetching or parsing its discovery document
+    again.
+
+    Args:
+        http: Transport of the client, or None for application default
+            credentials.
+
+    Returns:
+        googleapiclient.discovery.Resource: Drive client.
+    """
+    return build_from_document(discovery_document(), http=http)
+
+
+class SharedCredentials:
+    def __init__(self, credentials):
+        """
+        Credentials safe to share between the transports of several threads.
+
+        Refreshes are serialized, and a thread that waited for another one to
+        refresh reuses the new token instead of refreshing again. Every other
+        attribute is read from the wrapped credentials.
+
+        Args:
+            credentials (google.auth.credentials.Credentials): Credentials to
+                share.
+        """
+        self.credentials = credentials
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.credentials, name)
+
+    def before_request(self, request, method, url, headers):
+        if not self.credentials.valid:
+            self.refresh(request, stale_token=self.credentials.token)
+        self.credentials.apply(headers)
+
+    def refresh(self, request, stale_token: Optional[str] = None):
+        # Called by AuthorizedHttp on a 401 without the token that was rejected,
+        # in which case the current token is the stale one.
+        if stale_token is None:
+            stale_token = self.credentials.token
+        with self.lock:
+            if self.credentials.token == stale_token or not self.credentials.valid:
+                metrics.increment("auth.token_refreshes")
+                with metrics.span("auth.refresh"):
+                    self.credentials.refresh(request)
+
+
+class DriveClientPool:
+    def __init__(self, credentials, timeout: int = DEFAULT_HTTP_TIMEOUT):
+        """
+        Hand each thread its own authorized transport for a shared Drive client.
+
+        httplib2 transports are not thread-safe, so they cannot be shared by
+        parallel workers: requests built from the shared client are executed
+        with the transport of the current thread, which keeps its connections
+        alive between requests. The client is built from the bundled discovery
+        document, and all transports share the same credentials, refreshed by
+        one thread at a time.
+
+        Args:
+            credentials: User credentials for Google Drive API.
+            timeout (int): Socket timeout of the transports, in seconds.
+        """
+        self.credentials = (
+            SharedCredentials(credentials) if credentials is not None else None
+        )
+        self.timeout = timeout
+        self.local = threading.local()
+        self.transports: List[AuthorizedHttp] = []
+        self.shared_client = None
+        self.lock = threading.Lock()
+
+    def new_transport(self) -> AuthorizedHttp:
+        transport = AuthorizedHttp(
+            self.credentials, http=httplib2.Http(timeout=self.timeout)
+        )
+        with self.lock:
+            self.transports.append(transport)
+        return transport
+
+    def http(self) -> Optional[AuthorizedHttp]:
+        """
+        Get the transport of the current thread.
+
+        Returns:
+            AuthorizedHttp or None: Transport, or None without credentials, in
+                which case requests use the transport of the client.
+        """
+        if self.credentials is None:
+            return None
+        if not hasattr(self.local, "http"):
+            self.local.http = self.new_transport()
+        return self.local.http
+
+    def client(self):
+        """
+        Get the Drive client shared by every thread.
+
+        Returns:
+            googleapiclient.discovery.Resource: Drive client, whose own transport
+                is only used by requests executed without `http`.
+        """
+        if self.shared_client is None:
+            http = self.new_transport() if self.credentials is not None else None
+            self.shared_client = build_drive_client(http=http)
+        return self.shared_client
+
+    def close(self):
+        """
+        Close the connections of every transport.
+        """
+        with self.lock:
+            for transport in self.transports:
+                transport.close()
+            self.transports = []
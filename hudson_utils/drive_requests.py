@@ -0,0 +1,293 @@
+import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from hudson_utils.instrumentation import metrics
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_SECONDS = 1.0
+DEFAULT_MAX_BACKOFF_SECONDS = 64.0
+# Drive allows 12,000 queries per minute and user by default.
+DEFAULT_REQUESTS_PER_SECOND = 100.0
+DEFAULT_MAX_CONCURRENCY = 16
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Transport failures; socket timeouts, connection resets and SSL errors are all
+# OSErrors.
+TRANSPORT_ERRORS = (OSError, httplib2.HttpLib2Error)
+
+
+def error_reasons(exception: HttpError) -> List[str]:
+    try:
+        error = json.loads(exception.content.decode("utf-8"))["error"]
+        return [detail.get("reason", "") for detail in error.get("errors", [])]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return []
+
+
+def is_quota_error(exception: Exception) -> bool:
+    """
+    Check whether a request was rejected for exceeding a rate limit.
+
+    Args:
+        exception (Exception): Error raised for the request.
+
+    Returns:
+        bool: True for 429 responses and for 403 responses whose reason is a
+            rate limit.
+    """
+    if not isinstance(exception, HttpError):
+        return False
+    if exception.resp.status == 429:
+        return True
+    return exception.resp.status == 403 and bool(
+        RATE_LIMIT_REASONS.intersection(error_reasons(exception))
+    )
+
+
+def is_retryable(exception: Exception) -> bool:
+    """
+    Check whether a failed request is worth retrying.
+
+    Args:
+        exception (Exception): Error raised for the request.
+
+    Returns:
+        bool: True for rate limiting, server errors and transport errors, False
+            for any other error, such as a bug in the caller.
+    """
+    if isinstance(exception, HttpError):
+        return exception.resp.status in RETRYABLE_STATUSES or is_quota_error(exception)
+    return isinstance(exception, TRANSPORT_ERRORS)
+
+
+def retry_after_seconds(exception: Exception, now: float) -> Optional[float]:
+    """
+    Read the delay requested by the Retry-After header of a failed request.
+
+    Args:
+        exception (Exception): Error raised for the request.
+        now (float): Current UNIX time, to resolve HTTP dates.
+
+    Returns:
+        float or None: Number of seconds to wait, or None without a valid header.
+    """
+    if not isinstance(exception, HttpError):
+        return None
+    value = exception.resp.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Rate limiter allowing bursts of up to `capacity` calls and `rate` calls
+        per second on average.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float, optional): Maximum number of tokens, `rate` by
+                default.
+            clock (Callable[[], float]): Monotonic clock, in seconds.
+            sleep (Callable[[float], None]): Function used to wait for tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, count: int = 1):
+        """
+        Take tokens, waiting for them to be added if the bucket runs short.
+
+        A count larger than the capacity waits for a full bucket and leaves it
+        in debt, so the calls that follow wait until the average rate is met.
+
+        Args:
+            count (int): Number of tokens taken.
+        """
+        needed = min(count, self.capacity)
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= needed:
+                    self.tokens -= count
+                    return
+                wait = (needed - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class AdaptiveConcurrencyLimit:
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease: float = 0.5):
+        """
+        Bound the number of calls in flight, adjusted with additive increase and
+        multiplicative decrease.
+
+        The limit shrinks by `decrease` on every quota error and grows back by
+        one call for every `limit` successful calls, so the load settles just
+        below the point where Drive starts throttling.
+
+        Args:
+            max_limit (int): Largest number of calls in flight, and the initial
+                limit.
+            min_limit (int): Smallest number of calls in flight.
+            decrease (float): Factor applied to the limit on a quota error.
+        """
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.decrease = decrease
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, quota_error: bool = False):
+        with self.condition:
+            self.in_flight -= 1
+            if quota_error:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class DriveRequestExecutor:
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+        max_backoff_seconds: float = DEFAULT_MAX_BACKOFF_SECONDS,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+        jitter: Callable[[float, float], float] = random.uniform,
+    ):
+        """
+        Run Drive API calls under a shared rate limit, retrying the ones that
+        fail transiently.
+
+        Every call takes a token from a token bucket and a slot of an adaptive
+        concurrency limit, shared by all the threads using the executor. Calls
+        failing with a rate limit, server or transport error are retried after
+        an exponential backoff with full jitter, or after the delay requested by
+        a Retry-After header when it is longer.
+
+        Args:
+            max_retries (int): Number of times a failing call is retried.
+            backoff_seconds (float): Upper bound of the first retry delay,
+                doubled on every following one.
+            max_backoff_seconds (float): Largest retry delay.
+            requests_per_second (float): Sustained rate of calls.
+            max_concurrency (int): Largest number of calls in flight.
+            sleep (Callable[[float], None]): Function used to wait.
+            clock (Callable[[], float]): Function returning the current UNIX time.
+            jitter (Callable[[float, float], float]): Function drawing a delay
+                between two bounds.
+        """
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.sleep = sleep
+        self.clock = clock
+        self.jitter = jitter
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.concurrency = AdaptiveConcurrencyLimit(max_concurrency)
+
+    def execute(self, request, **kwargs) -> Any:
+        """
+        Execute a Drive API request.
+
+        Args:
+            request (HttpRequest): Request to execute.
+            **kwargs: Arguments of `request.execute`, such as `http`.
+
+        Returns:
+            Response of the request.
+        """
+        return self.call(request.execute, **kwargs)
+
+    def call(
+        self, function: Callable[..., Any], *args: Any, cost: int = 1, **kwargs: Any
+    ) -> Any:
+        """
+        Call a function making one Drive API request, such as
+        `MediaIoBaseDownload.next_chunk`.
+
+        Args:
+            function (Callable): Function to call.
+            *args: Arguments of the function.
+            cost (int): Number of Drive API calls the request counts as against
+                the quota, such as the calls carried by a batch request.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            Result of the function.
+
+        Raises:
+            Exception: The error of the last attempt, when it is not retryable or
+                every retry failed.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(cost)
+            self.concurrency.acquire()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                quota_error = is_quota_error(e)
+                self.concurrency.release(quota_error)
+                if quota_error:
+                    metrics.increment("drive.quota_errors")
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.retry_delay(e, attempt)
+                metrics.increment("drive.retries")
+                logging.warning(
+                    f"Retrying Drive request in {delay:.1f}s after: {str(e)}"
+                )
+                self.sleep(delay)
+            else:
+                self.concurrency.release()
+                return result
+
+    def retry_delay(self, exception: Exception, attempt: int) -> float:
+        backoff = min(self.max_backoff_seconds, self.backoff_seconds * (2**attempt))
+        delay = self.jitter(0, backoff)
+        retry_after = retry_after_seconds(exception, self.clock())
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+from typing import Dict, List, NamedTuple
+
+from hudson_utils.google_drive import (
+    ALL_DRIVES_PARAMETERS,
+    ALLOWED_MIME_TYPES,
+    FILE_FIELDS,
+    FOLDER_MIME_TYPE,
+    GoogleDriveService,
+)
+from hudson_utils.instrumentation import metrics
+
+DEFAULT_SYNC_STATE_FILE = os.path.join("config", "drive_sync_state.json")
+
+# The same file fields as full listings, so both build the same documents.
+CHANGE_FIELDS = (
+    "nextPageToken, newStartPageToken, changes(fileId, removed, "
+    f"file({FILE_FIELDS}, parents, trashed))"
+)
+
+
+class SyncResult(NamedTuple):
+    documents: List[Dict[str, str]]
+    changed: List[Dict[str, str]]
+    removed: List[str]
+
+
+class DriveFolderSync:
+    def __init__(
+        self,
+        google_drive_service: GoogleDriveService,
+        state_file: str = DEFAULT_SYNC_STATE_FILE,
+    ):
+        """
+        Keep a local view of a Drive folder tree up to date using the changes
+        feed.
+
+        The first sync of a folder lists it and its subfolders in full and stores
+        a `startPageToken`. Later syncs only page through `changes().list` from
+        that token, so unchanged folders cost a single request. Changes to the
+        subfolders themselves trigger a full listing again.
+
+        Args:
+            google_drive_service (GoogleDriveService): Service used to list
+                folders and read the changes feed.
+            state_file (str): Path of the JSON file holding the sync state.
+        """
+        self.google_drive_service = google_drive_service
+        self.state_file = state_file
+        self.state = self.load_state()
+
+    @property
+    def drive_service(self):
+        return self.google_drive_service.drive_service
+
+    @property
+    def request_executor(self):
+        return self.google_drive_service.request_executor
+
+    def sync(self, folder_name: str) -> SyncResult:
+        """
+        Find the documents of a folder tree that changed since the last sync.
+
+        Args:
+            folder_name (str): Name of the folders to synchronize.
+
+        Returns:
+            SyncResult: Every document currently in the folders, the documents
+                that were added or modified, and the IDs of removed documents.
+        """
+        folders = self.google_drive_service.get_folders_by_name(folder_name)
+        if not folders:
+            logging.error(f"Folder '{folder_name}' not found in Google Drive.")
+            return SyncResult([], [], [])
+
+        folder_ids = [folder["id"] for folder in folders]
+        start_page_token = self.state.get("start_page_token")
+        if (
+            self.state.get("folder_ids") != folder_ids
+            or self.state.get("max_depth") != self.google_drive_service.max_depth
+            or not start_page_token
+        ):
+            return self.full_sync(folders, folder_name)
+        return self.incremental_sync(folders, folder_name)
+
+    def full_sync(self, folders: List[Dict[str, str]], folder_name: str) -> SyncResult:
+        # The token is taken before listing so that changes made while the
+        # folders are being listed are replayed by the next sync.
+        metrics.increment("drive.api_calls")
+        response = self.request_executor.execute(
+            self.drive_service.changes().getStartPageToken(supportsAllDrives=True)
+        )
+        start_page_token = response["startPageToken"]
+        documents, folder_paths = self.google_drive_service.walk_folders(
+            folders, folder_name
+        )
+        known_documents = self.state.get("documents", {})
+        listed_ids = {document["id"] for document in documents}
+        changed = [
+            document
+            for document in documents
+            if known_documents.get(document["id"]) != document
+        ]
+        removed = [
+            document_id
+            for document_id in known_documents
+            if document_id not in listed_ids
+        ]
+
+        self.state = {
+            "folder_ids": [folder["id"] for folder in folders],
+            "max_depth": self.google_drive_service.max_depth,
+            "folders": folder_paths,
+            "start_page_token": start_page_token,
+            "documents": {document["id"]: document for document in documents},
+        }
+        self.save_state()
+        return SyncResult(documents, changed, removed)
+
+    def incremental_sync(
+        self, folders: List[Dict[str, str]], folder_name: str
+    ) -> SyncResult:
+        # Copied so a fallback to a full sync compares with the previous state.
+        known_documents = dict(self.state["documents"])
+        folder_paths = self.state["folders"]
+        changed = {}
+        removed = []
+
+        page_token = self.state["start_page_token"]
+        new_start_page_token = None
+        while page_token:
+            metrics.increment("drive.api_calls")
+            response = self.request_executor.execute(
+                self.drive_service.changes().list(
+                    pageToken=page_token,
+                    fields=CHANGE_FIELDS,
+                    spaces="drive",
+                    **ALL_DRIVES_PARAMETERS,
+                )
+            )
+            for change in response.get("changes", []):
+                file_id = change["fileId"]
+                file = change.get("file") or {}
+                parents = [p for p in file.get("parents", []) if p in folder_paths]
+                if file_id in folder_paths or (
+                    file.get("mimeType") == FOLDER_MIME_TYPE and parents
+                ):
+                    # A folder of the tree was added, moved, renamed or removed,
+                    # which changes the paths and the set of folders, so the tree
+                    # is listed again instead.
+                    return self.full_sync(folders, folder_name)
+
+                in_folder = (
+                    not change.get("removed")
+                    and not file.get("trashed")
+                    and parents
+                    and file.get("mimeType") in ALLOWED_MIME_TYPES
+                )
+                if in_folder:
+                    document = GoogleDriveService.to_document_info(
+                        file, folder_paths[parents[0]]
+                    )
+                    known_documents[file_id] = document
+                    changed[file_id] = document
+                elif file_id in known_documents:
+                    del known_documents[file_id]
+                    changed.pop(file_id, None)
+                    removed.append(file_id)
+
+            page_token = response.get("nextPageToken")
+            new_start_page_token = response.get("newStartPageToken")
+
+        self.state["documents"] = known_documents
+        if new_start_page_token:
+            self.state["start_page_token"] = new_start_page_token
+        self.save_state()
+        return SyncResult(
+            list(known_documents.values()), list(changed.values()), removed
+        )
+
+    def reset(self):
+        """
+        Forget the sync state so the next sync lists the folder in full.
+        """
+        self.state = {}
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+    def load_state(self) -> dict:
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable Drive sync state: {str(e)}")
+            return {}
+
+    def save_state(self):
+        state_dir = os.path.dirname(self.state_file)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        temp_path = self.state_file + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump(self.state, state_file)
+        os.replace(temp_path, self.state_file)
@@ -1,71 +1,138 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
-from googleapiclient.discovery import build
+from hudson_utils.document_cache import REVISION_FIELDS
+from hudson_utils.drive_batch import DriveBatchExecutor
+from hudson_utils.drive_clients import DriveClientPool
+from hudson_utils.drive_requests import DriveRequestExecutor
+from hudson_utils.instrumentation import metrics
 
+DOCUMENT_MIME_TYPE = "application/vnd.google-apps.document"
 ALLOWED_MIME_TYPES = [
-    "application/vnd.google-apps.document",
+    DOCUMENT_MIME_TYPE,
     "application/pdf",
 ]
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+DEFAULT_LIST_WORKERS = 8
+LIST_PAGE_SIZE = 1000
+# Parents combined into a single listing query, keeping it well below the
+# maximum query length accepted by Drive.
+MAX_PARENTS_PER_QUERY = 50
+FILE_FIELDS = "id, name, mimeType, size, md5Checksum, modifiedTime, version"
+LIST_FIELDS = f"nextPageToken, files({FILE_FIELDS}, parents)"
+FOLDER_FIELDS = "nextPageToken, files(id, name, driveId)"
+# Makes listings include the files of shared drives.
+ALL_DRIVES_PARAMETERS = {"supportsAllDrives": True, "includeItemsFromAllDrives": True}
 
 
 class GoogleDriveService:
-    def __init__(self, credentials):
+    def __init__(
+        self,
+        credentials,
+        batch_requests: bool = False,
+        max_depth: Optional[int] = None,
+        list_workers: int = DEFAULT_LIST_WORKERS,
+        request_executor: Optional[DriveRequestExecutor] = None,
+        client_pool: Optional[DriveClientPool] = None,
+    ):
         """
         Initialize the GoogleDriveService with user credentials.
 
         Args:
             credentials: User credentials for Google Drive API.
+            batch_requests (bool): Group per-file metadata calls into batch HTTP
+                requests of up to 100 calls each. Only used by
+                `get_files_metadata` and `get_document_names`, for library use:
+                the command line lists folders, which needs no per-file calls.
+            max_depth (int, optional): Number of levels of subfolders traversed
+                below the requested folder, 0 for its direct children only, or
+                None for no limit.
+            list_workers (int): Number of listing requests run concurrently.
+            request_executor (DriveRequestExecutor, optional): Executor rate
+                limiting and retrying the Drive calls, shared with the downloads.
+            client_pool (DriveClientPool, optional): Pool of the Drive client and
+                of the per-thread transports, built from `credentials` by
+                default.
         """
         self.credentials = credentials
-        self.drive_service = build("drive", "v3", credentials=credentials)
+        self.batch_requests = batch_requests
+        self.max_depth = max_depth
+        self.list_workers = max(1, list_workers)
+        self.request_executor = request_executor or DriveRequestExecutor()
+        self.client_pool = client_pool or DriveClientPool(credentials)
+        self.drive_service = self.client_pool.client()
 
     def get_documents_from_drive(self, folder_name: str) -> list:
         """
-        Retrieve all documents from a specific folder in Google Drive.
+        Retrieve all documents from the folders with a given name in Google Drive,
+        including shared drives, and from their subfolders.
 
         Args:
-            folder_name (str): Name of the folder to retrieve documents from.
+            folder_name (str): Name of the folders to retrieve documents from.
 
         Returns:
             list: List of document metadata dictionaries with 'id', 'full_path', 'title'
             and 'mime_type'.
         """
-        folder_id = self.get_folder_id_by_name(folder_name)
-        if not folder_id:
+        folders = self.get_folders_by_name(folder_name)
+        if not folders:
             logging.error(f"Folder '{folder_name}' not found in Google Drive.")
             return []
 
-        documents = self.list_files_in_folder(folder_id, folder_name)
+        documents, _ = self.walk_folders(folders, folder_name)
+        return documents
 
-        # check mime type of each document
-        for document in documents:
-            document_id = document["id"]
-            document_name = document["title"]
+    def get_documents_in_folder(self, folder_id: str, folder_name: str) -> list:
+        """
+        Retrieve all documents with an allowed mime type from a folder and its
+        subfolders.
 
-            try:
-                document_metadata = (
-                    self.drive_service.files().get(fileId=document_id).execute()
-                )
-                document_mime_type = document_metadata.get("mimeType")
-
-                if document_mime_type not in ALLOWED_MIME_TYPES:
-                    logging.warning(
-                        f"Document '{document_name}' has mime type {document_mime_type}"
-                        " and will be skipped."
-                    )
-                    documents.remove(document)
-                else:
-                    document["mime_type"] = document_mime_type
-            except Exception as e:
-                logging.error(
-                    f"Error retrieving document metadata for ID {document_id}: "
-                    f"{str(e)}"
-                )
-                documents.remove(document)
+        Args:
+            folder_id (str): ID of the folder to retrieve documents from.
+            folder_name (str): Name of the folder to construct full paths.
 
+        Returns:
+            list: List of document metadata dictionaries with 'id', 'full_path',
+            'title' and 'mime_type'.
+        """
+        documents, _ = self.walk_folders([{"id": folder_id}], folder_name)
         return documents
 
+    def get_folders_by_name(self, folder_name: str) -> List[Dict[str, str]]:
+        """
+        Find every folder with a given name, in My Drive and in shared drives.
+
+        Args:
+            folder_name (str): Name of the folders to find.
+
+        Returns:
+            List[Dict[str, str]]: Drive file resources of the folders, with 'id',
+                'name' and, for folders of a shared drive, 'driveId'.
+        """
+        folders = []
+        page_token = None
+        while True:
+            metrics.increment("drive.api_calls")
+            results = self.request_executor.execute(
+                self.drive_service.files().list(
+                    q=f"name='{folder_name}' and mimeType='{FOLDER_MIME_TYPE}' "
+                    "and trashed=false",
+                    fields=FOLDER_FIELDS,
+                    pageSize=LIST_PAGE_SIZE,
+                    pageToken=page_token,
+                    corpora="allDrives",
+                    **ALL_DRIVES_PARAMETERS,
+                )
+            )
+            folders.extend(results.get("files", []))
+
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return folders
+
     def get_folder_id_by_name(self, folder_name: str) -> str:
         """
         Get the ID of a folder by searching for it by name.
@@ -74,24 +141,145 @@ class GoogleDriveService:
             folder_name (str): Name of the folder to retrieve the ID for.
 
         Returns:
-            str: ID of the folder or an empty string if not found.
+            str: ID of the first matching folder or an empty string if not found.
         """
-        results = (
-            self.drive_service.files()
-            .list(
-                q=f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'",  # noqa E501
-                fields="files(id)",
-            )
-            .execute()
-        )
-        folders = results.get("files", [])
+        folders = self.get_folders_by_name(folder_name)
         if folders:
             return folders[0]["id"]
         return ""
 
+    def walk_folders(
+        self, folders: List[Dict[str, str]], folder_name: str
+    ) -> Tuple[list, Dict[str, str]]:
+        """
+        List the documents of folders and of their subfolders, breadth first.
+
+        Each level of the tree is listed with as few queries as possible, the
+        children of up to MAX_PARENTS_PER_QUERY folders being requested together,
+        and the queries of a level run concurrently. The listings already carry
+        every field needed downstream, so no per-file lookup is made.
+
+        Args:
+            folders (List[Dict[str, str]]): Drive file resources of the folders,
+                with 'id' and, for folders of a shared drive, 'driveId'.
+            folder_name (str): Name of the folders to construct full paths.
+
+        Returns:
+            Tuple[list, Dict[str, str]]: Document metadata dictionaries, and the
+                path of every folder traversed keyed by folder ID.
+        """
+        folder_paths = {}
+        level = []
+        for folder in folders:
+            if folder["id"] not in folder_paths:
+                folder_paths[folder["id"]] = folder_name
+                level.append(folder)
+
+        documents = []
+        listed_ids = set()
+        depth = 0
+        with ThreadPoolExecutor(max_workers=self.list_workers) as executor:
+            while level:
+                include_folders = self.max_depth is None or depth < self.max_depth
+                level_drives = {folder["id"]: folder.get("driveId") for folder in level}
+                listings = executor.map(
+                    lambda group: self.list_children(
+                        group[1], group[0], include_folders
+                    ),
+                    self.group_parents(level),
+                )
+                next_level = []
+                for files in listings:
+                    for file in files:
+                        parent_id = next(
+                            p for p in file.get("parents", []) if p in level_drives
+                        )
+                        path = folder_paths[parent_id]
+                        if file.get("mimeType") == FOLDER_MIME_TYPE:
+                            if file["id"] not in folder_paths:
+                                folder_paths[file["id"]] = os.path.join(
+                                    path, file["name"]
+                                )
+                                next_level.append(
+                                    dict(file, driveId=level_drives[parent_id])
+                                )
+                        elif file["id"] not in listed_ids:
+                            listed_ids.add(file["id"])
+                            documents.append(self.to_document_info(file, path))
+                level = next_level
+                depth += 1
+        return documents, folder_paths
+
+    @staticmethod
+    def group_parents(folders: List[Dict[str, str]]) -> List[Tuple[str, List[str]]]:
+        # Folders of a shared drive are listed within that drive, and folders are
+        # grouped so each query stays short.
+        by_drive: Dict[Optional[str], List[str]] = {}
+        for folder in folders:
+            by_drive.setdefault(folder.get("driveId"), []).append(folder["id"])
+        groups = []
+        for drive_id, folder_ids in by_drive.items():
+            for start in range(0, len(folder_ids), MAX_PARENTS_PER_QUERY):
+                end = start + MAX_PARENTS_PER_QUERY
+                groups.append((drive_id, folder_ids[start:end]))
+        return groups
+
+    def list_children(
+        self,
+        parent_ids: List[str],
+        drive_id: Optional[str] = None,
+        include_folders: bool = False,
+    ) -> List[dict]:
+        """
+        List the files with an allowed mime type whose parent is one of
+        `parent_ids`, following pagination.
+
+        Args:
+            parent_ids (List[str]): IDs of the parent folders.
+            drive_id (str, optional): ID of the shared drive holding the folders.
+            include_folders (bool): Also list the subfolders.
+
+        Returns:
+            List[dict]: Drive file resources, including their 'parents'.
+        """
+        parents_filter = " or ".join(
+            f"'{parent_id}' in parents" for parent_id in parent_ids
+        )
+        mime_types = ALLOWED_MIME_TYPES + (
+            [FOLDER_MIME_TYPE] if include_folders else []
+        )
+        mime_type_filter = " or ".join(
+            f"mimeType='{mime_type}'" for mime_type in mime_types
+        )
+        query = f"({parents_filter}) and trashed=false and ({mime_type_filter})"
+        corpus = {"corpora": "drive", "driveId": drive_id} if drive_id else {}
+
+        files = []
+        page_token = None
+        while True:
+            metrics.increment("drive.api_calls")
+            with metrics.span("drive.list"):
+                results = self.request_executor.execute(
+                    self.drive_service.files().list(
+                        q=query,
+                        fields=LIST_FIELDS,
+                        pageSize=LIST_PAGE_SIZE,
+                        pageToken=page_token,
+                        **corpus,
+                        **ALL_DRIVES_PARAMETERS,
+                    ),
+                    http=self.client_pool.http(),
+                )
+            files.extend(results.get("files", []))
+
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return files
+
     def list_files_in_folder(self, folder_id: str, folder_name: str) -> list:
         """
-        List files within a specified folder.
+        List files within a specified folder, without descending into its
+        subfolders.
 
         Args:
             folder_id (str): ID of the folder to list files from.
@@ -99,30 +287,43 @@ class GoogleDriveService:
 
         Returns:
             list: List of document metadata dictionaries with 'id', 'full_path',
-                and 'title'.
+                'title', 'mime_type', 'size' and the revision fields of every file
+                with an allowed mime type.
         """
-        query = f"'{folder_id}' in parents"
-        fields = "files(id, name)"
-
-        results = self.drive_service.files().list(q=query, fields=fields).execute()
-
-        documents = results.get("files", [])
-        document_info_list = []
+        return [
+            self.to_document_info(file, folder_name)
+            for file in self.list_children([folder_id])
+        ]
 
-        for document in documents:
-            document_id = document["id"]
-            document_name = document["name"]
-            full_path = os.path.join(folder_name, f"{document_name}.docx")
-
-            document_info = {
-                "id": document_id,
-                "full_path": full_path,
-                "title": document_name,
-            }
+    @staticmethod
+    def to_document_info(file: dict, folder_name: str) -> dict:
+        """
+        Convert a Drive file resource into a document metadata dictionary.
 
-            document_info_list.append(document_info)
+        Args:
+            file (dict): Drive file resource with at least 'id' and 'name'.
+            folder_name (str): Name of the folder to construct full paths.
 
-        return document_info_list
+        Returns:
+            dict: Document metadata dictionary with 'id', 'full_path' and 'title',
+                plus 'mime_type', 'size' and the revision fields when present in
+                `file`.
+        """
+        file_name = file["name"]
+        if file.get("mimeType", DOCUMENT_MIME_TYPE) == DOCUMENT_MIME_TYPE:
+            # Google Docs are downloaded as DOCX exports.
+            file_name += ".docx"
+        document_info = {
+            "id": file["id"],
+            "full_path": os.path.join(folder_name, file_name),
+            "title": file["name"],
+        }
+        if "mimeType" in file:
+            document_info["mime_type"] = file["mimeType"]
+        for field in ("size",) + REVISION_FIELDS:
+            if field in file:
+                document_info[field] = file[field]
+        return document_info
 
     def get_document_name(self, document_id: str) -> str:
         """
@@ -134,12 +335,63 @@ class GoogleDriveService:
         Returns:
             str: Name of the document or None if not found.
         """
+        metrics.increment("drive.api_calls")
         try:
-            result = (
-                self.drive_service.files()
-                .get(fileId=document_id, fields="name")
-                .execute()
+            result = self.request_executor.execute(
+                self.drive_service.files().get(fileId=document_id, fields="name")
             )
             return result["name"]
         except Exception as e:
             raise e
+
+    def get_files_metadata(self, file_ids: list, fields: str = FILE_FIELDS) -> dict:
+        """
+        Retrieve the metadata of several files.
+
+        When batching is enabled the calls are grouped into batch HTTP requests,
+        otherwise one request is made per file. Files whose metadata could not
+        be retrieved are logged and left out of the result.
+
+        Args:
+            file_ids (list): IDs of the files to retrieve the metadata for.
+            fields (str): Field mask of the file resources to return.
+
+        Returns:
+            dict: File resources keyed by file ID.
+        """
+        requests = {
+            file_id: self.drive_service.files().get(fileId=file_id, fields=fields)
+            for file_id in file_ids
+        }
+
+        if self.batch_requests:
+            metadata, errors = DriveBatchExecutor(
+                self.drive_service, request_executor=self.request_executor
+            ).execute(requests)
+        else:
+            metadata, errors = {}, {}
+            metrics.increment("drive.api_calls", len(requests))
+            for file_id, request in requests.items():
+                try:
+                    metadata[file_id] = self.request_executor.execute(request)
+                except Exception as e:
+                    errors[file_id] = e
+
+        for file_id, exception in errors.items():
+            logging.error(
+                f"Error retrieving file metadata for ID {file_id}: {str(exception)}"
+            )
+        return metadata
+
+    def get_document_names(self, document_ids: list) -> dict:
+        """
+        Retrieve the names of several documents based on their IDs.
+
+        Args:
+            document_ids (list): IDs of the documents to retrieve the names for.
+
+        Returns:
+            dict: Document names keyed by document ID.
+        """
+        metadata = self.get_files_metadata(document_ids, fields="id, name")
+        return {file_id: file["name"] for file_id, file in metadata.items()}
@@ -0,0 +1,215 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+METRICS_PREFIX = "hudson"
+METRICS_FORMATS = ("json", "prometheus")
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        """
+        Registry of timing spans and counters for the hot paths.
+
+        While disabled, `span` returns a shared no-op context manager and
+        `increment` returns immediately, so instrumented code pays a single
+        attribute check.
+
+        Args:
+            enabled (bool): Whether measurements are recorded.
+        """
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        # Span name to [count, total seconds, max seconds].
+        self.spans: Dict[str, list] = {}
+        self.counters: Dict[str, float] = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+
+    def span(self, name: str):
+        """
+        Time a block of code.
+
+        Args:
+            name (str): Name of the span, such as 'drive.list'.
+
+        Returns:
+            A context manager recording the duration of the block.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def increment(self, name: str, value: float = 1):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Name of the counter, such as 'drive.bytes_downloaded'.
+            value (float): Amount to add.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name: str, seconds: float, count: int = 1):
+        with self.lock:
+            span = self.spans.setdefault(name, [0, 0.0, 0.0])
+            span[0] += count
+            span[1] += seconds
+            span[2] = max(span[2], seconds)
+
+    def report(self) -> Dict[str, Dict]:
+        """
+        Snapshot the measurements.
+
+        Returns:
+            Dict[str, Dict]: 'spans', mapping each span to its 'count',
+                'total_seconds' and 'max_seconds', and 'counters'.
+        """
+        with self.lock:
+            return {
+                "spans": {
+                    name: {
+                        "count": count,
+                        "total_seconds": total,
+                        "max_seconds": longest,
+                    }
+                    for name, (count, total, longest) in sorted(self.spans.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def merge(self, report: Dict[str, Dict]):
+        """
+        Add the measurements of another registry, such as one of a worker
+        process.
+
+        Args:
+            report (Dict[str, Dict]): Output of `report`.
+        """
+        with self.lock:
+            for name, span in report["spans"].items():
+                merged = self.spans.setdefault(name, [0, 0.0, 0.0])
+                merged[0] += span["count"]
+                merged[1] += span["total_seconds"]
+                merged[2] = max(merged[2], span["max_seconds"])
+            for name, value in report["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Render the measurements in the Prometheus text exposition format.
+
+        Returns:
+            str: One `<prefix>_span_seconds_total` and `<prefix>_span_calls_total`
+                sample per span, labelled with the span name, and one
+                `<prefix>_<counter>_total` sample per counter.
+        """
+        report = self.report()
+        lines = []
+        for metric, field in (
+            ("span_seconds_total", "total_seconds"),
+            ("span_calls_total", "count"),
+        ):
+            lines.append(f"# TYPE {METRICS_PREFIX}_{metric} counter")
+            for name, span in report["spans"].items():
+                lines.append(
+                    f'{METRICS_PREFIX}_{metric}{{span="{name}"}} {span[field]}'
+                )
+        for name, value in report["counters"].items():
+            metric = f"{METRICS_PREFIX}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, metrics_format: str) -> str:
+        """
+        Render the measurements in a named format.
+
+        Args:
+            metrics_format (str): 'json' or 'prometheus'.
+
+        Returns:
+            str: Rendered measurements.
+        """
+        if metrics_format == "json":
+            return self.to_json()
+        if metrics_format == "prometheus":
+            return self.to_prometheus()
+        raise ValueError(
+            f"Unknown metrics format '{metrics_format}', expected "
+            f"{' or '.join(METRICS_FORMATS)}."
+        )
+
+
+# Registry shared by every instrumented module.
+metrics = Metrics()
+
+if hasattr(os, "register_at_fork"):
+    # Another thread may hold the lock at the time of a fork.
+    os.register_at_fork(
+        after_in_child=lambda: setattr(metrics, "lock", threading.Lock())
+    )
+
+
+def call_with_metrics(
+    function: Callable[..., Any], *args: Any
+) -> Tuple[Any, Dict[str, Dict]]:
+    """
+    Run a function in a worker process with instrumentation enabled.
+
+    Args:
+        function (Callable): Picklable function to run.
+        *args: Arguments of the function.
+
+    Returns:
+        Tuple[Any, Dict[str, Dict]]: Result of the function and the measurements
+            taken while it ran, to be merged into the parent registry.
+    """
+    metrics.enable()
+    metrics.reset()
+    return function(*args), metrics.report()
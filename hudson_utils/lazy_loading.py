@@ -0,0 +1,53 @@
+import threading
+from typing import Any, Callable
+
+
+class BackgroundLoader:
+    def __init__(self, factory: Callable[[], Any]):
+        """
+        Build an expensive object on first use, optionally ahead of time in a
+        background thread.
+
+        Args:
+            factory (Callable[[], Any]): Function building the object.
+        """
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.thread = None
+        self.value = None
+        self.error = None
+
+    def start(self):
+        """
+        Start building the object in a background thread, if not started yet.
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        try:
+            self.value = self.factory()
+        except BaseException as e:
+            self.error = e
+
+    def get(self) -> Any:
+        """
+        Get the object, building it or waiting for the background build.
+
+        Returns:
+            The built object.
+
+        Raises:
+            Exception: The error raised by the factory, if any.
+        """
+        self.start()
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    @property
+    def loaded(self) -> bool:
+        return self.thread is not None and not self.thread.is_alive()
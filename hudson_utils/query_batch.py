@@ -0,0 +1,125 @@
+import json
+import time
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hudson_utils.instrumentation import metrics
+
+DEFAULT_QUERY_CHUNK_SIZE = 64
+
+
+def read_query_records(
+    lines: Iterable[str],
+) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Read queries from the lines of a query file.
+
+    Each line is either a query in plain text or a JSON object with a 'query'
+    field, whose other fields, such as an ID or an expected answer, are copied
+    to the result. Blank lines are skipped, and a line starting with '{' that
+    is not such an object is reported as an error instead of a query.
+
+    Args:
+        lines (Iterable[str]): Lines of the file.
+
+    Yields:
+        Tuple[int, Dict or None, str or None]: Line number, and either the
+            record of the query, with at least 'query', or the error of the line.
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            yield line_number, {"query": line}, None
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(record, dict) or not isinstance(record.get("query"), str):
+            yield line_number, None, "No 'query' field."
+            continue
+        yield line_number, record, None
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_output_record(record: Dict, result: Dict, threshold: float) -> Dict:
+    source = result["source"]
+    if source is not None:
+        source = dict(source, title=result["source_document"][0].get("title"))
+    return dict(
+        record,
+        answer=result["answer"],
+        confidence=result["confidence"],
+        meets_threshold=result["confidence"] >= threshold,
+        source=source,
+    )
+
+
+def run_query_file(
+    answer_queries: Callable[[List[str]], List[Dict]],
+    lines: Iterable[str],
+    output: IO[str],
+    threshold: float,
+    chunk_size: int = DEFAULT_QUERY_CHUNK_SIZE,
+    progress: Callable[[int], None] = lambda answered: None,
+) -> int:
+    """
+    Answer the queries of a file chunk by chunk, writing each result as a
+    JSON line as soon as its chunk is answered.
+
+    Only one chunk of queries and results is held at a time, so memory stays
+    constant however long the file is. Each chunk is answered in one reader
+    pass, and each result carries the time its chunk took. Lines that are not
+    valid queries are written as records with their 'line' number and 'error',
+    and the run goes on.
+
+    Args:
+        answer_queries (Callable[[List[str]], List[Dict]]): Function answering
+            a list of queries, such as `TextProcessor.answer_queries`.
+        lines (Iterable[str]): Lines of the query file, as read by
+            `read_query_records`.
+        output (IO[str]): Stream the JSON lines are written to.
+        threshold (float): Minimum confidence of an answer.
+        chunk_size (int): Number of queries answered together.
+        progress (Callable[[int], None]): Called with the number of queries
+            answered so far after every chunk.
+
+    Returns:
+        int: Number of queries answered.
+    """
+    answered = 0
+    for chunk in iter_chunks(read_query_records(lines), max(1, chunk_size)):
+        records = [record for _, record, _ in chunk if record is not None]
+        started = time.perf_counter()
+        results = iter([])
+        if records:
+            with metrics.span("query_file.chunk"):
+                results = iter(answer_queries([r["query"] for r in records]))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for line_number, record, error in chunk:
+            if record is None:
+                metrics.increment("query_file.errors")
+                output_record = {"line": line_number, "error": error}
+            else:
+                output_record = to_output_record(record, next(results), threshold)
+                output_record["timing"] = {
+                    "chunk_ms": round(elapsed_ms, 3),
+                    "chunk_size": len(records),
+                }
+            output.write(json.dumps(output_record) + "\n")
+        output.flush()
+        answered += len(records)
+        progress(answered)
+    return answered
@@ -0,0 +1,443 @@
+import hashlib
+import logging
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from hudson_utils.instrumentation import metrics
+from hudson_utils.reader_backends import DEFAULT_READER_BACKEND, load_reader_backend
+
+DEFAULT_QA_MODEL = "bert-large-uncased-whole-word-masking-finetuned-squad"
+# Small model answering first in cascade mode.
+DEFAULT_CASCADE_MODEL = "distilbert-base-cased-distilled-squad"
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_SEQ_LENGTH = 384
+DEFAULT_DOC_STRIDE = 128
+DEFAULT_MAX_ANSWER_LENGTH = 30
+
+MASKED_LOGIT = -10000.0
+
+# (query index, context index, start character, end character, score)
+Span = Tuple[int, int, int, int, float]
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+
+def best_span(
+    start_logits: np.ndarray,
+    end_logits: np.ndarray,
+    context_mask: np.ndarray,
+    max_answer_length: int = DEFAULT_MAX_ANSWER_LENGTH,
+) -> Tuple[int, int, float]:
+    """
+    Find the most likely answer span of a window.
+
+    Start and end probabilities are normalized over the context tokens only, and
+    the span score is the product of both, as in the transformers
+    question-answering pipeline.
+
+    Args:
+        start_logits (np.ndarray): Start logits of every token of the window.
+        end_logits (np.ndarray): End logits of every token of the window.
+        context_mask (np.ndarray): True for the tokens that belong to the context.
+        max_answer_length (int): Maximum number of tokens of an answer.
+
+    Returns:
+        Tuple[int, int, float]: Start token, end token and score of the span.
+    """
+    start_probabilities = softmax(np.where(context_mask, start_logits, MASKED_LOGIT))
+    end_probabilities = softmax(np.where(context_mask, end_logits, MASKED_LOGIT))
+
+    scores = np.outer(start_probabilities, end_probabilities)
+    scores = np.tril(np.triu(scores), max_answer_length - 1)
+    start, end = np.unravel_index(scores.argmax(), scores.shape)
+    return int(start), int(end), float(scores[start, end])
+
+
+class TokenizedCorpus:
+    FILES = ("input_ids", "offsets", "boundaries")
+
+    def __init__(
+        self, input_ids: np.ndarray, offsets: np.ndarray, boundaries: np.ndarray
+    ):
+        """
+        Token IDs and character offsets of every passage of a corpus, stored as
+        flat NumPy arrays.
+
+        Args:
+            input_ids (np.ndarray): Token IDs of all passages, concatenated.
+            offsets (np.ndarray): (start, end) character offsets of every token
+                within its passage.
+            boundaries (np.ndarray): Index of the first token of every passage,
+                followed by the total number of tokens.
+        """
+        self.input_ids = input_ids
+        self.offsets = offsets
+        self.boundaries = boundaries
+
+    def __len__(self) -> int:
+        return len(self.boundaries) - 1
+
+    def passage(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.boundaries[index], self.boundaries[index + 1]
+        return self.input_ids[start:end], self.offsets[start:end]
+
+    @classmethod
+    def build(cls, tokenizer, passages: List[str]) -> "TokenizedCorpus":
+        if not passages:
+            return cls(
+                np.zeros(0, dtype=np.int32),
+                np.zeros((0, 2), dtype=np.int32),
+                np.zeros(1, dtype=np.int64),
+            )
+        with metrics.span("reader.tokenize_corpus"):
+            encodings = tokenizer(
+                passages, add_special_tokens=False, return_offsets_mapping=True
+            )
+        lengths = [len(input_ids) for input_ids in encodings["input_ids"]]
+        metrics.increment("reader.corpus_tokens", sum(lengths))
+        boundaries = np.zeros(len(passages) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=boundaries[1:])
+        input_ids = np.fromiter(
+            (i for ids in encodings["input_ids"] for i in ids),
+            dtype=np.int32,
+            count=int(boundaries[-1]),
+        )
+        offsets = np.array(
+            [offset for offsets in encodings["offset_mapping"] for offset in offsets],
+            dtype=np.int32,
+        ).reshape(-1, 2)
+        return cls(input_ids, offsets, boundaries)
+
+    @staticmethod
+    def fingerprint(model: str, passages: List[str]) -> str:
+        digest = hashlib.sha256(model.encode("utf-8"))
+        for passage in passages:
+            digest.update(b"\0" + passage.encode("utf-8"))
+        return digest.hexdigest()
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["TokenizedCorpus"]:
+        paths = [os.path.join(directory, f"{name}.npy") for name in cls.FILES]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        # Memory-mapped, so only the windows that are read get paged in.
+        return cls(*(np.load(path, mmap_mode="r") for path in paths))
+
+
+class BatchedReader:
+    def __init__(
+        self,
+        model: str = DEFAULT_QA_MODEL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+        doc_stride: int = DEFAULT_DOC_STRIDE,
+        max_answer_length: int = DEFAULT_MAX_ANSWER_LENGTH,
+        backend: str = DEFAULT_READER_BACKEND,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Extractive question answering reader running many queries at once.
+
+        Passages are tokenized once per corpus and only queries are tokenized
+        per call. Every (query, passage) pair is split into overlapping windows
+        when longer than `max_seq_length`, and the windows run through the model
+        in batches of `batch_size`, each padded to its own longest window.
+
+        Args:
+            model (str): Name or path of a question-answering model.
+            batch_size (int): Number of windows per forward pass.
+            max_seq_length (int): Maximum number of tokens of a window.
+            doc_stride (int): Number of tokens shared by consecutive windows of a
+                long passage.
+            max_answer_length (int): Maximum number of tokens of an answer.
+            backend (str): Inference backend, 'transformers' for the full
+                precision model, 'quantized' for its int8 dynamically quantized
+                version or 'onnx' for an ONNX Runtime session.
+            num_threads (int, optional): Number of intra-op threads of the backend.
+        """
+        self.batch_size = max(1, batch_size)
+        self.max_seq_length = max_seq_length
+        self.doc_stride = doc_stride
+        self.max_answer_length = max_answer_length
+        self.model_name = model
+        self.backend_name = backend
+        self.num_threads = num_threads
+        from transformers import AutoTokenizer
+        from transformers import logging as transformers_logging
+
+        transformers_logging.set_verbosity_error()
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.backend = self.load_backend()
+
+    def load_backend(self):
+        return load_reader_backend(self.backend_name, self.model_name, self.num_threads)
+
+    def special_tokens_layout(self) -> Tuple[int, int]:
+        """
+        Find where the special tokens of the model go around a question and a
+        context, probing the tokenizer with placeholder IDs.
+
+        Returns:
+            Tuple[int, int]: Number of special tokens placed before the context,
+                not counting the question tokens, and in total.
+        """
+        question, context = [-1], [-2, -2]
+        layout = self.tokenizer.build_inputs_with_special_tokens(question, context)
+        before_context = layout.index(-2) - len(question)
+        return before_context, len(layout) - len(question) - len(context)
+
+    def tokenize_corpus(
+        self, passages: List[str], cache_dir: Optional[str] = None
+    ) -> TokenizedCorpus:
+        """
+        Tokenize passages once so queries only need to tokenize themselves.
+
+        Args:
+            passages (List[str]): Passages of the corpus.
+            cache_dir (str, optional): Directory where the token arrays of the
+                corpus are kept between runs, keyed by the model and a corpus
+                fingerprint.
+
+        Returns:
+            TokenizedCorpus: Token IDs and offsets of the passages.
+        """
+        if cache_dir is None:
+            return TokenizedCorpus.build(self.tokenizer, passages)
+
+        fingerprint = TokenizedCorpus.fingerprint(self.model_name, passages)
+        # Each model has its own directory, so the readers of a cascade can
+        # share the cache.
+        model_dir = os.path.join(
+            cache_dir, hashlib.sha256(self.model_name.encode("utf-8")).hexdigest()[:16]
+        )
+        corpus_dir = os.path.join(model_dir, fingerprint)
+        corpus = TokenizedCorpus.load(corpus_dir)
+        if corpus is not None and len(corpus) == len(passages):
+            return corpus
+
+        corpus = TokenizedCorpus.build(self.tokenizer, passages)
+        try:
+            # Older corpus versions can never be loaded again.
+            if os.path.isdir(model_dir):
+                for entry in os.listdir(model_dir):
+                    if entry != fingerprint:
+                        shutil.rmtree(os.path.join(model_dir, entry), True)
+            corpus.save(corpus_dir)
+        except OSError as e:
+            logging.warning(f"Could not cache the tokenized corpus: {str(e)}")
+        return corpus
+
+    def build_features(
+        self,
+        question_ids: List[List[int]],
+        passage_ids: List[List[int]],
+        corpus: TokenizedCorpus,
+    ) -> List[Tuple[int, int, List[int], List[int], int, np.ndarray]]:
+        """
+        Assemble model inputs from pre-tokenized questions and passages.
+
+        Passages that do not fit next to their question are split into windows
+        sharing `doc_stride` tokens.
+
+        Returns:
+            List of (query index, context index, input IDs, token type IDs,
+            position of the first context token, context token offsets) tuples.
+        """
+        before_context, special_count = self.special_tokens_layout()
+        features = []
+        for query_index, passage_indexes in enumerate(passage_ids):
+            question = question_ids[query_index][: self.max_seq_length // 2]
+            window_length = self.max_seq_length - len(question) - special_count
+            step = max(1, window_length - self.doc_stride)
+            for context_index, passage_index in enumerate(passage_indexes):
+                context, offsets = corpus.passage(passage_index)
+                for start in range(0, len(context), step):
+                    end = start + window_length
+                    window = context[start:end].tolist()
+                    features.append(
+                        (
+                            query_index,
+                            context_index,
+                            self.tokenizer.build_inputs_with_special_tokens(
+                                question, window
+                            ),
+                            self.tokenizer.create_token_type_ids_from_sequences(
+                                question, window
+                            ),
+                            len(question) + before_context,
+                            offsets[start:end],
+                        )
+                    )
+                    if end >= len(context):
+                        break
+        return features
+
+    def answer(
+        self, queries: List[str], contexts: List[List[str]]
+    ) -> List[Dict[str, object]]:
+        """
+        Answer every query from its own list of candidate passages.
+
+        Args:
+            queries (List[str]): Natural language queries.
+            contexts (List[List[str]]): Candidate passages of each query.
+
+        Returns:
+            List[Dict[str, object]]: For each query, the best 'answer' across its
+                passages with its 'score', the 'context_index' of the passage it
+                was found in and its 'start'/'end' character offsets there.
+        """
+        passages = []
+        passage_ids = []
+        for passages_of_query in contexts:
+            first = len(passages)
+            passages.extend(passages_of_query)
+            passage_ids.append(list(range(first, len(passages))))
+        corpus = TokenizedCorpus.build(self.tokenizer, passages)
+        return self.answer_tokenized(queries, passage_ids, corpus, passages)
+
+    def answer_tokenized(
+        self,
+        queries: List[str],
+        passage_ids: List[List[int]],
+        corpus: TokenizedCorpus,
+        passages: List[str],
+    ) -> List[Dict[str, object]]:
+        """
+        Answer every query from passages of a pre-tokenized corpus.
+
+        Only the queries are tokenized; passage tokens come from `corpus`.
+
+        Args:
+            queries (List[str]): Natural language queries.
+            passage_ids (List[List[int]]): Indexes of the candidate passages of
+                each query.
+            corpus (TokenizedCorpus): Tokenized passages.
+            passages (List[str]): Text of the passages, to extract answers.
+
+        Returns:
+            List[Dict[str, object]]: Same as `answer`, with 'context_index'
+                being the position of the passage in the query's candidates.
+        """
+        results = [
+            {"answer": "", "score": 0.0, "context_index": None, "start": 0, "end": 0}
+            for _ in queries
+        ]
+        if not any(passage_ids):
+            return results
+
+        with metrics.span("reader.tokenize_queries"):
+            question_ids = self.tokenizer(queries, add_special_tokens=False)[
+                "input_ids"
+            ]
+        features = self.build_features(question_ids, passage_ids, corpus)
+
+        # Windows of similar length are batched together to minimize padding.
+        order = sorted(range(len(features)), key=lambda i: len(features[i][2]))
+        batches = []
+        for batch_start in range(0, len(features), self.batch_size):
+            batch_end = batch_start + self.batch_size
+            batches.append([features[i] for i in order[batch_start:batch_end]])
+
+        for spans in self.score_batches(batches):
+            for query_index, context_index, start_char, end_char, score in spans:
+                if score <= results[query_index]["score"]:
+                    continue
+
+                passage = passages[passage_ids[query_index][context_index]]
+                results[query_index] = {
+                    "answer": passage[start_char:end_char],
+                    "score": score,
+                    "context_index": context_index,
+                    "start": start_char,
+                    "end": end_char,
+                }
+
+        return results
+
+    def score_batches(self, batches: List[list]) -> Iterator[List[Span]]:
+        """
+        Find the best span of every window, one batch at a time.
+
+        Args:
+            batches (List[list]): Batches of features, as built by
+                `build_features`.
+
+        Returns:
+            Iterator[List[Span]]: Spans of each batch, in order.
+        """
+        for batch in batches:
+            yield self.score_batch(batch)
+
+    def close(self):
+        """
+        Release the resources of the reader, only held by readers running
+        worker processes.
+        """
+
+    def score_batch(self, batch: list) -> List[Span]:
+        """
+        Run a batch of windows through the model and find the best span of each.
+
+        Returns:
+            List[Span]: (query index, context index, start character, end
+                character, score) of the best span of every window.
+        """
+        start_logits, end_logits = self.forward(batch)
+
+        spans = []
+        for row, feature in enumerate(batch):
+            query_index, context_index, input_ids, _, first, offsets = feature
+            last = first + len(offsets)
+            context_mask = np.zeros(len(input_ids), dtype=bool)
+            context_mask[first:last] = True
+            start, end, score = best_span(
+                start_logits[row, : len(input_ids)],
+                end_logits[row, : len(input_ids)],
+                context_mask,
+                self.max_answer_length,
+            )
+            spans.append(
+                (
+                    query_index,
+                    context_index,
+                    int(offsets[start - first][0]),
+                    int(offsets[end - first][1]),
+                    score,
+                )
+            )
+        return spans
+
+    def forward(self, batch: list) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run a batch of features through the model, padded to its longest one.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Start and end logits of the batch.
+        """
+        inputs = self.tokenizer.pad(
+            [
+                {
+                    "input_ids": input_ids,
+                    "token_type_ids": token_type_ids,
+                    "attention_mask": [1] * len(input_ids),
+                }
+                for _, _, input_ids, token_type_ids, _, _ in batch
+            ],
+            return_tensors="np",
+        )
+        metrics.increment("reader.forward_batches")
+        metrics.increment("reader.tokens", sum(len(feature[2]) for feature in batch))
+        with metrics.span("reader.forward"):
+            return self.backend(dict(inputs))
@@ -0,0 +1,205 @@
+import inspect
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_READER_BACKEND = "transformers"
+DEFAULT_ONNX_CACHE_DIR = os.path.join("config", "onnx")
+
+MODEL_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class TransformersBackend:
+    def __init__(self, model: str, num_threads: Optional[int] = None):
+        """
+        Full precision PyTorch question-answering model, as used by the
+        transformers pipeline.
+
+        Args:
+            model (str): Name or path of a question-answering model.
+            num_threads (int, optional): Number of intra-op threads used by torch.
+        """
+        # torch and transformers take seconds to import, so they are only
+        # imported once a model is actually loaded.
+        import torch
+        from transformers import AutoModelForQuestionAnswering
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = AutoModelForQuestionAnswering.from_pretrained(model)
+        self.model.eval()
+        self.input_names = [
+            name
+            for name in MODEL_INPUT_NAMES
+            if name in inspect.signature(self.model.forward).parameters
+        ]
+
+    def __call__(self, inputs: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run a padded batch through the model.
+
+        Args:
+            inputs (Dict[str, np.ndarray]): Model inputs of shape (batch, length).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Start and end logits of the batch.
+        """
+        import torch
+
+        with torch.no_grad():
+            outputs = self.model(
+                **{name: torch.from_numpy(inputs[name]) for name in self.input_names}
+            )
+        return outputs.start_logits.numpy(), outputs.end_logits.numpy()
+
+
+class QuantizedBackend(TransformersBackend):
+    def __init__(self, model: str, num_threads: Optional[int] = None):
+        """
+        PyTorch model with its linear layers dynamically quantized to int8, which
+        roughly quarters their memory and speeds up CPU inference.
+
+        Args:
+            model (str): Name or path of a question-answering model.
+            num_threads (int, optional): Number of intra-op threads used by torch.
+        """
+        import torch
+
+        super().__init__(model, num_threads)
+        self.model = torch.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class OnnxBackend:
+    def __init__(
+        self,
+        model: str,
+        num_threads: Optional[int] = None,
+        onnx_cache_dir: str = DEFAULT_ONNX_CACHE_DIR,
+    ):
+        """
+        ONNX Runtime session running the model exported to ONNX.
+
+        The model is exported once and the ONNX file is reused by later runs.
+
+        Args:
+            model (str): Name or path of a question-answering model.
+            num_threads (int, optional): Number of intra-op threads of the session.
+            onnx_cache_dir (str): Directory where exported models are kept.
+        """
+        import onnxruntime
+
+        onnx_path = self.prepare(model, onnx_cache_dir)
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [
+            session_input.name for session_input in self.session.get_inputs()
+        ]
+
+    @classmethod
+    def prepare(cls, model: str, onnx_cache_dir: str = DEFAULT_ONNX_CACHE_DIR) -> str:
+        """
+        Export the model to ONNX unless an earlier run already did.
+
+        Args:
+            model (str): Name or path of a question-answering model.
+            onnx_cache_dir (str): Directory where exported models are kept.
+
+        Returns:
+            str: Path of the ONNX file.
+        """
+        onnx_path = os.path.join(
+            onnx_cache_dir, model.strip(os.sep).replace(os.sep, "--") + ".onnx"
+        )
+        if not os.path.exists(onnx_path):
+            cls.export(model, onnx_path)
+        return onnx_path
+
+    @staticmethod
+    def export(model: str, onnx_path: str):
+        import torch
+
+        backend = TransformersBackend(model)
+        sample = tuple(
+            torch.ones((1, 8), dtype=torch.long) for _ in backend.input_names
+        )
+        dynamic_axes = {
+            name: {0: "batch", 1: "sequence"}
+            for name in backend.input_names + ["start_logits", "end_logits"]
+        }
+        export_options = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            export_options["dynamo"] = False
+
+        os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+        # Processes exporting at the same time never write the same file.
+        temp_path = f"{onnx_path}.{os.getpid()}.tmp"
+        torch.onnx.export(
+            backend.model,
+            sample,
+            temp_path,
+            input_names=backend.input_names,
+            output_names=["start_logits", "end_logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            **export_options,
+        )
+        os.replace(temp_path, onnx_path)
+
+    def __call__(self, inputs: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        start_logits, end_logits = self.session.run(
+            ["start_logits", "end_logits"],
+            {name: inputs[name].astype(np.int64) for name in self.input_names},
+        )
+        return start_logits, end_logits
+
+
+READER_BACKENDS = {
+    "transformers": TransformersBackend,
+    "quantized": QuantizedBackend,
+    "onnx": OnnxBackend,
+}
+# Backends whose loaded models keep working in a forked process.
+FORK_SAFE_BACKENDS = ("transformers", "quantized")
+
+
+def prepare_reader_backend(name: str, model: str):
+    """
+    Do the one-off work of a backend, such as the ONNX export, so processes
+    loading it afterwards do not repeat it.
+
+    Args:
+        name (str): One of 'transformers', 'quantized' or 'onnx'.
+        model (str): Name or path of a question-answering model.
+    """
+    if name == "onnx":
+        OnnxBackend.prepare(model)
+
+
+def load_reader_backend(
+    name: str, model: str, num_threads: Optional[int] = None
+) -> object:
+    """
+    Load a reader backend by name.
+
+    Args:
+        name (str): One of 'transformers', 'quantized' or 'onnx'.
+        model (str): Name or path of a question-answering model.
+        num_threads (int, optional): Number of intra-op threads of the backend.
+
+    Returns:
+        A callable mapping padded model inputs to start and end logits.
+    """
+    if name not in READER_BACKENDS:
+        raise ValueError(
+            f"Unknown reader backend '{name}', expected one of "
+            f"{', '.join(READER_BACKENDS)}."
+        )
+    return READER_BACKENDS[name](model, num_threads)
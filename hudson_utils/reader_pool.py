@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+from functools import partial
+from typing import Iterator, List, Optional, Union
+
+from hudson_utils.instrumentation import call_with_metrics, metrics
+from hudson_utils.reader import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_DOC_STRIDE,
+    DEFAULT_MAX_ANSWER_LENGTH,
+    DEFAULT_MAX_SEQ_LENGTH,
+    DEFAULT_QA_MODEL,
+    BatchedReader,
+    Span,
+)
+from hudson_utils.reader_backends import (
+    DEFAULT_READER_BACKEND,
+    FORK_SAFE_BACKENDS,
+    prepare_reader_backend,
+)
+
+DEFAULT_READER_WORKERS = 1
+
+# Reader of the current worker process.
+worker_reader: Optional[BatchedReader] = None
+
+
+def init_reader_worker(reader: Union[BatchedReader, dict]):
+    """
+    Set up the reader of a worker process.
+
+    Args:
+        reader (BatchedReader or dict): Reader inherited from the parent through
+            fork, whose weights are shared copy-on-write, or the arguments of a
+            BatchedReader loaded by the worker itself.
+    """
+    global worker_reader
+    if isinstance(reader, dict):
+        reader = BatchedReader(**reader)
+    elif reader.num_threads:
+        # The intra-op thread pool of the parent is not inherited by the fork.
+        import torch
+
+        torch.set_num_threads(reader.num_threads)
+    worker_reader = reader
+
+
+def score_batch_in_worker(batch: list) -> List[Span]:
+    return worker_reader.score_batch(batch)
+
+
+class ShardedReader(BatchedReader):
+    def __init__(
+        self,
+        model: str = DEFAULT_QA_MODEL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+        doc_stride: int = DEFAULT_DOC_STRIDE,
+        max_answer_length: int = DEFAULT_MAX_ANSWER_LENGTH,
+        backend: str = DEFAULT_READER_BACKEND,
+        num_threads: Optional[int] = None,
+        workers: int = DEFAULT_READER_WORKERS,
+    ):
+        """
+        Reader spreading the forward passes of a query batch over a pool of
+        worker processes, each holding the model once.
+
+        The parent tokenizes and builds the windows, the batches of windows are
+        scored by the workers in parallel, and the best spans are merged back
+        by score in batch order, so answers are the same as with one process.
+        Where fork is available, PyTorch models are loaded once by the parent
+        and their weights shared copy-on-write by the workers; otherwise, and
+        for ONNX Runtime sessions, which do not survive a fork, each worker
+        loads its own.
+
+        The pool is forked when the reader is built, so it must be built before
+        any other thread that may hold a lock, such as a download thread, is
+        started.
+
+        Args:
+            model (str): Name or path of a question-answering model.
+            batch_size (int): Number of windows per forward pass.
+            max_seq_length (int): Maximum number of tokens of a window.
+            doc_stride (int): Number of tokens shared by consecutive windows of a
+                long passage.
+            max_answer_length (int): Maximum number of tokens of an answer.
+            backend (str): Inference backend, 'transformers', 'quantized' or
+                'onnx'.
+            num_threads (int, optional): Number of intra-op threads of each
+                worker, the CPU count divided by `workers` by default.
+            workers (int): Number of worker processes.
+        """
+        self.workers = max(1, workers)
+        if not num_threads:
+            num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        start_method = "fork"
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = "spawn"
+        self.share_weights = start_method == "fork" and backend in FORK_SAFE_BACKENDS
+        super().__init__(
+            model=model,
+            batch_size=batch_size,
+            max_seq_length=max_seq_length,
+            doc_stride=doc_stride,
+            max_answer_length=max_answer_length,
+            backend=backend,
+            num_threads=num_threads,
+        )
+
+        worker_setup = self
+        if not self.share_weights:
+            worker_setup = {
+                "model": model,
+                "batch_size": batch_size,
+                "max_seq_length": max_seq_length,
+                "doc_stride": doc_stride,
+                "max_answer_length": max_answer_length,
+                "backend": backend,
+                "num_threads": num_threads,
+            }
+        # The pool is started before the parent runs the model, so the workers
+        # never inherit a busy intra-op thread pool.
+        self.pool = multiprocessing.get_context(start_method).Pool(
+            self.workers, initializer=init_reader_worker, initargs=(worker_setup,)
+        )
+
+    def load_backend(self):
+        # The parent only holds the model when the workers share it, otherwise
+        # it only does the one-off work, so workers do not race to do it.
+        if self.share_weights:
+            return super().load_backend()
+        prepare_reader_backend(self.backend_name, self.model_name)
+        return None
+
+    def score_batches(self, batches: List[list]) -> Iterator[List[Span]]:
+        """
+        Score the batches on the worker processes.
+
+        Args:
+            batches (List[list]): Batches of features, as built by
+                `build_features`.
+
+        Returns:
+            Iterator[List[Span]]: Spans of each batch, in order.
+        """
+        if not metrics.enabled:
+            yield from self.pool.imap(score_batch_in_worker, batches)
+            return
+
+        # Worker processes have their own registry, so their measurements are
+        # sent back with each result.
+        for spans, report in self.pool.imap(
+            partial(call_with_metrics, score_batch_in_worker), batches
+        ):
+            metrics.merge(report)
+            yield spans
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        self.pool.terminate()
+        self.pool.join()
@@ -0,0 +1,263 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+DEFAULT_PASSAGE_SIZE = 200
+DEFAULT_PASSAGE_OVERLAP = 50
+DEFAULT_TOP_K = 5
+DEFAULT_READ_CHUNK_SIZE = 64 * 1024
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+WORD_PATTERN = re.compile(r"\S+")
+
+# Separates pages in extracted text; it is whitespace, so it never ends up
+# inside a word or a token.
+PAGE_SEPARATOR = "\f"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        List[str]: List of lowercase tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Passage:
+    __slots__ = ("text", "document_id", "page", "start", "end")
+
+    def __init__(
+        self,
+        text: str,
+        page: int,
+        start: int,
+        end: int,
+        document_id: Optional[str] = None,
+    ):
+        """
+        A passage of a document, with its location in the document text.
+
+        Slots keep records small, as the corpus holds one per passage.
+
+        Args:
+            text (str): Text of the passage, as it appears in the document.
+            page (int): Page the passage starts on, counting from 1.
+            start (int): Offset of the first character in the document text.
+            end (int): Offset past the last character in the document text.
+            document_id (str, optional): ID of the document.
+        """
+        self.text = text
+        self.page = page
+        self.start = start
+        self.end = end
+        self.document_id = document_id
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Passage):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Passage(document_id={self.document_id!r}, page={self.page}, "
+            f"start={self.start}, end={self.end}, text={self.text!r})"
+        )
+
+    def page_at(self, offset: int) -> int:
+        """
+        Find the page of a character of the passage.
+
+        Args:
+            offset (int): Offset of the character in the passage text.
+
+        Returns:
+            int: Page of the character, counting from 1.
+        """
+        return self.page + self.text.count(PAGE_SEPARATOR, 0, offset)
+
+
+def iter_pages(
+    text_file: TextIO, chunk_size: int = DEFAULT_READ_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Read the pages of a text file, pages being separated by `PAGE_SEPARATOR`.
+
+    The file is read in chunks, so only the page being read is held in memory.
+
+    Args:
+        text_file (TextIO): Text file, as written by the text extraction.
+        chunk_size (int): Number of characters read at a time.
+
+    Returns:
+        Iterator[str]: Text of each page.
+    """
+    page = ""
+    for chunk in iter(lambda: text_file.read(chunk_size), ""):
+        page += chunk
+        if PAGE_SEPARATOR not in chunk:
+            continue
+        *pages, page = page.split(PAGE_SEPARATOR)
+        yield from pages
+    yield page
+
+
+def iter_passages(
+    pages: Iterable[str],
+    passage_size: int = DEFAULT_PASSAGE_SIZE,
+    overlap: int = DEFAULT_PASSAGE_OVERLAP,
+) -> Iterator[Passage]:
+    """
+    Split the pages of a document into passages of at most `passage_size` words.
+
+    Pages are consumed one at a time and only the words of the passage being
+    built are held in memory. Offsets refer to the document text with pages
+    joined by `PAGE_SEPARATOR`, and passage texts are slices of it, so an
+    answer found in a passage maps back to an exact span of the document.
+
+    Args:
+        pages (Iterable[str]): Text of each page of the document.
+        passage_size (int): Maximum number of words per passage.
+        overlap (int): Number of words shared by consecutive passages.
+
+    Returns:
+        Iterator[Passage]: Passages, in document order.
+    """
+    if passage_size <= 0:
+        raise ValueError("passage_size must be a positive integer.")
+
+    overlap = max(0, min(overlap, passage_size - 1))
+    step = passage_size - overlap
+    # Start offset, end offset and page of each word not yet fully consumed,
+    # and the raw text from the first of them.
+    words: List[Tuple[int, int, int]] = []
+    buffer = ""
+    buffer_start = 0
+    offset = 0
+
+    def make_passage(first: int, last: int) -> Passage:
+        start, end = words[first][0], words[last - 1][1]
+        text_start, text_end = start - buffer_start, end - buffer_start
+        return Passage(buffer[text_start:text_end], words[first][2], start, end)
+
+    for page, text in enumerate(pages, start=1):
+        if page > 1:
+            buffer += PAGE_SEPARATOR
+            offset += len(PAGE_SEPARATOR)
+        buffer += text
+        words.extend(
+            (offset + match.start(), offset + match.end(), page)
+            for match in WORD_PATTERN.finditer(text)
+        )
+        offset += len(text)
+
+        first = 0
+        # A passage is only complete once a word past its end is known, as
+        # the last passage of the document may be shorter.
+        while len(words) - first > passage_size:
+            yield make_passage(first, first + passage_size)
+            first += step
+        del words[:first]
+
+        if words:
+            consumed = words[0][0] - buffer_start
+            buffer = buffer[consumed:]
+            buffer_start = words[0][0]
+        else:
+            buffer, buffer_start = "", offset
+
+    if words:
+        yield make_passage(0, len(words))
+
+
+def split_into_passages(
+    text: str,
+    passage_size: int = DEFAULT_PASSAGE_SIZE,
+    overlap: int = DEFAULT_PASSAGE_OVERLAP,
+) -> List[str]:
+    """
+    Split a text into passages of at most `passage_size` words.
+
+    Consecutive passages share `overlap` words so that an answer sitting on a
+    passage boundary is still fully contained in one of them.
+
+    Args:
+        text (str): Text to split.
+        passage_size (int): Maximum number of words per passage.
+        overlap (int): Number of words shared by consecutive passages.
+
+    Returns:
+        List[str]: List of passages, in document order.
+    """
+    return [passage.text for passage in iter_passages([text], passage_size, overlap)]
+
+
+class BM25Index:
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Build an Okapi BM25 index over a list of passages.
+
+        Args:
+            passages (List[str]): Passages to index.
+            k1 (float): Term frequency saturation parameter.
+            b (float): Document length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+        self.passage_count = len(passages)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.passage_lengths: List[int] = []
+
+        for passage_id, passage in enumerate(passages):
+            term_frequencies = Counter(tokenize(passage))
+            self.passage_lengths.append(sum(term_frequencies.values()))
+            for term, frequency in term_frequencies.items():
+                self.postings[term].append((passage_id, frequency))
+
+        total_length = sum(self.passage_lengths)
+        self.average_length = (
+            total_length / self.passage_count if self.passage_count else 0.0
+        )
+        self.idf = {
+            term: math.log(
+                1 + (self.passage_count - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Tuple[int, float]]:
+        """
+        Find the passages that best match a query.
+
+        Args:
+            query (str): Natural language query.
+            top_k (int): Maximum number of passages to return.
+
+        Returns:
+            List[Tuple[int, float]]: Passage indexes and BM25 scores, best first.
+                Passages that share no term with the query are never returned.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for passage_id, frequency in self.postings[term]:
+                length_norm = (
+                    1
+                    - self.b
+                    + self.b * (self.passage_lengths[passage_id] / self.average_length)
+                )
+                scores[passage_id] += idf * (
+                    frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k]
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from hudson_utils.instrumentation import metrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 10
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Error"}
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        answer_queries: Callable[[List[str]], List[Dict]],
+        executor: ThreadPoolExecutor,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ):
+        """
+        Coalesce queries that arrive close together into a single model call.
+
+        The first pending query opens a batch, which is closed after
+        `max_wait_ms` or once it holds `max_batch_size` queries.
+
+        Args:
+            answer_queries (Callable[[List[str]], List[Dict]]): Function answering
+                a list of queries, run on `executor`.
+            executor (ThreadPoolExecutor): Executor running the model calls.
+            max_batch_size (int): Maximum number of queries per model call.
+            max_wait_ms (float): Maximum time a query waits for others to join it.
+        """
+        self.answer_queries = answer_queries
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def answer(self, query: str) -> Dict:
+        """
+        Answer a query as part of the next batch.
+
+        Args:
+            query (str): Natural language query.
+
+        Returns:
+            Dict: Result of the query.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            queries = [query for query, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.answer_queries, queries
+                )
+            except Exception as e:
+                logging.error(f"Error answering a batch of queries: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class QueryServer:
+    def __init__(
+        self,
+        answer_queries: Callable[[List[str]], List[Dict]],
+        refresh: Optional[Callable[[], None]] = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        metrics_format: Optional[str] = None,
+    ):
+        """
+        HTTP/JSON server keeping the corpus and the QA model resident.
+
+        Endpoints:
+            POST /query: {"query": "..."} or {"queries": [...]}, answered through
+                the micro-batcher.
+            POST /refresh: re-ingest the documents changed since the last refresh.
+            GET /health: liveness check.
+            GET /metrics: instrumentation report, when `metrics_format` is set.
+
+        Model calls and refreshes run one at a time on a dedicated thread, so
+        the corpus never changes under a running batch.
+
+        Args:
+            answer_queries (Callable[[List[str]], List[Dict]]): Function answering
+                a list of queries against the ingested corpus.
+            refresh (Callable[[], None], optional): Function re-ingesting the
+                folder.
+            host (str): Interface to listen on.
+            port (int): Port to listen on, 0 for any free port.
+            max_batch_size (int): Maximum number of queries per model call.
+            max_wait_ms (float): Maximum time a query waits for others to join it.
+            metrics_format (str, optional): 'json' or 'prometheus' to serve the
+                instrumentation report.
+        """
+        self.refresh = refresh
+        self.metrics_format = metrics_format
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batcher = MicroBatcher(
+            answer_queries, self.executor, max_batch_size, max_wait_ms
+        )
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"Query server listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+        self.executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, body = await self.read_request(reader)
+            status, payload = await self.route(method, path, body)
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            logging.error(f"Error handling request: {str(e)}")
+            status, payload = 500, {"error": str(e)}
+
+        if isinstance(payload, str):
+            content_type = "text/plain; version=0.0.4"
+            content = payload.encode("utf-8")
+        else:
+            content_type = "application/json"
+            content = json.dumps(payload).encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + content
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("Malformed request line.")
+
+        content_length = 0
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+
+        body = await reader.readexactly(content_length) if content_length else b""
+        return request_line[0].upper(), request_line[1], body
+
+    async def route(
+        self, method: str, path: str, body: bytes
+    ) -> Tuple[int, Union[Dict, str]]:
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+
+        if method == "GET" and path == "/metrics" and self.metrics_format:
+            if self.metrics_format == "json":
+                return 200, metrics.report()
+            return 200, metrics.export(self.metrics_format)
+
+        if method == "POST" and path == "/query":
+            request = json.loads(body or b"{}")
+            if "query" in request:
+                return 200, await self.batcher.answer(str(request["query"]))
+            queries = request.get("queries")
+            if not isinstance(queries, list):
+                raise ValueError("Expected a 'query' string or a 'queries' list.")
+            results = await asyncio.gather(
+                *(self.batcher.answer(str(query)) for query in queries)
+            )
+            return 200, {"results": list(results)}
+
+        if method == "POST" and path == "/refresh" and self.refresh is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.refresh)
+            return 200, {"status": "refreshed"}
+
+        return 404, {"error": f"No route for {method} {path}."}
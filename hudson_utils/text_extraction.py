@@ -0,0 +1,123 @@
+from io import BytesIO
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Union
+
+from hudson_utils.instrumentation import metrics
+from hudson_utils.retrieval import (
+    DEFAULT_PASSAGE_SIZE,
+    PAGE_SEPARATOR,
+    Passage,
+    iter_passages,
+)
+
+
+class TextExtractor:
+    def extract_text(self, file_bytes: bytes, mime_type: str) -> str:
+        with BytesIO(file_bytes) as bytes_io:
+            return PAGE_SEPARATOR.join(self.iter_page_texts(bytes_io, mime_type))
+
+    @staticmethod
+    def iter_page_texts(file: Union[str, BinaryIO], mime_type: str) -> Iterator[str]:
+        """
+        Extract the text of a file one page at a time.
+
+        PDF pages are parsed lazily and released once read, so memory use does
+        not grow with the number of pages.
+
+        Args:
+            file (str or BinaryIO): Path or binary file object of the document.
+            mime_type (str): Google Drive mime type of the file.
+
+        Returns:
+            Iterator[str]: Text of each page. Google Docs yield a single text.
+        """
+        import pdfplumber
+        from docx2txt import process
+
+        if mime_type == "application/vnd.google-apps.document":
+            metrics.increment("extract.docx_documents")
+            with metrics.span("extract.docx"):
+                text = process(file)
+            yield text
+        elif mime_type == "application/pdf":
+            with pdfplumber.open(file) as pdf:
+                for page in pdf.pages:
+                    metrics.increment("extract.pdf_pages")
+                    with metrics.span("extract.pdf_page"):
+                        text = page.extract_text() or ""
+                        page.close()
+                    yield text
+
+
+def spool_texts(texts: Iterable[str], text_path: Optional[str]) -> Iterator[str]:
+    # Writes the texts passing through, separated by PAGE_SEPARATOR, so the full
+    # text can be cached without ever being held in memory.
+    if text_path is None:
+        yield from texts
+        return
+
+    with open(text_path, "w", encoding="utf-8") as text_file:
+        for position, text in enumerate(texts):
+            if position:
+                text_file.write(PAGE_SEPARATOR)
+            text_file.write(text)
+            yield text
+
+
+def extract_text(file_bytes: bytes, mime_type: str) -> str:
+    """
+    Extract the text of a downloaded file.
+
+    Module-level entry point so extraction can be shipped to worker processes
+    without importing the QA model there.
+
+    Args:
+        file_bytes (bytes): Content of the file.
+        mime_type (str): Google Drive mime type of the file.
+
+    Returns:
+        str: Extracted text.
+    """
+    return TextExtractor().extract_text(file_bytes, mime_type)
+
+
+def extract_text_from_file(
+    path: str, mime_type: str, text_path: Optional[str] = None
+) -> str:
+    """
+    Extract the text of a file spooled to disk.
+
+    Args:
+        path (str): Path of the downloaded file.
+        mime_type (str): Google Drive mime type of the file.
+        text_path (str, optional): File the extracted text is also written to.
+
+    Returns:
+        str: Extracted text, pages separated by PAGE_SEPARATOR.
+    """
+    pages = TextExtractor.iter_page_texts(path, mime_type)
+    return PAGE_SEPARATOR.join(spool_texts(pages, text_path))
+
+
+def extract_passages_from_file(
+    path: str,
+    mime_type: str,
+    text_path: Optional[str] = None,
+    passage_size: int = DEFAULT_PASSAGE_SIZE,
+) -> List[Passage]:
+    """
+    Split a file spooled to disk into passages, page by page.
+
+    The text of the whole document is never built, so peak memory depends on
+    the largest page rather than on the size of the document.
+
+    Args:
+        path (str): Path of the downloaded file.
+        mime_type (str): Google Drive mime type of the file.
+        text_path (str, optional): File the extracted text is also written to.
+        passage_size (int): Maximum number of words per passage.
+
+    Returns:
+        List[Passage]: Passages of the document, in order.
+    """
+    pages = TextExtractor.iter_page_texts(path, mime_type)
+    return list(iter_passages(spool_texts(pages, text_path), passage_size))
@@ -1,87 +1,717 @@
-from io import BytesIO
-from typing import Dict, List, Optional
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from functools import partial
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
-import pdfplumber
-from docx2txt import process
 from googleapiclient.discovery import build
-from transformers import logging, pipeline
+from googleapiclient.http import MediaIoBaseDownload
 
-logging.set_verbosity_error()
+from hudson_utils.answer_cache import (
+    AnswerCache,
+    corpus_fingerprint,
+    normalize_query,
+)
+from hudson_utils.dedup import DEFAULT_DEDUP_THRESHOLD, PassageDeduplicator
+from hudson_utils.document_cache import REVISION_FIELDS, DocumentTextCache
+from hudson_utils.drive_clients import DriveClientPool
+from hudson_utils.drive_requests import DriveRequestExecutor
+from hudson_utils.instrumentation import call_with_metrics, metrics
+from hudson_utils.lazy_loading import BackgroundLoader
+from hudson_utils.reader import DEFAULT_BATCH_SIZE, DEFAULT_QA_MODEL, BatchedReader
+from hudson_utils.reader_backends import DEFAULT_READER_BACKEND
+from hudson_utils.reader_pool import DEFAULT_READER_WORKERS, ShardedReader
+from hudson_utils.retrieval import (
+    DEFAULT_PASSAGE_SIZE,
+    DEFAULT_TOP_K,
+    BM25Index,
+    Passage,
+    iter_pages,
+    iter_passages,
+)
+from hudson_utils.text_extraction import (
+    extract_passages_from_file,
+    extract_text_from_file,
+)
+
+DEFAULT_DOWNLOAD_WORKERS = 8
+DEFAULT_EXTRACTION_WORKERS = os.cpu_count() or 1
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def remove_files(*paths: Optional[str]):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
 
 
 class DriveServiceWrapper:
-    def __init__(self, drive_service: build):
+    def __init__(
+        self,
+        drive_service: build,
+        http_factory: Optional[Callable[[], Any]] = None,
+        request_executor: Optional[DriveRequestExecutor] = None,
+    ):
         self.drive_service = drive_service
+        self.request_executor = request_executor or DriveRequestExecutor()
+        # httplib2 transports are not thread-safe, so each download thread gets
+        # its own when a factory is provided.
+        self.http_factory = http_factory
+        self.local = threading.local()
 
-    def get_file_metadata(self, file_id: str) -> Optional[Dict]:
-        try:
-            return self.drive_service.files().get(fileId=file_id).execute()
-        except Exception as e:
-            logging.error(f"Error retrieving file metadata for ID {file_id}: {str(e)}")
+    def thread_http(self) -> Optional[Any]:
+        if self.http_factory is None:
             return None
+        if not hasattr(self.local, "http"):
+            self.local.http = self.http_factory()
+        return self.local.http
 
-    def download_file(self, file_id: str, mime_type: str) -> bytes:
+    def media_request(self, file_id: str, mime_type: str):
         if mime_type == "application/vnd.google-apps.document":
-            response = self.drive_service.files().export(
+            return self.drive_service.files().export_media(
                 fileId=file_id,
                 mimeType="application/vnd.openxmlformats-officedocument.wordprocessingml.document",  # noqa E501
             )
         elif mime_type == "application/pdf":
-            response = self.drive_service.files().get_media(fileId=file_id)
+            return self.drive_service.files().get_media(fileId=file_id)
+        raise ValueError(f"Unsupported mime type '{mime_type}'.")
 
-        return response.execute()
+    def download_to_file(
+        self,
+        file_id: str,
+        mime_type: str,
+        file: BinaryIO,
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+    ):
+        """
+        Download a file in chunks, writing each chunk to `file` as it arrives,
+        so the content is never held in memory as a whole. A chunk failing with
+        a transient error is requested again.
 
+        Args:
+            file_id (str): ID of the file in Google Drive.
+            mime_type (str): Google Drive mime type of the file.
+            file (BinaryIO): Binary file object the content is written to.
+            chunk_size (int): Number of bytes requested per chunk.
+        """
+        request = self.media_request(file_id, mime_type)
+        http = self.thread_http()
+        if http is not None:
+            request.http = http
 
-class TextExtractor:
-    def extract_text(self, file_bytes: bytes, mime_type: str) -> str:
-        if mime_type == "application/vnd.google-apps.document":
-            return process(BytesIO(file_bytes))
-        elif mime_type == "application/pdf":
-            with BytesIO(file_bytes) as bytes_io, pdfplumber.open(bytes_io) as pdf:
-                return "".join(page.extract_text() or "" for page in pdf.pages)
+        downloader = MediaIoBaseDownload(file, request, chunksize=chunk_size)
+        done = False
+        downloaded = 0
+        with metrics.span("drive.download"):
+            while not done:
+                metrics.increment("drive.api_calls")
+                status, done = self.request_executor.call(downloader.next_chunk)
+                metrics.increment(
+                    "drive.bytes_downloaded", status.resumable_progress - downloaded
+                )
+                downloaded = status.resumable_progress
 
 
 class TextProcessor:
-    def __init__(self, drive_service: build, threshold: float):
-        self.drive_service_wrapper = DriveServiceWrapper(drive_service)
-        self.text_extractor = TextExtractor()
-        self.qa_pipeline = pipeline(
-            "question-answering",
-            model="bert-large-uncased-whole-word-masking-finetuned-squad",
-            threshold=threshold,
+    def __init__(
+        self,
+        drive_service: build,
+        threshold: float,
+        top_k: int = DEFAULT_TOP_K,
+        passage_size: int = DEFAULT_PASSAGE_SIZE,
+        document_cache: Optional[DocumentTextCache] = None,
+        credentials=None,
+        download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        extraction_workers: int = DEFAULT_EXTRACTION_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        token_cache_dir: Optional[str] = None,
+        reader_backend: str = DEFAULT_READER_BACKEND,
+        reader_threads: Optional[int] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        model: str = DEFAULT_QA_MODEL,
+        request_executor: Optional[DriveRequestExecutor] = None,
+        client_pool: Optional[DriveClientPool] = None,
+        reader_workers: int = DEFAULT_READER_WORKERS,
+        cascade_model: Optional[str] = None,
+        dedup_threshold: Optional[float] = DEFAULT_DEDUP_THRESHOLD,
+    ):
+        self.threshold = threshold
+        self.top_k = top_k
+        self.passage_size = passage_size
+        self.document_cache = document_cache
+        self.download_workers = max(1, download_workers)
+        self.extraction_workers = max(1, extraction_workers)
+        if client_pool is None and credentials is not None:
+            client_pool = DriveClientPool(credentials)
+        http_factory = client_pool.http if client_pool is not None else None
+        self.drive_service_wrapper = DriveServiceWrapper(
+            drive_service, http_factory, request_executor
+        )
+        # Passages of every ingested document, keyed by document ID, so repeat
+        # ingests only extract documents that are new or have a new revision.
+        self.document_passages: Dict[str, Tuple[Dict[str, str], List[Passage]]] = {}
+        # The corpus: passage texts, as indexed and read, and a parallel list of
+        # records locating each passage in its document.
+        self.documents: Dict[str, Dict[str, str]] = {}
+        self.passages: List[str] = []
+        self.passage_records: List[Passage] = []
+        # Other copies of the passages collapsed as duplicates, keyed by the
+        # index of the passage kept.
+        self.duplicate_records: Dict[int, List[Passage]] = {}
+        self.deduplicator = None
+        if dedup_threshold is not None:
+            self.deduplicator = PassageDeduplicator(dedup_threshold)
+        self.index = BM25Index([])
+        self.token_cache_dir = token_cache_dir
+        self.tokenized_corpus = None
+        self.cascade_tokenized_corpus = None
+        self.answer_cache = answer_cache
+        # Everything besides the documents that changes the answers.
+        self.answer_settings = (
+            model,
+            reader_backend,
+            top_k,
+            passage_size,
+            # Which passages are collapsed changes the sources of the answers.
+            dedup_threshold,
         )
+        if cascade_model:
+            self.answer_settings += (cascade_model, threshold)
+        self.corpus_fingerprint = corpus_fingerprint([], self.answer_settings)
+        # The model is only loaded when first needed, or ahead of time with
+        # load_reader_in_background, so it never delays authentication or listing.
+        reader_class = BatchedReader
+        self.reader_workers = reader_workers
+        if reader_workers > 1:
+            reader_class = partial(ShardedReader, workers=reader_workers)
+        reader_factory = partial(
+            reader_class,
+            batch_size=batch_size,
+            backend=reader_backend,
+            num_threads=reader_threads,
+        )
+        self.reader_loader = BackgroundLoader(partial(reader_factory, model=model))
+        # In cascade mode, queries are first read by a small model, and only the
+        # ones it answers below the threshold are escalated to `model`.
+        self.cascade_loader = None
+        if cascade_model:
+            self.cascade_loader = BackgroundLoader(
+                partial(reader_factory, model=cascade_model)
+            )
+        self.cascaded_queries = 0
+        self.escalated_queries = 0
+
+    @property
+    def reader(self) -> BatchedReader:
+        return self.reader_loader.get()
+
+    @property
+    def cascade_reader(self) -> BatchedReader:
+        return self.cascade_loader.get()
+
+    def load_reader_in_background(self):
+        """
+        Start loading the QA models in background threads, so they overlap with
+        listing and downloading documents.
+
+        Readers with worker processes are loaded right away instead: their pool
+        is forked, which is only safe before the Drive threads start, as a fork
+        taken while another thread holds a lock can deadlock the children.
+        """
+        loaders = [self.reader_loader]
+        if self.cascade_loader:
+            loaders.insert(0, self.cascade_loader)
+        for loader in loaders:
+            if self.reader_workers > 1:
+                loader.get()
+        for loader in loaders:
+            loader.start()
+
+    def close(self):
+        """
+        Stop the worker processes of the readers already loaded.
+        """
+        for loader in (self.reader_loader, self.cascade_loader):
+            if loader and loader.loaded and loader.error is None:
+                loader.value.close()
+
+    def fetch_document(
+        self, document: Dict[str, str]
+    ) -> Union[TextIO, Tuple[Dict[str, str], str]]:
+        """
+        Open the cached text of a document, or spool it to a temporary file when
+        not cached.
+
+        The document metadata from the folder listing is used as is, so no
+        extra metadata request is made per document.
+
+        Returns:
+            The open cached text file, or a (metadata, file path) tuple to be
+            extracted. The caller closes the cached file, or removes the spooled
+            one once extracted.
+        """
+        if self.document_cache and DocumentTextCache.has_revision(document):
+            cached_file = self.document_cache.open(document)
+            if cached_file is not None:
+                return cached_file
+
+        spool_fd, spool_path = tempfile.mkstemp(prefix="hudson-download-")
+        try:
+            with os.fdopen(spool_fd, "wb") as spool_file:
+                self.drive_service_wrapper.download_to_file(
+                    document["id"], document["mime_type"], spool_file
+                )
+        except BaseException:
+            os.remove(spool_path)
+            raise
+        return document, spool_path
+
+    def text_spool_path(self, document: Dict[str, str]) -> Optional[str]:
+        # Extracted text is only written out when it can be cached.
+        if not self.document_cache or not DocumentTextCache.has_revision(document):
+            return None
+        text_fd, text_path = tempfile.mkstemp(prefix="hudson-text-")
+        os.close(text_fd)
+        return text_path
+
+    def store_text_file(self, file_metadata: Dict[str, str], text_path: str):
+        if self.document_cache and os.path.getsize(text_path):
+            self.document_cache.put_file(file_metadata, text_path)
 
     def process_document(self, document: Dict[str, str]) -> str:
-        file_metadata = self.drive_service_wrapper.get_file_metadata(document["id"])
-        if not file_metadata:
-            return ""
+        fetched = self.fetch_document(document)
+        if not isinstance(fetched, tuple):
+            with fetched as cached_file:
+                return cached_file.read()
 
-        file_bytes = self.drive_service_wrapper.download_file(
-            document["id"], document["mime_type"]
+        file_metadata, spool_path = fetched
+        text_path = self.text_spool_path(document)
+        try:
+            text = extract_text_from_file(spool_path, document["mime_type"], text_path)
+            if text_path:
+                self.store_text_file(file_metadata, text_path)
+            return text
+        finally:
+            remove_files(spool_path, text_path)
+
+    def extraction_executor(self) -> Executor:
+        if self.extraction_workers == 1:
+            return ThreadPoolExecutor(max_workers=1)
+        # Workers are spawned rather than forked: forking while download threads
+        # hold locks can deadlock the children.
+        return ProcessPoolExecutor(
+            max_workers=self.extraction_workers,
+            mp_context=multiprocessing.get_context("spawn"),
         )
-        return self.text_extractor.extract_text(file_bytes, document["mime_type"])
+
+    def extract_documents(
+        self,
+        documents: List[Dict[str, str]],
+        extract_file: Callable[..., Any],
+        from_cached_text: Callable[[str], Any],
+        empty: Callable[[], Any],
+    ) -> List[Any]:
+        """
+        Download and extract documents concurrently.
+
+        Downloads run on a bounded thread pool and are spooled to temporary
+        files, which are extracted on a process pool, so network waits overlap
+        with PDF/DOCX parsing and file contents never cross process boundaries.
+        A failing document is logged and yields an empty result without
+        affecting the others.
+
+        Args:
+            documents (List[Dict[str, str]]): Documents to extract.
+            extract_file (Callable): Picklable function called with a file path,
+                its mime type and the path the text is cached through.
+            from_cached_text (Callable[[TextIO], Any]): Builds a result from the
+                open cached text file of a document.
+            empty (Callable[[], Any]): Builds the result of a failed document.
+
+        Returns:
+            List: Results, in the same order as `documents`.
+        """
+        results = [empty() for _ in documents]
+        if not documents:
+            return results
+
+        with ThreadPoolExecutor(
+            max_workers=self.download_workers
+        ) as download_executor, self.extraction_executor() as extraction_executor:
+            # Worker processes have their own registry, so their measurements
+            # are sent back with each result.
+            instrument_workers = metrics.enabled and isinstance(
+                extraction_executor, ProcessPoolExecutor
+            )
+            download_futures = {
+                download_executor.submit(self.fetch_document, document): position
+                for position, document in enumerate(documents)
+            }
+            extraction_futures = {}
+            for future in as_completed(download_futures):
+                position = download_futures[future]
+                document = documents[position]
+                try:
+                    fetched = future.result()
+                except Exception as e:
+                    logging.error(
+                        f"Error downloading document '{document.get('title')}' "
+                        f"(ID {document['id']}): {str(e)}"
+                    )
+                    continue
+
+                if not isinstance(fetched, tuple):
+                    try:
+                        with fetched as cached_file:
+                            results[position] = from_cached_text(cached_file)
+                    except Exception as e:
+                        logging.error(
+                            f"Error reading cached text of document "
+                            f"'{document.get('title')}' (ID {document['id']}): "
+                            f"{str(e)}"
+                        )
+                        self.document_cache.invalidate(document["id"])
+                    continue
+
+                file_metadata, spool_path = fetched
+                text_path = self.text_spool_path(document)
+                extraction_args = (extract_file, spool_path, document["mime_type"])
+                if instrument_workers:
+                    extraction_args = (call_with_metrics,) + extraction_args
+                extraction_future = extraction_executor.submit(
+                    *extraction_args, text_path
+                )
+                extraction_futures[extraction_future] = (
+                    position,
+                    file_metadata,
+                    spool_path,
+                    text_path,
+                )
+
+            for future in as_completed(extraction_futures):
+                position, file_metadata, spool_path, text_path = extraction_futures[
+                    future
+                ]
+                document = documents[position]
+                try:
+                    result = future.result()
+                    if instrument_workers:
+                        result, report = result
+                        metrics.merge(report)
+                    if result:
+                        results[position] = result
+                        if text_path:
+                            self.store_text_file(file_metadata, text_path)
+                except Exception as e:
+                    logging.error(
+                        f"Error extracting text from document "
+                        f"'{document.get('title')}' (ID {document['id']}): {str(e)}"
+                    )
+                finally:
+                    remove_files(spool_path, text_path)
+
+        if self.document_cache:
+            # Cache hits only update access times in memory; they are saved
+            # once per batch of documents.
+            self.document_cache.flush()
+        return results
+
+    def extract_texts(self, documents: List[Dict[str, str]]) -> List[str]:
+        """
+        Download and extract the full text of documents concurrently.
+
+        Returns:
+            List[str]: Extracted texts, in the same order as `documents`, empty
+                for documents that failed.
+        """
+        return self.extract_documents(
+            documents, extract_text_from_file, lambda text_file: text_file.read(), str
+        )
+
+    def extract_passages(self, documents: List[Dict[str, str]]) -> List[List[Passage]]:
+        """
+        Download documents concurrently and split them into passages page by
+        page, without building the text of whole documents.
+
+        Returns:
+            List[List[Passage]]: Passages of each document, in the same order as
+                `documents`, empty for documents that failed.
+        """
+        return self.extract_documents(
+            documents,
+            partial(extract_passages_from_file, passage_size=self.passage_size),
+            self.split_cached_file,
+            list,
+        )
+
+    def split_cached_file(self, text_file: TextIO) -> List[Passage]:
+        return list(iter_passages(iter_pages(text_file), self.passage_size))
 
     def extract_text_from_documents(self, documents: List[Dict[str, str]]) -> str:
-        combined_text = ""
+        return "".join(text + "\n" for text in self.extract_texts(documents) if text)
+
+    def needs_ingest(self, document: Dict[str, str]) -> bool:
+        stored = self.document_passages.get(document["id"])
+        if stored is None or not DocumentTextCache.has_revision(document):
+            return True
+        return any(
+            stored[0].get(field) != document.get(field) for field in REVISION_FIELDS
+        )
+
+    def update_corpus(
+        self,
+        documents: List[Dict[str, str]],
+        removed_ids: Optional[List[str]] = None,
+    ):
+        """
+        Bring the passage store and its index in line with a document list.
+
+        Only documents that are new or whose revision changed are extracted
+        again. Stored documents that are no longer listed, or are explicitly
+        removed, are dropped along with their passages.
+
+        Args:
+            documents (List[Dict[str, str]]): Documents currently in the corpus.
+            removed_ids (List[str], optional): IDs of documents known to have been
+                deleted, whose cached text is invalidated as well.
+        """
+        listed_ids = {document["id"] for document in documents}
+        dropped_ids = [
+            document_id
+            for document_id in self.document_passages
+            if document_id not in listed_ids
+        ]
+        for document_id in dropped_ids:
+            del self.document_passages[document_id]
+        for document_id in removed_ids or []:
+            if self.document_cache:
+                self.document_cache.invalidate(document_id)
+
+        stale_documents = [
+            document for document in documents if self.needs_ingest(document)
+        ]
+        metrics.increment("ingest.documents_extracted", len(stale_documents))
+        with metrics.span("ingest.extract"):
+            extracted = self.extract_passages(stale_documents)
+        for document, passages in zip(stale_documents, extracted):
+            if passages:
+                for passage in passages:
+                    passage.document_id = document["id"]
+                self.document_passages[document["id"]] = (document, passages)
+            else:
+                self.document_passages.pop(document["id"], None)
+
+        # The fingerprint only covers the documents actually ingested, so
+        # answers given while a document failed to download or extract are not
+        # served once it is ingested.
+        ingested_documents = [
+            self.document_passages[document["id"]][0]
+            for document in documents
+            if document["id"] in self.document_passages
+        ]
+        self.corpus_fingerprint = corpus_fingerprint(
+            ingested_documents, self.answer_settings
+        )
+        if self.answer_cache:
+            # Answers given against any other version of the corpus are stale.
+            self.answer_cache.retain(self.corpus_fingerprint)
+
+        if not dropped_ids and not stale_documents and self.passages:
+            return
+
+        self.documents = {}
+        records = []
         for document in documents:
-            text = self.process_document(document)
-            if text:
-                combined_text += text + "\n"
-        return combined_text
+            if document["id"] not in self.document_passages:
+                continue
+            stored_document, passages = self.document_passages[document["id"]]
+            self.documents[document["id"]] = stored_document
+            records.extend(passages)
+        # Copies of the same content across exports and revisions are read once.
+        if self.deduplicator:
+            with metrics.span("ingest.dedup"):
+                groups = self.deduplicator.group([record.text for record in records])
+        else:
+            groups = [[i] for i in range(len(records))]
+        self.passage_records = [records[group[0]] for group in groups]
+        self.passages = [record.text for record in self.passage_records]
+        self.duplicate_records = {
+            passage_id: [records[i] for i in group[1:]]
+            for passage_id, group in enumerate(groups)
+            if len(group) > 1
+        }
+        metrics.increment("ingest.passages", len(self.passages))
+        metrics.increment("ingest.duplicate_passages", len(records) - len(groups))
+        with metrics.span("ingest.index"):
+            self.index = BM25Index(self.passages)
+        with metrics.span("ingest.tokenize"):
+            self.tokenized_corpus = self.reader.tokenize_corpus(
+                self.passages, self.token_cache_dir
+            )
+            if self.cascade_loader:
+                self.cascade_tokenized_corpus = self.cascade_reader.tokenize_corpus(
+                    self.passages, self.token_cache_dir
+                )
 
     def process_queries(
         self, queries: List[str], documents: List[Dict[str, str]]
     ) -> List[Dict[str, str]]:
-        combined_text = self.extract_text_from_documents(documents)
+        self.update_corpus(documents)
+        return self.answer_queries(queries)
+
+    def answer_queries(self, queries: List[str]) -> List[Dict[str, str]]:
+        """
+        Answer queries against the documents already ingested with
+        `update_corpus`.
+
+        Queries answered before against the same corpus are served from the
+        answer cache; the others are answered in a single reader pass.
+
+        Args:
+            queries (List[str]): Natural language queries.
+
+        Returns:
+            List[Dict[str, str]]: One result per query with 'query', 'answer',
+                'confidence', 'source_document' (the document the answer was
+                read from, followed by the other documents holding a duplicate
+                of its passage) and 'source' (its document ID, page, and the
+                start and end offsets of the answer in the document text).
+        """
+        metrics.increment("query.queries", len(queries))
+        if not self.answer_cache:
+            return self.read_answers(queries)
+
+        fingerprint = self.corpus_fingerprint
+        results = [self.answer_cache.get(query, fingerprint) for query in queries]
+        # Repeats of the same question within the batch are only read once.
+        missed: Dict[str, str] = {}
+        for query, result in zip(queries, results):
+            if result is None:
+                missed.setdefault(normalize_query(query), query)
+
+        metrics.increment("answer_cache.hits", len(queries) - len(missed))
+        metrics.increment("answer_cache.misses", len(missed))
+        if missed:
+            for query, result in zip(
+                missed.values(), self.read_answers(list(missed.values()))
+            ):
+                self.answer_cache.put(query, fingerprint, result)
+                missed[normalize_query(query)] = result
+
+        return [
+            (
+                result
+                if result is not None
+                else dict(missed[normalize_query(query)], query=query)
+            )
+            for query, result in zip(queries, results)
+        ]
+
+    def read_answers(self, queries: List[str]) -> List[Dict[str, str]]:
+        passages, passage_records = self.passages, self.passage_records
+        documents = self.documents
+
+        # Passages are kept in corpus order so ties are broken consistently.
+        with metrics.span("query.retrieve"):
+            hits_per_query = [
+                sorted(
+                    passage_id for passage_id, _ in self.index.search(query, self.top_k)
+                )
+                for query in queries
+            ]
+        if self.cascade_loader:
+            answers = self.read_cascade(queries, hits_per_query)
+        else:
+            with metrics.span("query.read"):
+                answers = self.reader.answer_tokenized(
+                    queries, hits_per_query, self.tokenized_corpus, passages
+                )
+
         results = []
-        for i, query in enumerate(queries, 1):
-            answer = self.qa_pipeline(question=query, context=combined_text)
+        for query, hits, answer in zip(queries, hits_per_query, answers):
+            source_documents = []
+            source = None
+            if answer["context_index"] is not None:
+                passage_id = hits[answer["context_index"]]
+                record = passage_records[passage_id]
+                source_documents.append(documents[record.document_id])
+                for duplicate in self.duplicate_records.get(passage_id, []):
+                    duplicate_document = documents[duplicate.document_id]
+                    if duplicate_document not in source_documents:
+                        source_documents.append(duplicate_document)
+                source = {
+                    "document_id": record.document_id,
+                    "page": record.page_at(answer["start"]),
+                    "start": record.start + answer["start"],
+                    "end": record.start + answer["end"],
+                }
             results.append(
                 {
                     "query": query,
-                    "answer": answer["answer"],
+                    # Passages keep the line and page breaks of the document.
+                    "answer": " ".join(answer["answer"].split()),
                     "confidence": answer["score"],
-                    "source_document": documents,
+                    "source_document": source_documents,
+                    "source": source,
                 }
             )
         return results
+
+    def read_cascade(
+        self, queries: List[str], hits_per_query: List[List[int]]
+    ) -> List[Dict[str, object]]:
+        """
+        Read the answers with the small model, escalating to the large model
+        the queries it answers with a score below the threshold.
+
+        Args:
+            queries (List[str]): Natural language queries.
+            hits_per_query (List[List[int]]): Indexes of the retrieved passages
+                of each query.
+
+        Returns:
+            List[Dict[str, object]]: Answers, as returned by `answer_tokenized`.
+        """
+        with metrics.span("query.read_cascade"):
+            answers = self.cascade_reader.answer_tokenized(
+                queries, hits_per_query, self.cascade_tokenized_corpus, self.passages
+            )
+        # Queries without any retrieved passage cannot be answered by either.
+        escalated = [
+            i
+            for i, answer in enumerate(answers)
+            if hits_per_query[i] and answer["score"] < self.threshold
+        ]
+        self.cascaded_queries += len(queries)
+        self.escalated_queries += len(escalated)
+        metrics.increment("query.cascaded", len(queries))
+        metrics.increment("query.escalated", len(escalated))
+        if escalated:
+            with metrics.span("query.read"):
+                escalated_answers = self.reader.answer_tokenized(
+                    [queries[i] for i in escalated],
+                    [hits_per_query[i] for i in escalated],
+                    self.tokenized_corpus,
+                    self.passages,
+                )
+            for i, answer in zip(escalated, escalated_answers):
+                answers[i] = answer
+        return answers
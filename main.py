@@ -1,16 +1,110 @@
+import asyncio
+import atexit
+import os
+import shutil
 import sys
 
 from colorama import Fore
 from colorama import init as colorama_init
 
-from hudson_utils.args import get_from_args
-from hudson_utils.authentication import GoogleDriveAuthenticator
-from hudson_utils.google_drive import GoogleDriveService
-from hudson_utils.text_processing import TextProcessor
-
 colorama_init(autoreset=True)
 
+USAGE = """Usage: python main.py [--option=value ...]
+
+Query the documents of a Google Drive folder in natural language.
+
+Options:
+  --folder_name         Google Drive folder holding the documents.
+  --max_depth           Levels of subfolders searched, 0 for the folder only
+                        (default: no limit).
+  --threshold           Minimum confidence of an answer (default 0.5).
+  --top_k               Passages sent to the QA model per query (default 5).
+  --passage_size        Maximum number of words per passage (default 200).
+  --dedup               false to index duplicate passages separately (default
+                        true).
+  --dedup_threshold     Similarity above which passages are collapsed as near
+                        duplicates (default 0.8).
+  --batch_size          Windows per QA model forward pass (default 16).
+  --reader_backend      transformers, quantized or onnx (default transformers).
+  --reader_threads      Intra-op threads of the QA model, per reader worker.
+  --reader_workers      Processes running the QA model in parallel (default 1).
+  --cascade             true to answer with a small model first, and only run
+                        the large one when its confidence is below threshold.
+  --cascade_model       Small model of the cascade
+                        (default distilbert-base-cased-distilled-squad).
+  --download_workers    Concurrent downloads (default 8).
+  --drive_requests_per_second
+                        Sustained rate of Drive API calls (default 100).
+  --extraction_workers  Text extraction processes (default: CPU count).
+  --sync                true to only re-ingest documents changed since last run.
+  --sync_state_file     Where the sync state is kept.
+  --query_file          File of queries, one per line in plain text or as JSON
+                        objects with a 'query' field, or - for stdin. Results
+                        are written as JSON lines as each chunk is answered.
+  --output_file         Where the JSON lines are written (default: stdout).
+  --query_chunk_size    Queries answered together from the file (default 64).
+  --serve               true to keep the model and corpus loaded and answer
+                        queries over HTTP instead of running the built-in ones.
+  --host, --port        Address of the query server (default 127.0.0.1:8080).
+  --max_batch_size      Queries coalesced into one model call (default 32).
+  --max_wait_ms         Time a query waits for others to join it (default 10).
+  --cache_dir           Where extracted text is cached (default config/cache).
+  --cache_max_mb        Maximum size of the text cache (default 512).
+  --answer_cache_size   Answers kept in memory, 0 to disable (default 1024).
+  --answer_cache_ttl    Seconds an answer stays valid (default 86400).
+  --answer_cache_db     SQLite file persisting answers, empty to keep them in
+                        memory only (default config/cache/answers.sqlite).
+  --clear_cache         true to clear the caches and exit.
+  --metrics             json or prometheus to time the run and report it.
+  --metrics_file        Where the report is written (default: stdout).
+  --help                Show this message and exit.
+"""
+
 if __name__ == "__main__":
+    # Checked before the Drive client and model modules are imported, so the
+    # usage is shown at once.
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print(USAGE)
+        sys.exit(0)
+
+    from hudson_utils.answer_cache import (
+        DEFAULT_ANSWER_CACHE_SIZE,
+        DEFAULT_ANSWER_CACHE_TTL,
+        AnswerCache,
+    )
+    from hudson_utils.args import get_from_args
+    from hudson_utils.authentication import GoogleDriveAuthenticator
+    from hudson_utils.dedup import DEFAULT_DEDUP_THRESHOLD
+    from hudson_utils.document_cache import (
+        DEFAULT_CACHE_DIR,
+        DEFAULT_CACHE_MAX_BYTES,
+        DocumentTextCache,
+    )
+    from hudson_utils.drive_requests import (
+        DEFAULT_REQUESTS_PER_SECOND,
+        DriveRequestExecutor,
+    )
+    from hudson_utils.drive_sync import DEFAULT_SYNC_STATE_FILE, DriveFolderSync
+    from hudson_utils.google_drive import GoogleDriveService
+    from hudson_utils.instrumentation import METRICS_FORMATS, metrics
+    from hudson_utils.query_batch import DEFAULT_QUERY_CHUNK_SIZE, run_query_file
+    from hudson_utils.reader import DEFAULT_BATCH_SIZE, DEFAULT_CASCADE_MODEL
+    from hudson_utils.reader_backends import DEFAULT_READER_BACKEND
+    from hudson_utils.reader_pool import DEFAULT_READER_WORKERS
+    from hudson_utils.retrieval import DEFAULT_PASSAGE_SIZE, DEFAULT_TOP_K
+    from hudson_utils.server import (
+        DEFAULT_HOST,
+        DEFAULT_MAX_BATCH_SIZE,
+        DEFAULT_MAX_WAIT_MS,
+        DEFAULT_PORT,
+        QueryServer,
+    )
+    from hudson_utils.text_processing import (
+        DEFAULT_DOWNLOAD_WORKERS,
+        DEFAULT_EXTRACTION_WORKERS,
+        TextProcessor,
+    )
+
     threshold = float(
         get_from_args(
             args=sys.argv,
@@ -23,6 +117,240 @@ if __name__ == "__main__":
         arg_name="folder_name",
         default_value="",
     )
+    max_depth = get_from_args(
+        args=sys.argv,
+        arg_name="max_depth",
+        default_value="",
+    )
+    top_k = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="top_k",
+            default_value=DEFAULT_TOP_K,
+        )
+    )
+    passage_size = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="passage_size",
+            default_value=DEFAULT_PASSAGE_SIZE,
+        )
+    )
+    dedup = (
+        get_from_args(
+            args=sys.argv,
+            arg_name="dedup",
+            default_value="true",
+        ).lower()
+        == "true"
+    )
+    dedup_threshold = float(
+        get_from_args(
+            args=sys.argv,
+            arg_name="dedup_threshold",
+            default_value=DEFAULT_DEDUP_THRESHOLD,
+        )
+    )
+    batch_size = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="batch_size",
+            default_value=DEFAULT_BATCH_SIZE,
+        )
+    )
+    reader_backend = get_from_args(
+        args=sys.argv,
+        arg_name="reader_backend",
+        default_value=DEFAULT_READER_BACKEND,
+    )
+    reader_threads = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="reader_threads",
+            default_value=0,
+        )
+    )
+    reader_workers = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="reader_workers",
+            default_value=DEFAULT_READER_WORKERS,
+        )
+    )
+    cascade = (
+        get_from_args(
+            args=sys.argv,
+            arg_name="cascade",
+            default_value="false",
+        ).lower()
+        == "true"
+    )
+    cascade_model = get_from_args(
+        args=sys.argv,
+        arg_name="cascade_model",
+        default_value=DEFAULT_CASCADE_MODEL,
+    )
+    download_workers = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="download_workers",
+            default_value=DEFAULT_DOWNLOAD_WORKERS,
+        )
+    )
+    drive_requests_per_second = float(
+        get_from_args(
+            args=sys.argv,
+            arg_name="drive_requests_per_second",
+            default_value=DEFAULT_REQUESTS_PER_SECOND,
+        )
+    )
+    extraction_workers = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="extraction_workers",
+            default_value=DEFAULT_EXTRACTION_WORKERS,
+        )
+    )
+    sync = (
+        get_from_args(
+            args=sys.argv,
+            arg_name="sync",
+            default_value="false",
+        ).lower()
+        == "true"
+    )
+    sync_state_file = get_from_args(
+        args=sys.argv,
+        arg_name="sync_state_file",
+        default_value=DEFAULT_SYNC_STATE_FILE,
+    )
+    query_file = get_from_args(
+        args=sys.argv,
+        arg_name="query_file",
+        default_value="",
+    )
+    output_file = get_from_args(
+        args=sys.argv,
+        arg_name="output_file",
+        default_value="",
+    )
+    query_chunk_size = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="query_chunk_size",
+            default_value=DEFAULT_QUERY_CHUNK_SIZE,
+        )
+    )
+    serve = (
+        get_from_args(
+            args=sys.argv,
+            arg_name="serve",
+            default_value="false",
+        ).lower()
+        == "true"
+    )
+    host = get_from_args(
+        args=sys.argv,
+        arg_name="host",
+        default_value=DEFAULT_HOST,
+    )
+    port = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="port",
+            default_value=DEFAULT_PORT,
+        )
+    )
+    max_batch_size = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="max_batch_size",
+            default_value=DEFAULT_MAX_BATCH_SIZE,
+        )
+    )
+    max_wait_ms = float(
+        get_from_args(
+            args=sys.argv,
+            arg_name="max_wait_ms",
+            default_value=DEFAULT_MAX_WAIT_MS,
+        )
+    )
+    cache_dir = get_from_args(
+        args=sys.argv,
+        arg_name="cache_dir",
+        default_value=DEFAULT_CACHE_DIR,
+    )
+    cache_max_mb = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="cache_max_mb",
+            default_value=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+        )
+    )
+    answer_cache_size = int(
+        get_from_args(
+            args=sys.argv,
+            arg_name="answer_cache_size",
+            default_value=DEFAULT_ANSWER_CACHE_SIZE,
+        )
+    )
+    answer_cache_ttl = float(
+        get_from_args(
+            args=sys.argv,
+            arg_name="answer_cache_ttl",
+            default_value=DEFAULT_ANSWER_CACHE_TTL,
+        )
+    )
+    answer_cache_db = get_from_args(
+        args=sys.argv,
+        arg_name="answer_cache_db",
+        default_value=os.path.join(cache_dir, "answers.sqlite"),
+    )
+    metrics_format = get_from_args(
+        args=sys.argv,
+        arg_name="metrics",
+        default_value="",
+    ).lower()
+    metrics_file = get_from_args(
+        args=sys.argv,
+        arg_name="metrics_file",
+        default_value="",
+    )
+    clear_cache = (
+        get_from_args(
+            args=sys.argv,
+            arg_name="clear_cache",
+            default_value="false",
+        ).lower()
+        == "true"
+    )
+
+    results_output = sys.stdout
+    if query_file and not output_file:
+        # Messages go to stderr, so stdout only carries the JSON lines.
+        sys.stdout = sys.stderr
+
+    document_cache = DocumentTextCache(
+        cache_dir=cache_dir,
+        max_size_bytes=cache_max_mb * 1024 * 1024,
+    )
+    # Access times of cache hits are saved at exit at the latest.
+    atexit.register(document_cache.flush)
+    token_cache_dir = os.path.join(cache_dir, "tokens")
+    answer_cache = None
+    if answer_cache_size > 0:
+        answer_cache = AnswerCache(
+            max_entries=answer_cache_size,
+            ttl_seconds=answer_cache_ttl,
+            db_path=answer_cache_db or None,
+        )
+    if clear_cache:
+        document_cache.invalidate()
+        shutil.rmtree(token_cache_dir, ignore_errors=True)
+        if answer_cache:
+            answer_cache.invalidate()
+        print(Fore.GREEN + f"Document cache at {cache_dir} cleared.")
+        sys.exit(0)
 
     print(
         Fore.GREEN + f"Will use threshold {threshold} and search for google drive "
@@ -43,57 +371,182 @@ if __name__ == "__main__":
         "What is the underlying message or critique about human nature as compared to animals in the text?",  # noqa E501
     ]
 
+    if metrics_format:
+        if metrics_format not in METRICS_FORMATS:
+            print(
+                Fore.RED + f"Unknown metrics format '{metrics_format}', expected "
+                f"{' or '.join(METRICS_FORMATS)}."
+            )
+            sys.exit(1)
+        metrics.enable()
+
     # Authenticate with Google Drive using OAuth 2.0 credentials
     print(Fore.GREEN + "Authenticating with your google account...")
-    credentials = GoogleDriveAuthenticator.authenticate_with_oauth2(
-        app_credentials_file="config/hudson-dias-google-drive-crd.json",
-        SCOPES=["https://www.googleapis.com/auth/drive"],
-        token_file="config/hudson-dias-google-drive-token.json",
-    )
+    with metrics.span("main.authenticate"):
+        credentials = GoogleDriveAuthenticator.authenticate_with_oauth2(
+            app_credentials_file="config/hudson-dias-google-drive-crd.json",
+            SCOPES=["https://www.googleapis.com/auth/drive"],
+            token_file="config/hudson-dias-google-drive-token.json",
+        )
 
     if credentials is not None:
         print(Fore.LIGHTGREEN_EX + "   Authentication successful.")
         # Initialize Google Drive service using your custom class
-        gds = GoogleDriveService(credentials)
+        gds = GoogleDriveService(
+            credentials,
+            max_depth=int(max_depth) if max_depth else None,
+            request_executor=DriveRequestExecutor(
+                requests_per_second=drive_requests_per_second
+            ),
+        )
 
         # Initialize text processor with the correct service object
         text_processor = TextProcessor(
             drive_service=gds.drive_service,
             threshold=threshold,
+            top_k=top_k,
+            passage_size=passage_size,
+            document_cache=document_cache,
+            credentials=credentials,
+            download_workers=download_workers,
+            extraction_workers=extraction_workers,
+            batch_size=batch_size,
+            token_cache_dir=token_cache_dir,
+            answer_cache=answer_cache,
+            reader_backend=reader_backend,
+            reader_threads=reader_threads or None,
+            reader_workers=reader_workers,
+            cascade_model=cascade_model if cascade else None,
+            dedup_threshold=dedup_threshold if dedup else None,
+            request_executor=gds.request_executor,
+            client_pool=gds.client_pool,
         )
+        # Reader worker processes are stopped however the run ends.
+        atexit.register(text_processor.close)
+        # The model loads while documents are listed and downloaded, or before
+        # they are when the reader forks worker processes.
+        text_processor.load_reader_in_background()
 
-        print(Fore.GREEN + "Fetching documents from Google Drive...")
-        # Fetch documents from the 'hudson_dias' folder in Google Drive
-        documents = gds.get_documents_from_drive(folder_name)
-        print(Fore.LIGHTGREEN_EX + "   Documents fetched successfully.")
+        def fetch_documents() -> list:
+            if sync:
+                # Only documents changed since the last run are re-ingested.
+                sync_result = DriveFolderSync(gds, sync_state_file).sync(folder_name)
+                text_processor.update_corpus(sync_result.documents, sync_result.removed)
+                print(
+                    Fore.LIGHTGREEN_EX + f"   {len(sync_result.changed)} changed and "
+                    f"{len(sync_result.removed)} removed documents synced."
+                )
+                return sync_result.documents
+
+            documents = gds.get_documents_from_drive(folder_name)
+            text_processor.update_corpus(documents)
+            return documents
 
         print(
-            Fore.MAGENTA + "Processing documents and queries. This may take a while, "
-            "hold tight..."
+            Fore.GREEN + "Fetching and processing documents from Google Drive. This "
+            "may take a while, hold tight..."
         )
+        # Fetch documents from the 'hudson_dias' folder in Google Drive
+        with metrics.span("main.fetch_documents"):
+            fetch_documents()
+        print(Fore.LIGHTGREEN_EX + "   Documents fetched successfully.")
 
-        # Process natural language queries using TextProcessor
-        results = text_processor.process_queries(queries, documents)
+        if serve:
+            # The corpus and the model stay resident; POST /refresh re-ingests
+            # the folder.
+            query_server = QueryServer(
+                answer_queries=text_processor.answer_queries,
+                refresh=fetch_documents,
+                host=host,
+                port=port,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                metrics_format=metrics_format or None,
+            )
+            print(Fore.GREEN + f"Serving queries on http://{host}:{port}/query")
+            try:
+                asyncio.run(query_server.serve_forever())
+            except KeyboardInterrupt:
+                print(Fore.GREEN + "Query server stopped.")
+            sys.exit(0)
 
-        for query, result in zip(queries, results):
-            print(Fore.LIGHTGREEN_EX + f"{query}")
-            if result and float(result["confidence"]) >= float(threshold):
-                print(Fore.CYAN + f"   Answer: {result['answer']}")
-                print(
-                    Fore.CYAN + f"   Confidence Level: "
-                    f"{float(result['confidence']) * 100:.2f}%"
-                )
+        if query_file:
+            # Results are written as soon as each chunk of queries is answered.
+            print(Fore.MAGENTA + f"Processing queries from {query_file}...")
+            query_input = sys.stdin
+            if query_file != "-":
+                query_input = open(query_file, encoding="utf-8")
+            output = results_output
+            if output_file:
+                output = open(output_file, "w", encoding="utf-8")
+            try:
+                with metrics.span("main.answer_queries"):
+                    run_query_file(
+                        text_processor.answer_queries,
+                        query_input,
+                        output,
+                        threshold=threshold,
+                        chunk_size=query_chunk_size,
+                        progress=lambda answered: print(
+                            Fore.LIGHTGREEN_EX + f"   {answered} queries answered."
+                        ),
+                    )
+            finally:
+                if query_input is not sys.stdin:
+                    query_input.close()
+                if output is not results_output:
+                    output.close()
+        else:
+            print(Fore.MAGENTA + "Processing queries...")
+
+            # Process natural language queries using TextProcessor
+            with metrics.span("main.answer_queries"):
+                results = text_processor.answer_queries(queries)
 
+            for query, result in zip(queries, results):
+                print(Fore.LIGHTGREEN_EX + f"{query}")
+                if result and float(result["confidence"]) >= float(threshold):
+                    print(Fore.CYAN + f"   Answer: {result['answer']}")
+                    print(
+                        Fore.CYAN + f"   Confidence Level: "
+                        f"{float(result['confidence']) * 100:.2f}%"
+                    )
+
+                else:
+                    print(Fore.RED + f"   Answer: {result['answer']}")
+                    print(
+                        Fore.RED
+                        + "   This answer does not meet the threshold, use it at "
+                        "your own risk!"
+                    )
+                    print(
+                        Fore.RED + f"   Confidence Level: "
+                        f"{float(result['confidence']) * 100:.2f}%"
+                    )
+
+                if result["source"]:
+                    source_document = result["source_document"][0]
+                    print(
+                        Fore.LIGHTBLACK_EX
+                        + f"   Source: {source_document.get('title')}, "
+                        f"page {result['source']['page']}"
+                    )
+
+        if cascade:
+            print(
+                Fore.GREEN + f"Escalated {text_processor.escalated_queries} of "
+                f"{text_processor.cascaded_queries} queries to the large model."
+            )
+
+        if metrics_format:
+            report = metrics.export(metrics_format)
+            if metrics_file:
+                with open(metrics_file, "w", encoding="utf-8") as report_file:
+                    report_file.write(report)
+                print(Fore.GREEN + f"Timing report written to {metrics_file}.")
             else:
-                print(Fore.RED + f"   Answer: {result['answer']}")
-                print(
-                    Fore.RED + "   This answer does not meet the threshold, use it at "
-                    "your own risk!"
-                )
-                print(
-                    Fore.RED + f"   Confidence Level: "
-                    f"{float(result['confidence']) * 100:.2f}%"
-                )
+                print(Fore.GREEN + "Timing report:")
+                print(report)
 
     else:
         print(Fore.RED + "   Authentication failed. Try again.")
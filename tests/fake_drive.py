@@ -0,0 +1,234 @@
+import re
+
+import httplib2
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+DOC_MIME_TYPE = "application/vnd.google-apps.document"
+PDF_MIME_TYPE = "application/pdf"
+
+
+class FakeRequest:
+    def __init__(self, fake_drive, method, handler):
+        self.fake_drive = fake_drive
+        self.method = method
+        self.handler = handler
+
+    def execute(self, http=None, num_retries=0):
+        self.fake_drive.calls.append(self.method)
+        return self.handler()
+
+
+class FakeMediaHttp:
+    """
+    Transport serving the content of a file, honouring `range` headers the
+    way the Drive media endpoints do.
+    """
+
+    def __init__(self, fake_drive, file_id):
+        self.fake_drive = fake_drive
+        self.file_id = file_id
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        content = self.fake_drive.contents[self.file_id]
+        byte_range = (headers or {}).get("range")
+        self.fake_drive.media_requests.append((self.file_id, byte_range))
+        if not byte_range:
+            response = {"status": "200", "content-length": str(len(content))}
+            return httplib2.Response(response), content
+
+        first, last = re.match(r"bytes=(\d+)-(\d+)", byte_range).groups()
+        start, end = int(first), int(last) + 1
+        chunk = content[start:end]
+        response = {
+            "status": "206",
+            "content-range": f"bytes {start}-{start + len(chunk) - 1}"
+            f"/{len(content)}",
+        }
+        return httplib2.Response(response), chunk
+
+
+class FakeMediaRequest(FakeRequest):
+    def __init__(self, fake_drive, method, file_id):
+        super().__init__(fake_drive, method, lambda: fake_drive.contents[file_id])
+        self.uri = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+        self.headers = {}
+        self.http = FakeMediaHttp(fake_drive, file_id)
+
+
+class FakeFilesResource:
+    def __init__(self, fake_drive):
+        self.fake_drive = fake_drive
+
+    def list(self, q="", fields=None, pageToken=None, pageSize=None, **kwargs):
+        self.fake_drive.list_parameters.append(kwargs)
+        return FakeRequest(
+            self.fake_drive,
+            "files.list",
+            lambda: self.fake_drive.list_files(q, pageToken, pageSize),
+        )
+
+    def get(self, fileId, fields=None, **kwargs):
+        return FakeRequest(
+            self.fake_drive,
+            "files.get",
+            lambda: dict(self.fake_drive.file_store[fileId]),
+        )
+
+    def export(self, fileId, mimeType, **kwargs):
+        return FakeMediaRequest(self.fake_drive, "files.export", fileId)
+
+    def export_media(self, fileId, mimeType, **kwargs):
+        return FakeMediaRequest(self.fake_drive, "files.export", fileId)
+
+    def get_media(self, fileId, **kwargs):
+        return FakeMediaRequest(self.fake_drive, "files.get_media", fileId)
+
+
+class FakeChangesResource:
+    def __init__(self, fake_drive):
+        self.fake_drive = fake_drive
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(
+            self.fake_drive,
+            "changes.getStartPageToken",
+            lambda: {"startPageToken": str(len(self.fake_drive.change_log))},
+        )
+
+    def list(self, pageToken, fields=None, pageSize=None, **kwargs):
+        return FakeRequest(
+            self.fake_drive,
+            "changes.list",
+            lambda: self.fake_drive.list_changes(pageToken, pageSize, fields),
+        )
+
+
+class FakeDriveService:
+    """
+    In-memory stand-in for the Drive v3 client, supporting the subset of
+    `files()` and `changes()` used by hudson_utils.
+    """
+
+    def __init__(self, page_size=100):
+        self.page_size = page_size
+        self.file_store = {}
+        self.contents = {}
+        self.change_log = []
+        self.calls = []
+        self.media_requests = []
+        self.list_parameters = []
+        self.next_id = 0
+
+    def add_folder(self, name, parent_id=None):
+        return self.add_file(name, FOLDER_MIME_TYPE, parent_id=parent_id)
+
+    def add_file(self, name, mime_type=DOC_MIME_TYPE, parent_id=None, content=b""):
+        self.next_id += 1
+        file_id = f"file-{self.next_id}"
+        self.file_store[file_id] = {
+            "id": file_id,
+            "name": name,
+            "mimeType": mime_type,
+            "parents": [parent_id] if parent_id else [],
+            "trashed": False,
+            "version": "1",
+            "modifiedTime": f"2023-12-01T00:00:{self.next_id:02d}Z",
+        }
+        if mime_type != FOLDER_MIME_TYPE:
+            self.file_store[file_id]["md5Checksum"] = f"md5-{file_id}-1"
+            self.file_store[file_id]["size"] = str(len(content))
+        self.contents[file_id] = content
+        self.record_change(file_id)
+        return file_id
+
+    def update_file(self, file_id, content=b"", **fields):
+        file = self.file_store[file_id]
+        file.update(fields)
+        file["version"] = str(int(file["version"]) + 1)
+        if "md5Checksum" in file:
+            file["md5Checksum"] = f"md5-{file_id}-{file['version']}"
+            file["size"] = str(len(content))
+        self.contents[file_id] = content
+        self.record_change(file_id)
+
+    def delete_file(self, file_id):
+        del self.file_store[file_id]
+        self.contents.pop(file_id, None)
+        self.change_log.append({"fileId": file_id, "removed": True})
+
+    def record_change(self, file_id):
+        self.change_log.append(
+            {
+                "fileId": file_id,
+                "removed": False,
+                "file": dict(self.file_store[file_id]),
+            }
+        )
+
+    def list_changes(self, page_token, page_size=None, fields=None):
+        start = int(page_token)
+        end = start + min(page_size or self.page_size, self.page_size)
+        changes = self.change_log[start:end]
+        # Like Drive, only the file fields of the mask are returned.
+        file_fields = re.search(r"file\(([^)]*)\)", fields or "")
+        if file_fields:
+            names = {name.strip() for name in file_fields.group(1).split(",")}
+            changes = [
+                (
+                    dict(
+                        change,
+                        file={k: v for k, v in change["file"].items() if k in names},
+                    )
+                    if "file" in change
+                    else change
+                )
+                for change in changes
+            ]
+        response = {"changes": changes}
+        if end < len(self.change_log):
+            response["nextPageToken"] = str(end)
+        else:
+            response["newStartPageToken"] = str(len(self.change_log))
+        return response
+
+    def list_files(self, q, page_token=None, page_size=None):
+        matches = [file for file in self.file_store.values() if self.matches(file, q)]
+        start = int(page_token or 0)
+        # Like Drive, the server caps the page size whatever the client asks for.
+        end = start + min(page_size or self.page_size, self.page_size)
+        response = {"files": [dict(file) for file in matches[start:end]]}
+        if end < len(matches):
+            response["nextPageToken"] = str(end)
+        return response
+
+    @staticmethod
+    def matches(file, q):
+        for clause in re.split(r"\s+and\s+", q.strip()) if q.strip() else []:
+            clause = clause.strip()
+            if clause.startswith("(") and clause.endswith(")"):
+                alternatives = re.split(r"\s+or\s+", clause[1:-1])
+                if not any(FakeDriveService.matches(file, a) for a in alternatives):
+                    return False
+            elif not FakeDriveService.matches_clause(file, clause):
+                return False
+        return True
+
+    @staticmethod
+    def matches_clause(file, clause):
+        parents = re.fullmatch(r"'([^']*)' in parents", clause)
+        if parents:
+            return parents.group(1) in file["parents"]
+        comparison = re.fullmatch(r"(\w+)\s*(!=|=)\s*'?([^']*)'?", clause)
+        if not comparison:
+            raise ValueError(f"Unsupported query clause: {clause}")
+        field, operator, value = comparison.groups()
+        actual = file.get(field)
+        if isinstance(actual, bool):
+            actual = str(actual).lower()
+        return (actual == value) == (operator == "=")
+
+    def files(self):
+        return FakeFilesResource(self)
+
+    def changes(self):
+        return FakeChangesResource(self)
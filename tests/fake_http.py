@@ -0,0 +1,65 @@
+import json
+import re
+from email.parser import Parser
+
+import httplib2
+
+BOUNDARY = "fake_batch_boundary"
+
+
+class FakeBatchHttp:
+    """
+    Local HTTP transport answering Drive batch requests.
+
+    `responses` maps a file ID to a list of (status, body) tuples returned by
+    successive requests for that file; the last one is repeated. Files without
+    configured responses get a 200 with a generated name.
+    """
+
+    def __init__(self, responses=None, batch_status=None):
+        self.responses = responses or {}
+        self.batch_status = list(batch_status or [])
+        self.batches = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if self.batch_status:
+            status = self.batch_status.pop(0)
+            if status >= 300:
+                self.batches.append([])
+                return httplib2.Response({"status": str(status)}), b"{}"
+
+        message = Parser().parsestr(
+            f"content-type: {headers['content-type']}\r\n\r\n{body}"
+        )
+        parts = []
+        file_ids = []
+        for part in message.get_payload():
+            file_id = re.search(r"/files/([^?/ ]+)", part.get_payload()).group(1)
+            file_ids.append(file_id)
+            status, content = self.next_response(file_id)
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            parts.append(
+                f"--{BOUNDARY}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} OK\r\n"
+                "Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(content)}\r\n"
+            )
+        self.batches.append(file_ids)
+
+        response = httplib2.Response(
+            {
+                "status": "200",
+                "content-type": f"multipart/mixed; boundary={BOUNDARY}",
+            }
+        )
+        return response, ("".join(parts) + f"--{BOUNDARY}--\r\n").encode("utf-8")
+
+    def next_response(self, file_id):
+        responses = self.responses.get(file_id)
+        if not responses:
+            return 200, {"id": file_id, "name": f"name of {file_id}"}
+        if len(responses) > 1:
+            return responses.pop(0)
+        return responses[0]
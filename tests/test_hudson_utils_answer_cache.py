@@ -0,0 +1,86 @@
+from hudson_utils.answer_cache import AnswerCache, corpus_fingerprint, normalize_query
+
+RESULT = {"query": "q", "answer": "Brazil", "confidence": 0.9, "source": None}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  Which countries   have Rainforests? ") == (
+        "which countries have rainforests"
+    )
+
+
+def test_corpus_fingerprint_changes_with_any_revision():
+    documents = [
+        {"id": "doc-0", "md5Checksum": "a"},
+        {"id": "doc-1", "md5Checksum": "b"},
+    ]
+    fingerprint = corpus_fingerprint(documents, ["model"])
+
+    assert corpus_fingerprint(documents[::-1], ["model"]) == fingerprint
+    assert corpus_fingerprint(documents[:1], ["model"]) != fingerprint
+    assert corpus_fingerprint(documents, ["other model"]) != fingerprint
+    changed = [documents[0], dict(documents[1], md5Checksum="c")]
+    assert corpus_fingerprint(changed, ["model"]) != fingerprint
+
+
+def test_answer_cache_hits_normalized_queries():
+    cache = AnswerCache()
+    cache.put("Where are rainforests?", "v1", RESULT)
+
+    assert cache.get("where are  rainforests", "v1") == dict(
+        RESULT, query="where are  rainforests"
+    )
+    assert cache.get("Where are rainforests?", "v2") is None
+
+
+def test_answer_cache_evicts_least_recently_used():
+    cache = AnswerCache(max_entries=2)
+    cache.put("first", "v1", RESULT)
+    cache.put("second", "v1", RESULT)
+    cache.get("first", "v1")
+    cache.put("third", "v1", RESULT)
+
+    assert cache.get("second", "v1") is None
+    assert cache.get("first", "v1") is not None
+    assert cache.get("third", "v1") is not None
+
+
+def test_answer_cache_expires_entries():
+    clock = FakeClock()
+    cache = AnswerCache(ttl_seconds=60, clock=clock)
+    cache.put("query", "v1", RESULT)
+
+    clock.now += 59
+    assert cache.get("query", "v1") is not None
+    clock.now += 2
+    assert cache.get("query", "v1") is None
+
+
+def test_answer_cache_persists_to_sqlite(tmp_path):
+    db_path = str(tmp_path / "answers.sqlite")
+    AnswerCache(db_path=db_path).put("query", "v1", RESULT)
+
+    assert AnswerCache(db_path=db_path).get("query", "v1") == dict(
+        RESULT, query="query"
+    )
+
+
+def test_answer_cache_retain_drops_other_corpus_versions(tmp_path):
+    db_path = str(tmp_path / "answers.sqlite")
+    cache = AnswerCache(db_path=db_path)
+    cache.put("old", "v1", RESULT)
+    cache.put("new", "v2", RESULT)
+
+    cache.retain("v2")
+
+    assert cache.get("old", "v1") is None
+    assert AnswerCache(db_path=db_path).get("old", "v1") is None
+    assert cache.get("new", "v2") is not None
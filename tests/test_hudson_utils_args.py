@@ -29,3 +29,9 @@ def test_get_from_args_no_default():
     args = ["--threshold=0.7"]
     result = get_from_args(args, "threshold", default_value=None)
     assert result == "0.7"
+
+
+def test_get_from_args_value_with_equals_sign():
+    args = ["--query_file=runs/date=2024-01-01.txt"]
+    result = get_from_args(args, "query_file", "")
+    assert result == "runs/date=2024-01-01.txt"
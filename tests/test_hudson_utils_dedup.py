@@ -0,0 +1,49 @@
+import random
+
+from hudson_utils.dedup import PassageDeduplicator
+
+
+def random_text(seed, length=120):
+    generator = random.Random(seed)
+    return " ".join(f"word{generator.randrange(2000)}" for _ in range(length))
+
+
+def test_exact_duplicates_ignore_case_and_punctuation():
+    groups = PassageDeduplicator().group(
+        ["The Cerrado is dry.", "Elephants are strong.", "the cerrado IS dry"]
+    )
+
+    assert groups == [[0, 2], [1]]
+
+
+def test_near_duplicates_are_grouped():
+    text = random_text(0)
+    words = text.split()
+    words[60] = "revised"
+    groups = PassageDeduplicator().group(
+        [text, random_text(1), " ".join(words), random_text(2)]
+    )
+
+    assert groups == [[0, 2], [1], [3]]
+
+
+def test_overlapping_passages_are_kept_apart():
+    words = random_text(3, length=250).split()
+    # Consecutive passages of a document share a quarter of their words.
+    passages = [" ".join(words[:200]), " ".join(words[150:250])]
+
+    assert PassageDeduplicator().group(passages) == [[0], [1]]
+
+
+def test_threshold_controls_near_duplicates():
+    text = random_text(4)
+    words = text.split()
+    words[30] = words[90] = "revised"
+    passages = [text, " ".join(words)]
+
+    assert PassageDeduplicator(threshold=0.95).group(passages) == [[0], [1]]
+    assert PassageDeduplicator(threshold=0.6).group(passages) == [[0, 1]]
+
+
+def test_empty_passages_are_grouped_together():
+    assert PassageDeduplicator().group(["", "...", "text"]) == [[0, 1], [2]]
@@ -0,0 +1,107 @@
+import os
+
+from hudson_utils.document_cache import DocumentTextCache
+
+
+def make_metadata(file_id="file-1", md5="abc", modified="2023-12-01T00:00:00Z"):
+    return {"id": file_id, "md5Checksum": md5, "modifiedTime": modified}
+
+
+def test_get_miss_returns_none(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    assert cache.get(make_metadata()) is None
+
+
+def test_put_then_get(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    cache.put(make_metadata(), "cerrado text")
+    assert cache.get(make_metadata()) == "cerrado text"
+
+
+def test_cache_persists_across_instances(tmp_path):
+    DocumentTextCache(cache_dir=str(tmp_path)).put(make_metadata(), "persisted")
+    assert DocumentTextCache(cache_dir=str(tmp_path)).get(make_metadata()) == (
+        "persisted"
+    )
+
+
+def test_new_revision_misses_and_replaces_old_entry(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    cache.put(make_metadata(md5="old"), "old text")
+
+    assert cache.get(make_metadata(md5="new")) is None
+
+    cache.put(make_metadata(md5="new"), "new text")
+    assert cache.get(make_metadata(md5="old")) is None
+    assert len(cache.index) == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path), max_size_bytes=10)
+    cache.put(make_metadata("a"), "aaaa")
+    cache.put(make_metadata("b"), "bbbb")
+    # Touch 'a' so 'b' becomes the least recently used entry.
+    cache.index[DocumentTextCache.cache_key(make_metadata("b"))]["last_access"] = 0
+    cache.get(make_metadata("a"))
+
+    cache.put(make_metadata("c"), "cccc")
+
+    assert cache.get(make_metadata("a")) == "aaaa"
+    assert cache.get(make_metadata("b")) is None
+    assert cache.get(make_metadata("c")) == "cccc"
+    assert cache.total_size() <= 10
+
+
+def test_entry_larger_than_cache_is_not_stored(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path), max_size_bytes=3)
+    cache.put(make_metadata(), "too large")
+    assert cache.get(make_metadata()) is None
+
+
+def test_invalidate_single_file(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    cache.put(make_metadata("a"), "aaaa")
+    cache.put(make_metadata("b"), "bbbb")
+
+    cache.invalidate("a")
+
+    assert cache.get(make_metadata("a")) is None
+    assert cache.get(make_metadata("b")) == "bbbb"
+
+
+def test_invalidate_all(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    cache.put(make_metadata("a"), "aaaa")
+    cache.put(make_metadata("b"), "bbbb")
+
+    cache.invalidate()
+
+    assert cache.index == {}
+    assert DocumentTextCache(cache_dir=str(tmp_path)).get(make_metadata("b")) is None
+
+
+def test_has_revision():
+    assert DocumentTextCache.has_revision(make_metadata())
+    assert not DocumentTextCache.has_revision({"id": "file-1"})
+
+
+def test_corrupted_index_is_ignored(tmp_path):
+    (tmp_path / DocumentTextCache.INDEX_FILE).write_text("not json")
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    assert cache.index == {}
+
+
+def test_hits_only_save_access_times_on_flush(tmp_path):
+    cache = DocumentTextCache(cache_dir=str(tmp_path))
+    cache.put(make_metadata(), "cerrado text")
+    index_path = tmp_path / DocumentTextCache.INDEX_FILE
+    os.utime(index_path, (0, 0))
+
+    for _ in range(3):
+        assert cache.get(make_metadata()) == "cerrado text"
+    assert os.path.getmtime(index_path) == 0
+
+    cache.flush()
+    key = DocumentTextCache.cache_key(make_metadata())
+    reloaded = DocumentTextCache(cache_dir=str(tmp_path))
+    assert reloaded.index[key]["last_access"] == cache.index[key]["last_access"]
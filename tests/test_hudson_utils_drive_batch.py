@@ -0,0 +1,149 @@
+from unittest.mock import patch
+
+from fake_http import FakeBatchHttp
+from googleapiclient.discovery import build
+
+from hudson_utils.drive_batch import DriveBatchExecutor
+from hudson_utils.drive_requests import DriveRequestExecutor, TokenBucket
+from hudson_utils.google_drive import GoogleDriveService
+from hudson_utils.instrumentation import metrics
+
+
+def make_drive_service(http):
+    return build("drive", "v3", http=http, static_discovery=True)
+
+
+def make_requests(drive_service, count):
+    return {
+        f"file-{i}": drive_service.files().get(fileId=f"file-{i}", fields="id, name")
+        for i in range(count)
+    }
+
+
+def test_execute_groups_requests_in_batches():
+    http = FakeBatchHttp()
+    drive_service = make_drive_service(http)
+
+    metrics.enable()
+    try:
+        responses, errors = DriveBatchExecutor(drive_service, batch_size=100).execute(
+            make_requests(drive_service, 250)
+        )
+        # Each round trip counts as one call.
+        assert metrics.report()["counters"]["drive.api_calls"] == 3
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    assert errors == {}
+    assert len(responses) == 250
+    assert responses["file-7"] == {"id": "file-7", "name": "name of file-7"}
+    assert [len(batch) for batch in http.batches] == [100, 100, 50]
+
+
+def test_batch_size_is_capped_at_100():
+    executor = DriveBatchExecutor(make_drive_service(FakeBatchHttp()), batch_size=500)
+    assert executor.batch_size == 100
+
+
+def test_execute_retries_only_retryable_items():
+    http = FakeBatchHttp(
+        responses={
+            "file-1": [(503, {}), (200, {"id": "file-1", "name": "recovered"})],
+            "file-2": [(404, {"error": {"message": "File not found"}})],
+        }
+    )
+    drive_service = make_drive_service(http)
+    sleeps = []
+
+    responses, errors = DriveBatchExecutor(drive_service, sleep=sleeps.append).execute(
+        make_requests(drive_service, 3)
+    )
+
+    assert responses["file-1"]["name"] == "recovered"
+    assert "file-0" in responses
+    assert list(errors) == ["file-2"]
+    assert errors["file-2"].resp.status == 404
+    assert http.batches == [["file-0", "file-1", "file-2"], ["file-1"]]
+    assert sleeps == [1.0]
+
+
+def test_execute_gives_up_after_max_retries():
+    http = FakeBatchHttp(responses={"file-0": [(429, {})]})
+    drive_service = make_drive_service(http)
+    sleeps = []
+
+    responses, errors = DriveBatchExecutor(
+        drive_service, max_retries=2, sleep=sleeps.append
+    ).execute(make_requests(drive_service, 1))
+
+    assert responses == {}
+    assert errors["file-0"].resp.status == 429
+    assert sleeps == [1.0, 2.0]
+
+
+def test_execute_retries_a_failed_round_trip():
+    http = FakeBatchHttp(batch_status=[500])
+    drive_service = make_drive_service(http)
+
+    responses, errors = DriveBatchExecutor(
+        drive_service, sleep=lambda delay: None
+    ).execute(make_requests(drive_service, 2))
+
+    assert errors == {}
+    assert sorted(responses) == ["file-0", "file-1"]
+
+
+def test_round_trips_go_through_the_request_executor():
+    http = FakeBatchHttp(batch_status=[429, 429, 429])
+    drive_service = make_drive_service(http)
+    sleeps = []
+    request_executor = DriveRequestExecutor(
+        max_retries=1, sleep=sleeps.append, jitter=lambda low, high: high
+    )
+
+    responses, errors = DriveBatchExecutor(
+        drive_service, sleep=sleeps.append, request_executor=request_executor
+    ).execute(make_requests(drive_service, 2))
+
+    # The executor retried the round trip once, then every item failed.
+    assert responses == {}
+    assert sorted(errors) == ["file-0", "file-1"]
+    assert len(http.batches) == 2 and sleeps == [1.0]
+    assert request_executor.concurrency.limit < 16
+
+
+def test_round_trips_take_one_token_per_call():
+    http = FakeBatchHttp()
+    drive_service = make_drive_service(http)
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    request_executor = DriveRequestExecutor()
+    request_executor.rate_limiter = TokenBucket(
+        rate=10.0, clock=lambda: now[0], sleep=sleep
+    )
+
+    responses, errors = DriveBatchExecutor(
+        drive_service, batch_size=10, request_executor=request_executor
+    ).execute(make_requests(drive_service, 50))
+
+    # 50 calls at 10 per second, after a burst of 10.
+    assert len(responses) == 50 and errors == {}
+    assert now[0] == 4.0
+
+
+def test_google_drive_service_batches_document_names():
+    http = FakeBatchHttp(responses={"file-1": [(404, {})]})
+    with patch(
+        "hudson_utils.drive_clients.build_drive_client",
+        return_value=make_drive_service(http),
+    ):
+        google_drive_service = GoogleDriveService(credentials=None, batch_requests=True)
+
+    names = google_drive_service.get_document_names(["file-0", "file-1", "file-2"])
+
+    assert names == {"file-0": "name of file-0", "file-2": "name of file-2"}
+    assert len(http.batches) == 1
@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hudson_utils.drive_clients import (
+    DriveClientPool,
+    SharedCredentials,
+    build_drive_client,
+    discovery_document,
+)
+
+
+class FakeCredentials:
+    def __init__(self, valid=True):
+        self.valid = valid
+        self.token = "token-0"
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+    def apply(self, headers):
+        headers["authorization"] = f"Bearer {self.token}"
+
+    def refresh(self, request):
+        with self.lock:
+            self.refreshes += 1
+            refreshes = self.refreshes
+        time.sleep(0.05)
+        self.token = f"token-{refreshes}"
+        self.valid = True
+
+
+def test_discovery_document_is_parsed_once():
+    assert discovery_document() is discovery_document()
+    assert build_drive_client(http=object()).files() is not None
+
+
+def test_each_thread_gets_its_own_transport():
+    pool = DriveClientPool(FakeCredentials())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        transports = list(executor.map(lambda _: id(pool.http()), range(4)))
+
+    assert pool.http() is pool.http()
+    assert len(pool.transports) == len(set(transports)) + 1
+    assert pool.client() is pool.client()
+
+    pool.close()
+    assert pool.transports == []
+
+
+def test_pool_without_credentials_uses_the_client_transport():
+    assert DriveClientPool(None).http() is None
+
+
+def test_expired_credentials_are_refreshed_once_across_threads():
+    credentials = FakeCredentials(valid=False)
+    shared = SharedCredentials(credentials)
+    headers = [{} for _ in range(8)]
+
+    threads = [
+        threading.Thread(
+            target=shared.before_request, args=(None, "GET", "url", thread_headers)
+        )
+        for thread_headers in headers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert credentials.refreshes == 1
+    assert {h["authorization"] for h in headers} == {"Bearer token-1"}
+    assert shared.token == "token-1"
@@ -0,0 +1,188 @@
+import json
+from unittest.mock import patch
+
+import httplib2
+import pytest
+from fake_drive import FakeDriveService
+from googleapiclient.errors import HttpError
+
+from hudson_utils.drive_requests import (
+    AdaptiveConcurrencyLimit,
+    DriveRequestExecutor,
+    TokenBucket,
+    is_quota_error,
+    retry_after_seconds,
+)
+from hudson_utils.google_drive import GoogleDriveService
+
+
+def http_error(status, reason=None, **headers):
+    content = b"{}"
+    if reason:
+        content = json.dumps({"error": {"errors": [{"reason": reason}]}}).encode()
+    return HttpError(httplib2.Response(dict(headers, status=str(status))), content)
+
+
+class FlakyCall:
+    def __init__(self, *errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def make_executor(sleeps, **options):
+    return DriveRequestExecutor(
+        sleep=sleeps.append,
+        clock=lambda: 1_700_000_000.0,
+        jitter=lambda low, high: high,
+        **options,
+    )
+
+
+def test_transient_errors_are_retried_with_exponential_backoff():
+    sleeps = []
+    call = FlakyCall(http_error(503), http_error(500), ConnectionError())
+
+    assert make_executor(sleeps, backoff_seconds=1.0).call(call) == "ok"
+    assert call.calls == 4
+    assert sleeps == [1.0, 2.0, 4.0]
+
+
+def test_backoff_is_capped():
+    sleeps = []
+    call = FlakyCall(*[http_error(503)] * 4)
+
+    make_executor(sleeps, backoff_seconds=1.0, max_backoff_seconds=3.0).call(call)
+
+    assert sleeps == [1.0, 2.0, 3.0, 3.0]
+
+
+def test_retry_after_is_honoured():
+    sleeps = []
+    call = FlakyCall(
+        http_error(429, **{"retry-after": "30"}),
+        http_error(429, **{"retry-after": "Tue, 14 Nov 2023 22:13:40 GMT"}),
+    )
+
+    make_executor(sleeps, backoff_seconds=1.0).call(call)
+
+    assert sleeps == [30.0, 20.0]
+
+
+def test_permanent_errors_are_not_retried():
+    sleeps = []
+    call = FlakyCall(http_error(404))
+
+    with pytest.raises(HttpError):
+        make_executor(sleeps).call(call)
+    assert call.calls == 1 and sleeps == []
+
+
+def test_programming_errors_are_not_retried():
+    sleeps = []
+    call = FlakyCall(KeyError("id"))
+
+    with pytest.raises(KeyError):
+        make_executor(sleeps).call(call)
+    assert call.calls == 1 and sleeps == []
+    assert make_executor(sleeps).call(FlakyCall(TimeoutError())) == "ok"
+    assert make_executor(sleeps).call(FlakyCall(httplib2.ServerNotFoundError())) == "ok"
+
+
+def test_retries_are_bounded():
+    sleeps = []
+    call = FlakyCall(*[http_error(503)] * 3)
+
+    with pytest.raises(HttpError):
+        make_executor(sleeps, max_retries=2).call(call)
+    assert call.calls == 3 and len(sleeps) == 2
+
+
+def test_quota_errors():
+    assert is_quota_error(http_error(429))
+    assert is_quota_error(http_error(403, "userRateLimitExceeded"))
+    assert not is_quota_error(http_error(403, "insufficientFilePermissions"))
+    assert not is_quota_error(ConnectionError())
+    assert retry_after_seconds(http_error(503), 0.0) is None
+
+
+def test_token_bucket_waits_once_the_burst_is_spent():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    assert sleeps == [0.5, 0.5]
+
+
+def test_token_bucket_takes_several_tokens_at_once():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0], sleep=sleep)
+    bucket.acquire(2)
+    # Larger than the capacity: waits for a full bucket, then runs into debt.
+    bucket.acquire(4)
+    bucket.acquire()
+
+    assert sleeps == [1.0, 1.5]
+
+
+def test_concurrency_limit_backs_off_on_quota_errors_and_recovers():
+    limit = AdaptiveConcurrencyLimit(max_limit=8, min_limit=1)
+
+    limit.acquire()
+    limit.release(quota_error=True)
+    assert limit.limit == 4
+    for _ in range(3):
+        limit.acquire()
+        limit.release(quota_error=True)
+    assert limit.limit == 1
+
+    for _ in range(100):
+        limit.acquire()
+        limit.release()
+    assert limit.limit == 8
+
+
+def test_listing_survives_rate_limiting():
+    fake_drive = FakeDriveService()
+    folder_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.add_file("cerrado", parent_id=folder_id)
+    list_files = fake_drive.list_files
+    errors = [http_error(429), http_error(403, "rateLimitExceeded")]
+
+    def throttled_list_files(*args):
+        if errors:
+            raise errors.pop(0)
+        return list_files(*args)
+
+    fake_drive.list_files = throttled_list_files
+    sleeps = []
+    with patch(
+        "hudson_utils.drive_clients.build_drive_client", return_value=fake_drive
+    ):
+        google_drive_service = GoogleDriveService(
+            credentials=None, request_executor=make_executor(sleeps)
+        )
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert [document["title"] for document in documents] == ["cerrado"]
+    assert len(sleeps) == 2
@@ -0,0 +1,163 @@
+from unittest.mock import patch
+
+import pytest
+from fake_drive import PDF_MIME_TYPE, FakeDriveService
+
+from hudson_utils.drive_sync import DriveFolderSync
+from hudson_utils.google_drive import GoogleDriveService
+
+
+@pytest.fixture
+def fake_drive():
+    fake_drive = FakeDriveService(page_size=2)
+    folder_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.add_file("cerrado", parent_id=folder_id)
+    fake_drive.add_file("Elephant", PDF_MIME_TYPE, parent_id=folder_id)
+    fake_drive.folder_id = folder_id
+    return fake_drive
+
+
+@pytest.fixture
+def folder_sync(fake_drive, tmp_path):
+    with patch(
+        "hudson_utils.drive_clients.build_drive_client", return_value=fake_drive
+    ):
+        google_drive_service = GoogleDriveService(credentials=None)
+    return DriveFolderSync(google_drive_service, str(tmp_path / "state.json"))
+
+
+def titles(documents):
+    return sorted(document["title"] for document in documents)
+
+
+def test_first_sync_lists_the_whole_folder(folder_sync):
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.documents) == ["Elephant", "cerrado"]
+    assert titles(result.changed) == ["Elephant", "cerrado"]
+    assert result.removed == []
+
+
+def test_unchanged_folder_only_reads_the_changes_feed(folder_sync, fake_drive):
+    folder_sync.sync("hudson_dias")
+    fake_drive.calls.clear()
+
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.documents) == ["Elephant", "cerrado"]
+    assert result.changed == []
+    assert result.removed == []
+    assert "files.get" not in fake_drive.calls
+    assert fake_drive.calls.count("changes.list") == 1
+
+
+def test_sync_detects_added_modified_and_deleted_files(folder_sync, fake_drive):
+    folder_sync.sync("hudson_dias")
+    cerrado_id, elephant_id = [
+        file_id
+        for file_id, file in fake_drive.file_store.items()
+        if file["name"] in ("cerrado", "Elephant")
+    ]
+
+    fake_drive.add_file("rain-forest", parent_id=fake_drive.folder_id)
+    fake_drive.add_file("elsewhere")
+    fake_drive.add_file("notes.txt", "text/plain", parent_id=fake_drive.folder_id)
+    fake_drive.update_file(cerrado_id)
+    fake_drive.delete_file(elephant_id)
+
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.documents) == ["cerrado", "rain-forest"]
+    assert titles(result.changed) == ["cerrado", "rain-forest"]
+    assert result.removed == [elephant_id]
+    cerrado = [d for d in result.changed if d["id"] == cerrado_id][0]
+    assert cerrado["version"] == "2"
+
+
+def test_full_sync_after_incremental_sync_reports_no_spurious_changes(
+    folder_sync, fake_drive
+):
+    folder_sync.sync("hudson_dias")
+    fake_drive.add_file(
+        "rain-forest", PDF_MIME_TYPE, parent_id=fake_drive.folder_id, content=b"pdf"
+    )
+    changed = folder_sync.sync("hudson_dias").changed
+
+    # A new subfolder makes the next sync list the whole tree again.
+    fake_drive.add_folder("biomes", parent_id=fake_drive.folder_id)
+    result = folder_sync.sync("hudson_dias")
+
+    assert changed[0]["size"] == "3"
+    assert titles(result.documents) == ["Elephant", "cerrado", "rain-forest"]
+    assert result.changed == []
+    assert result.removed == []
+
+
+def test_file_moved_out_of_folder_is_removed(folder_sync, fake_drive):
+    folder_sync.sync("hudson_dias")
+    cerrado_id = [
+        file_id
+        for file_id, file in fake_drive.file_store.items()
+        if file["name"] == "cerrado"
+    ][0]
+
+    fake_drive.update_file(cerrado_id, parents=["another-folder"])
+
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.documents) == ["Elephant"]
+    assert result.removed == [cerrado_id]
+
+
+def test_state_survives_restarts(folder_sync, fake_drive):
+    folder_sync.sync("hudson_dias")
+    fake_drive.add_file("rain-forest", parent_id=fake_drive.folder_id)
+
+    restarted = DriveFolderSync(
+        folder_sync.google_drive_service, folder_sync.state_file
+    )
+    result = restarted.sync("hudson_dias")
+
+    assert titles(result.changed) == ["rain-forest"]
+    assert titles(result.documents) == ["Elephant", "cerrado", "rain-forest"]
+
+
+def test_reset_forces_a_full_sync(folder_sync):
+    folder_sync.sync("hudson_dias")
+    folder_sync.reset()
+
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.changed) == ["Elephant", "cerrado"]
+
+
+def test_unknown_folder(folder_sync):
+    result = folder_sync.sync("missing")
+    assert result.documents == [] and result.changed == [] and result.removed == []
+
+
+def test_sync_follows_subfolders(folder_sync, fake_drive):
+    biomes_id = fake_drive.add_folder("biomes", parent_id=fake_drive.folder_id)
+    fake_drive.add_file("rain-forest", parent_id=biomes_id)
+    folder_sync.sync("hudson_dias")
+
+    fake_drive.add_file("savanna", parent_id=biomes_id)
+    fake_drive.calls.clear()
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.changed) == ["savanna"]
+    assert "files.list" not in fake_drive.calls[1:]
+    savanna = result.changed[0]
+    assert savanna["full_path"] == "hudson_dias/biomes/savanna.docx"
+
+
+def test_new_subfolder_triggers_a_full_listing(folder_sync, fake_drive):
+    folder_sync.sync("hudson_dias")
+
+    biomes_id = fake_drive.add_folder("biomes", parent_id=fake_drive.folder_id)
+    fake_drive.add_file("rain-forest", parent_id=biomes_id)
+    result = folder_sync.sync("hudson_dias")
+
+    assert titles(result.documents) == ["Elephant", "cerrado", "rain-forest"]
+    assert titles(result.changed) == ["rain-forest"]
+    assert result.removed == []
@@ -0,0 +1,173 @@
+from unittest.mock import patch
+
+import pytest
+from fake_drive import PDF_MIME_TYPE, FakeDriveService
+
+from hudson_utils.google_drive import GoogleDriveService
+
+
+@pytest.fixture
+def fake_drive():
+    return FakeDriveService(page_size=2)
+
+
+@pytest.fixture
+def google_drive_service(fake_drive):
+    with patch(
+        "hudson_utils.drive_clients.build_drive_client", return_value=fake_drive
+    ):
+        return GoogleDriveService(credentials=None)
+
+
+def test_get_documents_from_drive_follows_pagination(google_drive_service, fake_drive):
+    folder_id = fake_drive.add_folder("hudson_dias")
+    for i in range(5):
+        fake_drive.add_file(f"document {i}", parent_id=folder_id)
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert [document["title"] for document in documents] == [
+        f"document {i}" for i in range(5)
+    ]
+    assert fake_drive.calls.count("files.list") == 1 + 3
+
+
+def test_get_documents_from_drive_makes_no_per_file_calls(
+    google_drive_service, fake_drive
+):
+    folder_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.add_file("cerrado", parent_id=folder_id)
+    fake_drive.add_file("Elephant", PDF_MIME_TYPE, parent_id=folder_id)
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert "files.get" not in fake_drive.calls
+    elephant = documents[1]
+    assert elephant["mime_type"] == PDF_MIME_TYPE
+    assert (
+        elephant["md5Checksum"] == fake_drive.file_store[elephant["id"]]["md5Checksum"]
+    )
+    assert elephant["modifiedTime"] and elephant["version"] == "1"
+
+
+def test_get_documents_from_drive_filters_mime_types_and_trash(
+    google_drive_service, fake_drive
+):
+    folder_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.add_file("cerrado", parent_id=folder_id)
+    fake_drive.add_file("notes.txt", "text/plain", parent_id=folder_id)
+    fake_drive.add_folder("subfolder", parent_id=folder_id)
+    trashed_id = fake_drive.add_file("old", parent_id=folder_id)
+    fake_drive.file_store[trashed_id]["trashed"] = True
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert [document["title"] for document in documents] == ["cerrado"]
+
+
+def test_get_documents_from_drive_unknown_folder(google_drive_service):
+    assert google_drive_service.get_documents_from_drive("missing") == []
+
+
+def test_to_document_info():
+    document = GoogleDriveService.to_document_info(
+        {
+            "id": "file-1",
+            "name": "cerrado",
+            "mimeType": PDF_MIME_TYPE,
+            "size": "1024",
+            "md5Checksum": "abc",
+        },
+        "hudson_dias",
+    )
+
+    assert document == {
+        "id": "file-1",
+        "full_path": "hudson_dias/cerrado",
+        "title": "cerrado",
+        "mime_type": PDF_MIME_TYPE,
+        "size": "1024",
+        "md5Checksum": "abc",
+    }
+
+
+def build_tree(fake_drive):
+    root_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.add_file("cerrado", parent_id=root_id)
+    biomes_id = fake_drive.add_folder("biomes", parent_id=root_id)
+    reports_id = fake_drive.add_folder("reports", parent_id=root_id)
+    fake_drive.add_file("rain-forest", parent_id=biomes_id)
+    fake_drive.add_file("Elephant.pdf", PDF_MIME_TYPE, parent_id=reports_id)
+    archive_id = fake_drive.add_folder("archive", parent_id=biomes_id)
+    fake_drive.add_file("old", parent_id=archive_id)
+    return root_id
+
+
+def paths(documents):
+    return sorted(document["full_path"] for document in documents)
+
+
+def test_get_documents_from_drive_walks_subfolders(google_drive_service, fake_drive):
+    build_tree(fake_drive)
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert paths(documents) == [
+        "hudson_dias/biomes/archive/old.docx",
+        "hudson_dias/biomes/rain-forest.docx",
+        "hudson_dias/cerrado.docx",
+        "hudson_dias/reports/Elephant.pdf",
+    ]
+    # One folder lookup, then each level is listed once, two files per page: the
+    # root, its two subfolders together, and the archive.
+    assert fake_drive.calls.count("files.list") == 1 + 2 + 2 + 1
+    assert "files.get" not in fake_drive.calls
+
+
+def test_get_documents_from_drive_honours_the_depth_limit(fake_drive):
+    build_tree(fake_drive)
+    with patch(
+        "hudson_utils.drive_clients.build_drive_client", return_value=fake_drive
+    ):
+        shallow = GoogleDriveService(credentials=None, max_depth=0)
+        one_level = GoogleDriveService(credentials=None, max_depth=1)
+
+    assert paths(shallow.get_documents_from_drive("hudson_dias")) == [
+        "hudson_dias/cerrado.docx"
+    ]
+    assert paths(one_level.get_documents_from_drive("hudson_dias")) == [
+        "hudson_dias/biomes/rain-forest.docx",
+        "hudson_dias/cerrado.docx",
+        "hudson_dias/reports/Elephant.pdf",
+    ]
+
+
+def test_get_documents_from_drive_reads_every_matching_folder(
+    google_drive_service, fake_drive
+):
+    first_id = fake_drive.add_folder("hudson_dias")
+    second_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.add_file("cerrado", parent_id=first_id)
+    fake_drive.add_file("rain-forest", parent_id=second_id)
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert [document["title"] for document in documents] == ["cerrado", "rain-forest"]
+
+
+def test_shared_drive_folders_are_listed_within_their_drive(
+    google_drive_service, fake_drive
+):
+    root_id = fake_drive.add_folder("hudson_dias")
+    fake_drive.file_store[root_id]["driveId"] = "drive-1"
+    fake_drive.add_file("cerrado", parent_id=root_id)
+
+    documents = google_drive_service.get_documents_from_drive("hudson_dias")
+
+    assert [document["title"] for document in documents] == ["cerrado"]
+    folder_lookup, listing = fake_drive.list_parameters
+    assert folder_lookup["corpora"] == "allDrives"
+    assert listing["corpora"] == "drive" and listing["driveId"] == "drive-1"
+    for parameters in (folder_lookup, listing):
+        assert parameters["supportsAllDrives"] is True
+        assert parameters["includeItemsFromAllDrives"] is True
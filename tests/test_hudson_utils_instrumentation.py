@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from hudson_utils.instrumentation import (
+    NULL_SPAN,
+    Metrics,
+    call_with_metrics,
+    metrics,
+)
+from hudson_utils.text_extraction import extract_text_from_file
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "examples")
+
+
+@pytest.fixture
+def global_metrics():
+    metrics.reset()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+
+    assert registry.span("drive.list") is NULL_SPAN
+    with registry.span("drive.list"):
+        registry.increment("drive.api_calls")
+
+    assert registry.report() == {"spans": {}, "counters": {}}
+
+
+def test_enabled_metrics_record_spans_and_counters():
+    registry = Metrics(enabled=True)
+
+    for _ in range(3):
+        with registry.span("drive.list"):
+            registry.increment("drive.api_calls")
+    registry.increment("drive.bytes_downloaded", 2048)
+
+    report = registry.report()
+    assert report["spans"]["drive.list"]["count"] == 3
+    assert report["spans"]["drive.list"]["total_seconds"] >= 0
+    assert (
+        report["spans"]["drive.list"]["max_seconds"]
+        <= report["spans"]["drive.list"]["total_seconds"]
+    )
+    assert report["counters"] == {
+        "drive.api_calls": 3,
+        "drive.bytes_downloaded": 2048,
+    }
+
+
+def test_merge_adds_the_measurements_of_a_worker():
+    parent = Metrics(enabled=True)
+    parent.record("extract.pdf_page", 0.5)
+    parent.increment("extract.pdf_pages", 1)
+    worker = Metrics(enabled=True)
+    worker.record("extract.pdf_page", 2.0)
+    worker.increment("extract.pdf_pages", 4)
+
+    parent.merge(worker.report())
+
+    report = parent.report()
+    assert report["spans"]["extract.pdf_page"] == {
+        "count": 2,
+        "total_seconds": 2.5,
+        "max_seconds": 2.0,
+    }
+    assert report["counters"]["extract.pdf_pages"] == 5
+
+
+def test_export_renders_json_and_prometheus():
+    registry = Metrics(enabled=True)
+    registry.record("query.read", 0.25)
+    registry.increment("answer_cache.hits", 2)
+
+    assert json.loads(registry.export("json")) == registry.report()
+    assert registry.export("prometheus").splitlines() == [
+        "# TYPE hudson_span_seconds_total counter",
+        'hudson_span_seconds_total{span="query.read"} 0.25',
+        "# TYPE hudson_span_calls_total counter",
+        'hudson_span_calls_total{span="query.read"} 1',
+        "# TYPE hudson_answer_cache_hits_total counter",
+        "hudson_answer_cache_hits_total 2",
+    ]
+    with pytest.raises(ValueError):
+        registry.export("csv")
+
+
+def test_call_with_metrics_returns_the_extraction_measurements(global_metrics):
+    path = os.path.join(EXAMPLES_DIR, "Elephant.pdf")
+
+    text, report = call_with_metrics(extract_text_from_file, path, "application/pdf")
+
+    assert "elephant" in text.lower()
+    pages = report["counters"]["extract.pdf_pages"]
+    assert pages >= 1
+    assert report["spans"]["extract.pdf_page"]["count"] == pages
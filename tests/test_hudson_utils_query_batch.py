@@ -0,0 +1,73 @@
+import io
+import json
+
+from hudson_utils.query_batch import read_query_records, run_query_file
+
+
+def make_result(query, confidence=0.9):
+    return {
+        "query": query,
+        "answer": f"answer to {query}",
+        "confidence": confidence,
+        "source_document": [{"id": "doc-0", "title": "Cerrado"}],
+        "source": {"document_id": "doc-0", "page": 1, "start": 0, "end": 6},
+    }
+
+
+def test_read_query_records_accepts_text_and_json_lines():
+    lines = ["Where is the Cerrado?\n", "\n", '{"id": 7, "query": "Which season?"}\n']
+
+    assert list(read_query_records(lines)) == [
+        (1, {"query": "Where is the Cerrado?"}, None),
+        (3, {"id": 7, "query": "Which season?"}, None),
+    ]
+
+
+def test_bad_lines_are_reported_and_the_run_goes_on():
+    output = io.StringIO()
+    lines = ['{"question": "no query field"}', "q0", "{curly} query", "q1"]
+
+    answered = run_query_file(
+        lambda queries: [make_result(query) for query in queries],
+        lines,
+        output,
+        threshold=0.5,
+        chunk_size=3,
+    )
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert answered == 2
+    assert records[0] == {"line": 1, "error": "No 'query' field."}
+    assert records[1]["query"] == "q0"
+    assert records[2]["line"] == 3 and records[2]["error"].startswith("Invalid JSON")
+    assert records[3]["query"] == "q1"
+
+
+def test_results_are_written_as_each_chunk_is_answered():
+    output = io.StringIO()
+    chunks = []
+    written_before_chunk = []
+
+    def answer_queries(queries):
+        chunks.append(queries)
+        written_before_chunk.append(output.getvalue().count("\n"))
+        return [make_result(query, 0.9 if query != "q2" else 0.1) for query in queries]
+
+    answered = run_query_file(
+        answer_queries,
+        iter(["q0", "q1", '{"id": "x", "query": "q2"}', "q3", "q4"]),
+        output,
+        threshold=0.5,
+        chunk_size=2,
+    )
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert answered == 5
+    assert chunks == [["q0", "q1"], ["q2", "q3"], ["q4"]]
+    assert written_before_chunk == [0, 2, 4]
+    assert [record["query"] for record in records] == ["q0", "q1", "q2", "q3", "q4"]
+    assert records[2]["id"] == "x"
+    assert records[2]["meets_threshold"] is False
+    assert records[0]["source"]["title"] == "Cerrado"
+    assert records[4]["timing"]["chunk_size"] == 1
+    assert records[0]["timing"]["chunk_ms"] >= 0
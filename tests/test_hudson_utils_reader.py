@@ -0,0 +1,205 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from tiny_qa_model import build_tiny_qa_model
+
+from hudson_utils.instrumentation import metrics
+from hudson_utils.reader import BatchedReader, TokenizedCorpus, best_span
+from hudson_utils.reader_pool import ShardedReader
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    return build_tiny_qa_model(str(tmp_path_factory.mktemp("tiny_qa_model")))
+
+
+def test_best_span_picks_highest_start_end_product():
+    start_logits = np.array([9.0, 0.0, 5.0, 0.0, 0.0])
+    end_logits = np.array([9.0, 0.0, 0.0, 5.0, 0.0])
+    context_mask = np.array([False, True, True, True, True])
+
+    start, end, score = best_span(start_logits, end_logits, context_mask)
+
+    assert (start, end) == (2, 3)
+    assert 0 < score <= 1
+
+
+def test_best_span_never_ends_before_it_starts():
+    start_logits = np.array([0.0, 0.0, 9.0])
+    end_logits = np.array([0.0, 9.0, 0.0])
+    context_mask = np.array([True, True, True])
+
+    start, end, _ = best_span(start_logits, end_logits, context_mask)
+
+    assert start <= end
+
+
+def test_best_span_respects_max_answer_length():
+    start_logits = np.array([9.0, 0.0, 0.0, 0.0])
+    end_logits = np.array([0.0, 0.0, 0.0, 9.0])
+    context_mask = np.array([True, True, True, True])
+
+    start, end, _ = best_span(
+        start_logits, end_logits, context_mask, max_answer_length=2
+    )
+
+    assert end - start < 2
+
+
+def test_answer_returns_span_of_one_of_the_passages(tiny_model):
+    reader = BatchedReader(model=tiny_model, batch_size=4)
+    contexts = [
+        ["the cerrado has a dry season and a rainy season"],
+        ["elephants are strong animals", "rainforests are in brazil and peru"],
+    ]
+
+    results = reader.answer(
+        ["what seasons has the cerrado?", "which animals are strong?"], contexts
+    )
+
+    for result, passages in zip(results, contexts):
+        passage = passages[result["context_index"]]
+        start, end = result["start"], result["end"]
+        assert result["answer"] == passage[start:end]
+        assert result["answer"]
+        assert 0 < result["score"] <= 1
+
+
+def test_answer_does_not_depend_on_batch_size(tiny_model):
+    queries = ["what seasons has the cerrado?", "which animals are strong?"]
+    contexts = [
+        ["the cerrado has a dry season and a rainy season", "elephants are strong"],
+        ["elephants are strong animals", "the amazon rainforest is in brazil " * 30],
+    ]
+
+    batched = BatchedReader(model=tiny_model, batch_size=8, max_seq_length=64)
+    one_by_one = BatchedReader(
+        model=tiny_model, batch_size=1, max_seq_length=64, doc_stride=16
+    )
+    batched.doc_stride = 16
+
+    for expected, actual in zip(
+        one_by_one.answer(queries, contexts), batched.answer(queries, contexts)
+    ):
+        assert actual["answer"] == expected["answer"]
+        assert actual["context_index"] == expected["context_index"]
+        assert actual["score"] == pytest.approx(expected["score"], rel=1e-4)
+
+
+def test_answer_without_passages(tiny_model):
+    reader = BatchedReader(model=tiny_model)
+
+    results = reader.answer(["anything?"], [[]])
+
+    assert results[0]["answer"] == "" and results[0]["context_index"] is None
+
+
+def test_build_features_matches_pair_tokenization(tiny_model):
+    reader = BatchedReader(model=tiny_model)
+    question = "what seasons has the cerrado?"
+    passage = "the cerrado has a dry season and a rainy season"
+    corpus = TokenizedCorpus.build(reader.tokenizer, [passage])
+    question_ids = reader.tokenizer([question], add_special_tokens=False)["input_ids"]
+
+    features = reader.build_features(question_ids, [[0]], corpus)
+
+    expected = reader.tokenizer(question, passage)
+    assert len(features) == 1
+    _, _, input_ids, token_type_ids, first, offsets = features[0]
+    assert input_ids == expected["input_ids"]
+    assert token_type_ids == expected["token_type_ids"]
+    assert expected.sequence_ids(0)[first] == 1
+    assert expected.sequence_ids(0)[first - 1] is None
+    assert len(offsets) == len(corpus.passage(0)[0])
+
+
+def test_build_features_splits_long_passages_into_strided_windows(tiny_model):
+    reader = BatchedReader(model=tiny_model, max_seq_length=32, doc_stride=8)
+    corpus = TokenizedCorpus.build(reader.tokenizer, ["the amazon is in brazil " * 20])
+    question_ids = reader.tokenizer(["where?"], add_special_tokens=False)["input_ids"]
+
+    features = reader.build_features(question_ids, [[0]], corpus)
+
+    assert len(features) > 1
+    assert all(len(feature[2]) <= 32 for feature in features)
+    window_offsets = [feature[5] for feature in features]
+    # Consecutive windows share `doc_stride` tokens.
+    assert (window_offsets[0][-8:] == window_offsets[1][:8]).all()
+
+
+def test_answer_tokenized_matches_answer(tiny_model):
+    reader = BatchedReader(model=tiny_model, max_seq_length=64, doc_stride=16)
+    passages = [
+        "the cerrado has a dry season and a rainy season",
+        "elephants are strong animals",
+        "the amazon rainforest is in brazil " * 10,
+    ]
+    queries = ["what seasons has the cerrado?", "which animals are strong?"]
+    corpus = reader.tokenize_corpus(passages)
+
+    tokenized = reader.answer_tokenized(queries, [[0, 2], [1, 2]], corpus, passages)
+    untokenized = reader.answer(
+        queries, [[passages[0], passages[2]], [passages[1], passages[2]]]
+    )
+
+    assert tokenized == untokenized
+
+
+def test_tokenize_corpus_is_cached_on_disk(tiny_model, tmp_path):
+    reader = BatchedReader(model=tiny_model)
+    passages = ["elephants are strong animals", "the cerrado has a dry season"]
+
+    first = reader.tokenize_corpus(passages, str(tmp_path))
+    with patch.object(TokenizedCorpus, "build") as mock_build:
+        second = reader.tokenize_corpus(passages, str(tmp_path))
+        mock_build.assert_not_called()
+
+    assert isinstance(second.input_ids, np.memmap)
+    for index in range(len(passages)):
+        for expected, actual in zip(first.passage(index), second.passage(index)):
+            assert (expected == actual).all()
+
+
+def test_tokenize_corpus_drops_older_versions(tiny_model, tmp_path):
+    reader = BatchedReader(model=tiny_model)
+
+    reader.tokenize_corpus(["elephants are strong"], str(tmp_path))
+    reader.tokenize_corpus(["elephants are skilled"], str(tmp_path))
+
+    (model_dir,) = os.listdir(tmp_path)
+    assert len(os.listdir(tmp_path / model_dir)) == 1
+
+
+def test_sharded_reader_matches_single_process_reader(tiny_model):
+    contexts = [
+        ["the cerrado has a dry season and a rainy season " * 30],
+        ["elephants are strong animals", "rainforests are in brazil and peru"],
+        [],
+    ]
+    queries = ["what seasons has the cerrado?", "which animals are strong?", "who?"]
+    expected = BatchedReader(model=tiny_model, batch_size=2).answer(queries, contexts)
+
+    reader = ShardedReader(model=tiny_model, batch_size=2, workers=2)
+    try:
+        assert reader.answer(queries, contexts) == expected
+        metrics.enable()
+        reader.answer(queries, contexts)
+        assert metrics.report()["counters"]["reader.forward_batches"] > 1
+    finally:
+        metrics.disable()
+        metrics.reset()
+        reader.close()
+
+
+def test_sharded_onnx_reader_exports_in_the_parent_before_forking(tiny_model):
+    with patch("hudson_utils.reader_pool.prepare_reader_backend") as prepare, patch(
+        "hudson_utils.reader_pool.multiprocessing.get_context"
+    ) as ctx:
+        prepare.side_effect = lambda *_: ctx.return_value.Pool.assert_not_called()
+        reader = ShardedReader(model=tiny_model, backend="onnx", workers=2)
+
+    prepare.assert_called_once_with("onnx", tiny_model)
+    ctx.return_value.Pool.assert_called_once()
+    assert reader.backend is None
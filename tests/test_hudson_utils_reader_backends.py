@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from tiny_qa_model import build_tiny_qa_model
+
+from hudson_utils.reader import BatchedReader
+from hudson_utils.reader_backends import OnnxBackend, load_reader_backend
+
+QUERIES = ["what seasons has the cerrado?", "which animals are strong?"]
+CONTEXTS = [
+    ["the cerrado has a dry season and a rainy season", "elephants are strong"],
+    ["elephants are strong and skilled animals", "the amazon is in brazil " * 30],
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    return build_tiny_qa_model(str(tmp_path_factory.mktemp("tiny_qa_model")))
+
+
+@pytest.fixture(scope="module")
+def reference_results(tiny_model):
+    reader = BatchedReader(model=tiny_model, backend="transformers")
+    return reader.answer(QUERIES, CONTEXTS)
+
+
+def make_inputs():
+    return {
+        "input_ids": np.array([[2, 10, 11, 3, 12, 13, 3, 0]]),
+        "attention_mask": np.array([[1, 1, 1, 1, 1, 1, 1, 0]]),
+        "token_type_ids": np.array([[0, 0, 0, 0, 1, 1, 1, 0]]),
+    }
+
+
+def assert_parity(results, reference_results, score_tolerance):
+    for result, reference in zip(results, reference_results):
+        assert result["answer"] == reference["answer"]
+        assert result["context_index"] == reference["context_index"]
+        assert result["score"] == pytest.approx(reference["score"], abs=score_tolerance)
+
+
+def test_onnx_backend_parity(tiny_model, reference_results, tmp_path):
+    reader = BatchedReader(model=tiny_model)
+    reader.backend = OnnxBackend(
+        tiny_model, num_threads=1, onnx_cache_dir=str(tmp_path)
+    )
+
+    assert_parity(
+        reader.answer(QUERIES, CONTEXTS), reference_results, score_tolerance=1e-5
+    )
+
+
+def test_onnx_backend_reuses_exported_model(tiny_model, tmp_path):
+    OnnxBackend(tiny_model, onnx_cache_dir=str(tmp_path))
+    exported = list(tmp_path.iterdir())
+
+    OnnxBackend(tiny_model, onnx_cache_dir=str(tmp_path))
+
+    assert list(tmp_path.iterdir()) == exported and len(exported) == 1
+
+
+def test_quantized_backend_parity(tiny_model, reference_results):
+    reader = BatchedReader(model=tiny_model, backend="quantized")
+
+    assert_parity(
+        reader.answer(QUERIES, CONTEXTS), reference_results, score_tolerance=1e-2
+    )
+
+
+def test_quantized_backend_logits_close_to_reference(tiny_model):
+    reference = load_reader_backend("transformers", tiny_model)
+    quantized = load_reader_backend("quantized", tiny_model)
+
+    for expected, actual in zip(reference(make_inputs()), quantized(make_inputs())):
+        assert np.allclose(expected, actual, atol=0.05)
+
+
+def test_unknown_backend(tiny_model):
+    with pytest.raises(ValueError):
+        load_reader_backend("tensorrt", tiny_model)
@@ -0,0 +1,90 @@
+import io
+
+import pytest
+
+from hudson_utils.retrieval import (
+    PAGE_SEPARATOR,
+    BM25Index,
+    iter_pages,
+    iter_passages,
+    split_into_passages,
+    tokenize,
+)
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("The Cerrado, in Brazil!") == ["the", "cerrado", "in", "brazil"]
+
+
+def test_split_into_passages_without_overlap():
+    text = " ".join(str(i) for i in range(10))
+    passages = split_into_passages(text, passage_size=4, overlap=0)
+    assert passages == ["0 1 2 3", "4 5 6 7", "8 9"]
+
+
+def test_split_into_passages_with_overlap():
+    text = " ".join(str(i) for i in range(10))
+    passages = split_into_passages(text, passage_size=4, overlap=2)
+    assert passages == ["0 1 2 3", "2 3 4 5", "4 5 6 7", "6 7 8 9"]
+
+
+def test_split_into_passages_empty_text():
+    assert split_into_passages("", passage_size=4) == []
+
+
+def test_split_into_passages_invalid_size():
+    with pytest.raises(ValueError):
+        split_into_passages("some text", passage_size=0)
+
+
+def test_iter_passages_locates_passages_in_the_document():
+    pages = ["The Cerrado  has\na dry", "season and a rainy season."]
+    document_text = PAGE_SEPARATOR.join(pages)
+
+    passages = list(iter_passages(pages, passage_size=4, overlap=1))
+
+    assert [passage.page for passage in passages] == [1, 1, 2]
+    for passage in passages:
+        assert document_text[passage.start : passage.end] == passage.text  # noqa E203
+    assert passages[1].text == f"a dry{PAGE_SEPARATOR}season and"
+    assert passages[1].page_at(passages[1].text.index("season")) == 2
+
+
+def test_bm25_index_ranks_relevant_passage_first():
+    passages = [
+        "The Cerrado has a dry season and a rainy season.",
+        "Rainforests can be found in Brazil, Peru and Colombia.",
+        "Elephants are strong and skilled animals.",
+    ]
+    index = BM25Index(passages)
+
+    hits = index.search("Which countries have rainforests?", top_k=2)
+
+    assert hits[0][0] == 1
+    assert len(hits) == 1
+
+
+def test_bm25_index_respects_top_k():
+    passages = ["season one", "season two", "season three"]
+    index = BM25Index(passages)
+
+    assert len(index.search("season", top_k=2)) == 2
+
+
+def test_bm25_index_no_match():
+    index = BM25Index(["The Cerrado has a dry season."])
+    assert index.search("elephant", top_k=3) == []
+
+
+def test_bm25_index_empty_corpus():
+    index = BM25Index([])
+    assert index.search("anything", top_k=3) == []
+
+
+def test_iter_pages_reads_pages_across_chunks():
+    text = PAGE_SEPARATOR.join(["first page", "", "third page is longer"])
+
+    pages = list(iter_pages(io.StringIO(text), chunk_size=3))
+
+    assert pages == ["first page", "", "third page is longer"]
+    assert list(iter_pages(io.StringIO(""))) == [""]
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import time
+
+from hudson_utils.server import QueryServer
+
+
+class FakeAnswerer:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, queries):
+        self.batches.append(list(queries))
+        time.sleep(self.delay)
+        return [{"query": query, "answer": query.upper()} for query in queries]
+
+
+async def http_request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        (
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1")
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(content)
+
+
+def run_with_server(scenario, **server_options):
+    async def main():
+        server = QueryServer(port=0, **server_options)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_queries_are_coalesced_into_one_batch():
+    answerer = FakeAnswerer()
+
+    async def scenario(server):
+        return await asyncio.gather(
+            *(
+                http_request(server.port, "POST", "/query", {"query": f"q{i}"})
+                for i in range(8)
+            )
+        )
+
+    responses = run_with_server(scenario, answer_queries=answerer, max_wait_ms=200)
+
+    assert [payload["answer"] for _, payload in responses] == [
+        f"Q{i}" for i in range(8)
+    ]
+    assert len(answerer.batches) == 1
+    assert sorted(answerer.batches[0]) == [f"q{i}" for i in range(8)]
+
+
+def test_batches_are_capped_by_max_batch_size():
+    answerer = FakeAnswerer()
+
+    async def scenario(server):
+        return await http_request(
+            server.port, "POST", "/query", {"queries": [f"q{i}" for i in range(5)]}
+        )
+
+    status, payload = run_with_server(
+        scenario, answer_queries=answerer, max_batch_size=2, max_wait_ms=50
+    )
+
+    assert status == 200
+    assert [result["answer"] for result in payload["results"]] == [
+        "Q0",
+        "Q1",
+        "Q2",
+        "Q3",
+        "Q4",
+    ]
+    assert [len(batch) for batch in answerer.batches] == [2, 2, 1]
+
+
+def test_queries_arriving_during_a_batch_join_the_next_one():
+    answerer = FakeAnswerer(delay=0.2)
+
+    async def scenario(server):
+        first = asyncio.ensure_future(
+            http_request(server.port, "POST", "/query", {"query": "first"})
+        )
+        await asyncio.sleep(0.05)
+        others = [
+            http_request(server.port, "POST", "/query", {"query": f"q{i}"})
+            for i in range(3)
+        ]
+        return await asyncio.gather(first, *others)
+
+    run_with_server(scenario, answer_queries=answerer, max_wait_ms=1)
+
+    assert answerer.batches[0] == ["first"]
+    assert sorted(answerer.batches[1]) == ["q0", "q1", "q2"]
+
+
+def test_refresh_and_health():
+    refreshed = []
+
+    async def scenario(server):
+        return (
+            await http_request(server.port, "GET", "/health"),
+            await http_request(server.port, "POST", "/refresh"),
+        )
+
+    health, refresh = run_with_server(
+        scenario,
+        answer_queries=FakeAnswerer(),
+        refresh=lambda: refreshed.append(True),
+    )
+
+    assert health == (200, {"status": "ok"})
+    assert refresh == (200, {"status": "refreshed"})
+    assert refreshed == [True]
+
+
+def test_bad_requests():
+    async def scenario(server):
+        return (
+            await http_request(server.port, "POST", "/query", {"other": 1}),
+            await http_request(server.port, "GET", "/missing"),
+        )
+
+    bad_payload, not_found = run_with_server(scenario, answer_queries=FakeAnswerer())
+
+    assert bad_payload[0] == 400
+    assert not_found[0] == 404
+
+
+def test_answer_errors_are_reported():
+    def failing(queries):
+        raise RuntimeError("model crashed")
+
+    async def scenario(server):
+        return await http_request(server.port, "POST", "/query", {"query": "q"})
+
+    status, payload = run_with_server(scenario, answer_queries=failing)
+
+    assert status == 500
+    assert "model crashed" in payload["error"]
+
+
+def test_metrics_endpoint_serves_the_report():
+    async def scenario(server):
+        return await http_request(server.port, "GET", "/metrics")
+
+    status, payload = run_with_server(
+        scenario, answer_queries=FakeAnswerer(), metrics_format="json"
+    )
+
+    assert status == 200
+    assert set(payload) == {"spans", "counters"}
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from hudson_utils.lazy_loading import BackgroundLoader
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torch", "transformers", "onnxruntime", "pdfplumber")
+
+IMPORT_BUDGET_SECONDS = 0.5
+
+
+def run_python(*args):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return completed.stdout, time.perf_counter() - start
+
+
+def test_importing_hudson_utils_does_not_import_heavy_modules():
+    stdout, _ = run_python(
+        "-c",
+        "import sys, main, hudson_utils.text_processing, hudson_utils.drive_sync; "
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])",
+    )
+    assert stdout.strip() == "[]"
+
+
+def test_help_starts_within_budget():
+    stdout, elapsed = run_python("main.py", "--help")
+
+    assert "Usage: python main.py" in stdout
+    assert elapsed < IMPORT_BUDGET_SECONDS
+
+
+def test_background_loader_builds_once():
+    calls = []
+    loader = BackgroundLoader(lambda: calls.append(1) or "model")
+
+    loader.start()
+    assert loader.get() == "model"
+    assert loader.get() == "model"
+    assert calls == [1]
+    assert loader.loaded
+
+
+def test_background_loader_builds_on_first_use():
+    loader = BackgroundLoader(lambda: "model")
+
+    assert not loader.loaded
+    assert loader.get() == "model"
+
+
+def test_background_loader_reraises_factory_errors():
+    def factory():
+        raise OSError("model not found")
+
+    loader = BackgroundLoader(factory)
+    loader.start()
+
+    with pytest.raises(OSError):
+        loader.get()
@@ -0,0 +1,516 @@
+import io
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fake_drive import PDF_MIME_TYPE, FakeDriveService, FakeMediaHttp
+
+from hudson_utils.answer_cache import AnswerCache
+from hudson_utils.document_cache import DocumentTextCache
+from hudson_utils.retrieval import iter_passages
+from hudson_utils.text_processing import DriveServiceWrapper, TextProcessor
+
+DOC_MIME_TYPE = "application/vnd.google-apps.document"
+
+
+def make_documents(count):
+    return [
+        {"id": f"doc-{i}", "title": f"Document {i}", "mime_type": DOC_MIME_TYPE}
+        for i in range(count)
+    ]
+
+
+def passages_of(text):
+    return list(iter_passages([text]))
+
+
+@pytest.fixture
+def text_processor():
+    with patch("hudson_utils.text_processing.BatchedReader"):
+        yield TextProcessor(
+            drive_service=MagicMock(),
+            threshold=0.5,
+            download_workers=4,
+            extraction_workers=1,
+        )
+
+
+@pytest.fixture
+def cascade_processor():
+    # Each reader built is a separate mock.
+    with patch(
+        "hudson_utils.text_processing.BatchedReader",
+        side_effect=lambda **_: MagicMock(),
+    ):
+        yield TextProcessor(
+            drive_service=MagicMock(),
+            threshold=0.5,
+            extraction_workers=1,
+            cascade_model="small-model",
+        )
+
+
+def spool_file_id(file_id, mime_type, file):
+    file.write(file_id.encode("utf-8"))
+
+
+def read_spooled_file(path, mime_type, text_path=None):
+    with open(path, "rb") as spooled_file:
+        return f"text of {spooled_file.read().decode()}"
+
+
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as text_file:
+        text_file.write(text)
+    return text
+
+
+def test_extract_texts_keeps_document_order(text_processor):
+    documents = make_documents(4)
+
+    def download_to_file(file_id, mime_type, file):
+        # Later documents finish downloading first.
+        time.sleep(0.01 * (4 - int(file_id.split("-")[1])))
+        spool_file_id(file_id, mime_type, file)
+
+    text_processor.drive_service_wrapper.download_to_file = download_to_file
+    with patch(
+        "hudson_utils.text_processing.extract_text_from_file",
+        side_effect=read_spooled_file,
+    ):
+        texts = text_processor.extract_texts(documents)
+
+    assert texts == [f"text of doc-{i}" for i in range(4)]
+
+
+def test_extract_texts_isolates_failures(text_processor):
+    documents = make_documents(3)
+    spooled_paths = []
+
+    def download_to_file(file_id, mime_type, file):
+        if file_id == "doc-0":
+            raise Exception("HTTP 500")
+        spool_file_id(file_id, mime_type, file)
+
+    def fake_extract_text(path, mime_type, text_path=None):
+        spooled_paths.append(path)
+        text = read_spooled_file(path, mime_type)
+        if text == "text of doc-2":
+            raise ValueError("corrupted file")
+        return "text"
+
+    text_processor.drive_service_wrapper.download_to_file = download_to_file
+    with patch(
+        "hudson_utils.text_processing.extract_text_from_file",
+        side_effect=fake_extract_text,
+    ):
+        texts = text_processor.extract_texts(documents)
+
+    assert texts == ["", "text", ""]
+    assert not any(os.path.exists(path) for path in spooled_paths)
+
+
+def test_extract_texts_uses_document_cache(text_processor):
+    document = dict(make_documents(1)[0], modifiedTime="2023-12-01T00:00:00Z")
+    text_processor.document_cache = MagicMock()
+    text_processor.document_cache.open.return_value = io.StringIO("cached text")
+    text_processor.drive_service_wrapper = MagicMock()
+
+    texts = text_processor.extract_texts([document])
+
+    assert texts == ["cached text"]
+    text_processor.drive_service_wrapper.download_to_file.assert_not_called()
+
+
+def test_extract_passages_streams_downloads_into_the_cache(text_processor, tmp_path):
+    fake_drive = FakeDriveService()
+    file_id = fake_drive.add_file("Rainforests", content=b"docx bytes")
+    document = {
+        "id": file_id,
+        "title": "Rainforests",
+        "mime_type": DOC_MIME_TYPE,
+        "version": "1",
+    }
+    text_processor.drive_service_wrapper = DriveServiceWrapper(fake_drive)
+    text_processor.document_cache = DocumentTextCache(str(tmp_path / "cache"))
+    text_processor.passage_size = 3
+
+    pages = ["one two three", "four five"]
+    with patch(
+        "hudson_utils.text_extraction.TextExtractor.iter_page_texts",
+        side_effect=lambda path, mime_type: iter(pages),
+    ) as iter_page_texts:
+        passages = text_processor.extract_passages([document])
+
+    spooled_path = iter_page_texts.call_args[0][0]
+    assert not os.path.exists(spooled_path)
+    assert [passage.text for passage in passages[0]] == [
+        "one two three",
+        "two three\ffour",
+        "three\ffour five",
+    ]
+    assert text_processor.document_cache.get(document) == "one two three\ffour five"
+
+
+def test_cached_text_is_split_page_by_page(text_processor, tmp_path):
+    document = dict(make_documents(1)[0], version="1")
+    text_processor.document_cache = DocumentTextCache(str(tmp_path))
+    text_processor.document_cache.put(document, "one two three\ffour five")
+    text_processor.passage_size = 3
+    text_processor.drive_service_wrapper = MagicMock()
+
+    passages = text_processor.extract_passages([document])
+
+    assert passages[0] == list(iter_passages(["one two three", "four five"], 3))
+    text_processor.drive_service_wrapper.download_to_file.assert_not_called()
+
+
+def test_extract_texts_isolates_corrupt_cache_entries(text_processor, tmp_path):
+    documents = [dict(document, version="1") for document in make_documents(2)]
+    cache = DocumentTextCache(str(tmp_path))
+    cache.put(documents[0], "good text one")
+    cache.put(documents[1], "good text two")
+    with open(cache.entry_path(cache.cache_key(documents[1])), "wb") as entry:
+        entry.write(b"\xff\xfe not utf-8")
+    text_processor.document_cache = cache
+    text_processor.drive_service_wrapper = MagicMock()
+
+    texts = text_processor.extract_texts(documents)
+
+    assert texts == ["good text one", ""]
+    assert cache.get(documents[1]) is None
+    assert cache.get(documents[0]) == "good text one"
+
+
+def test_process_document_reads_cached_text(text_processor, tmp_path):
+    document = dict(make_documents(1)[0], version="1")
+    text_processor.document_cache = DocumentTextCache(str(tmp_path))
+    text_processor.drive_service_wrapper.download_to_file = spool_file_id
+
+    with patch(
+        "hudson_utils.text_processing.extract_text_from_file",
+        side_effect=lambda path, mime_type, text_path: write_text(text_path, "text"),
+    ) as extract_text:
+        texts = [text_processor.process_document(document) for _ in range(2)]
+
+    assert texts == ["text", "text"]
+    assert extract_text.call_count == 1
+
+
+def test_download_to_file_downloads_in_chunks(tmp_path):
+    fake_drive = FakeDriveService()
+    file_id = fake_drive.add_file("Report", PDF_MIME_TYPE, content=b"0123456789")
+    wrapper = DriveServiceWrapper(fake_drive)
+
+    with open(tmp_path / "report.pdf", "wb") as spool_file:
+        wrapper.download_to_file(file_id, PDF_MIME_TYPE, spool_file, chunk_size=4)
+
+    assert (tmp_path / "report.pdf").read_bytes() == b"0123456789"
+    assert fake_drive.media_requests == [
+        (file_id, "bytes=0-3"),
+        (file_id, "bytes=4-7"),
+        (file_id, "bytes=8-11"),
+    ]
+
+
+def test_process_queries_sends_only_retrieved_passages(text_processor):
+    documents = make_documents(2)
+    texts = {
+        "doc-0": "The Cerrado has a dry season and a rainy season.",
+        "doc-1": "Elephants are strong and skilled animals.",
+    }
+    text_processor.extract_passages = lambda docs: [
+        passages_of(texts[d["id"]]) for d in docs
+    ]
+    text_processor.reader.answer_tokenized.return_value = [
+        {"answer": "Elephants", "score": 0.9, "context_index": 0, "start": 0, "end": 9}
+    ]
+
+    results = text_processor.process_queries(["Which animals are strong?"], documents)
+
+    text_processor.reader.answer_tokenized.assert_called_once_with(
+        ["Which animals are strong?"],
+        [[1]],
+        text_processor.tokenized_corpus,
+        [texts["doc-0"], texts["doc-1"]],
+    )
+    assert results[0]["answer"] == "Elephants"
+    assert results[0]["confidence"] == 0.9
+    assert results[0]["source_document"] == [documents[1]]
+
+
+def test_answer_queries_reports_the_answer_span(text_processor):
+    document = make_documents(1)[0]
+    pages = ["Savannas are dry.", "Rainforests can be found\nin Brazil and Peru."]
+    text_processor.extract_passages = lambda docs: [list(iter_passages(pages))]
+    text_processor.update_corpus([document])
+    passage = text_processor.passages[0]
+    start = passage.index("Brazil")
+    text_processor.reader.answer_tokenized.return_value = [
+        {
+            "answer": passage[start - 3 : start + 6],  # noqa E203
+            "score": 0.9,
+            "context_index": 0,
+            "start": start - 3,
+            "end": start + 6,
+        }
+    ]
+
+    result = text_processor.answer_queries(["Where are rainforests?"])[0]
+
+    document_text = "\f".join(pages)
+    source = result["source"]
+    assert result["answer"] == "in Brazil"
+    assert result["source_document"] == [document]
+    assert source["document_id"] == "doc-0"
+    assert source["page"] == 2
+    assert document_text[source["start"] : source["end"]] == "in Brazil"  # noqa E203
+
+
+def test_answer_cache_skips_the_reader_until_a_document_changes(text_processor):
+    documents = [dict(document, version="1") for document in make_documents(1)]
+    text_processor.answer_cache = AnswerCache()
+    text_processor.extract_passages = lambda docs: [
+        passages_of("Rainforests can be found in Brazil.") for _ in docs
+    ]
+    text_processor.reader.answer_tokenized.side_effect = lambda queries, *_: [
+        {"answer": "Brazil", "score": 0.9, "context_index": 0, "start": 28, "end": 34}
+        for _ in queries
+    ]
+
+    text_processor.update_corpus(documents)
+    first = text_processor.answer_queries(["Where are rainforests?"])
+    repeated = text_processor.answer_queries(
+        ["where are rainforests", "Where are rainforests?"]
+    )
+    assert text_processor.reader.answer_tokenized.call_count == 1
+    assert repeated == [
+        dict(first[0], query="where are rainforests"),
+        first[0],
+    ]
+
+    text_processor.update_corpus([dict(documents[0], version="2")])
+    text_processor.answer_queries(["Where are rainforests?"])
+    assert text_processor.reader.answer_tokenized.call_count == 2
+
+
+def test_process_queries_batches_all_queries(text_processor):
+    documents = make_documents(2)
+    texts = {
+        "doc-0": "The Cerrado has a dry season and a rainy season.",
+        "doc-1": "Elephants are strong and skilled animals.",
+    }
+    text_processor.extract_passages = lambda docs: [
+        passages_of(texts[d["id"]]) for d in docs
+    ]
+    text_processor.reader.answer_tokenized.return_value = [
+        {"answer": "dry", "score": 0.8, "context_index": 0, "start": 0, "end": 3},
+        {"answer": "Elephants", "score": 0.9, "context_index": 0, "start": 0, "end": 9},
+    ]
+
+    results = text_processor.process_queries(
+        ["Which season is dry?", "Which animals are strong?"], documents
+    )
+
+    text_processor.reader.answer_tokenized.assert_called_once()
+    assert [result["source_document"] for result in results] == [
+        [documents[0]],
+        [documents[1]],
+    ]
+
+
+def test_process_queries_without_matching_passage(text_processor):
+    documents = make_documents(1)
+    text_processor.extract_passages = lambda docs: [
+        passages_of("The Cerrado has a dry season.")
+    ]
+    text_processor.reader.answer_tokenized.return_value = [
+        {"answer": "", "score": 0.0, "context_index": None, "start": 0, "end": 0}
+    ]
+
+    results = text_processor.process_queries(["elephants?"], documents)
+
+    assert text_processor.reader.answer_tokenized.call_args[0][1] == [[]]
+    assert results[0]["answer"] == ""
+    assert results[0]["confidence"] == 0.0
+    assert results[0]["source_document"] == []
+    assert results[0]["source"] is None
+
+
+def test_drive_service_wrapper_uses_one_http_per_thread(tmp_path):
+    fake_drive = FakeDriveService()
+    file_id = fake_drive.add_file("Report", PDF_MIME_TYPE, content=b"report")
+    http_factory = MagicMock(side_effect=lambda: FakeMediaHttp(fake_drive, file_id))
+    wrapper = DriveServiceWrapper(fake_drive, http_factory)
+
+    for _ in range(2):
+        with open(tmp_path / "report.pdf", "wb") as spool_file:
+            wrapper.download_to_file(file_id, PDF_MIME_TYPE, spool_file)
+
+    http_factory.assert_called_once()
+    assert len(fake_drive.media_requests) == 2
+
+
+def test_update_corpus_only_ingests_new_and_changed_documents(text_processor):
+    documents = [dict(document, version="1") for document in make_documents(3)]
+    ingested = []
+
+    def extract_passages(docs):
+        ingested.append([d["id"] for d in docs])
+        return [passages_of(f"text of {d['id']} version {d['version']}") for d in docs]
+
+    text_processor.extract_passages = extract_passages
+    text_processor.update_corpus(documents)
+
+    documents[1] = dict(documents[1], version="2")
+    text_processor.update_corpus(documents[:2])
+
+    assert ingested == [["doc-0", "doc-1", "doc-2"], ["doc-1"]]
+    assert text_processor.passages == [
+        "text of doc-0 version 1",
+        "text of doc-1 version 2",
+    ]
+    assert text_processor.index.search("doc", top_k=5)
+    text_processor.reader.tokenize_corpus.assert_called_with(
+        text_processor.passages, None
+    )
+
+
+def test_update_corpus_invalidates_removed_documents(text_processor):
+    text_processor.document_cache = MagicMock()
+    text_processor.extract_passages = lambda docs: [passages_of("text") for _ in docs]
+
+    text_processor.update_corpus(make_documents(1), removed_ids=["doc-9"])
+
+    text_processor.document_cache.invalidate.assert_called_once_with("doc-9")
+
+
+def test_cascade_escalates_only_low_confidence_answers(cascade_processor):
+    documents = make_documents(2)
+    texts = {
+        "doc-0": "The Cerrado has a dry season and a rainy season.",
+        "doc-1": "Elephants are strong and skilled animals.",
+    }
+    cascade_processor.extract_passages = lambda docs: [
+        passages_of(texts[d["id"]]) for d in docs
+    ]
+    small_reader = cascade_processor.cascade_reader
+    large_reader = cascade_processor.reader
+    assert small_reader is not large_reader
+    small_reader.answer_tokenized.return_value = [
+        {"answer": "dry", "score": 0.9, "context_index": 0, "start": 0, "end": 3},
+        {"answer": "skilled", "score": 0.2, "context_index": 0, "start": 0, "end": 7},
+        {"answer": "", "score": 0.0, "context_index": None, "start": 0, "end": 0},
+    ]
+    large_reader.answer_tokenized.return_value = [
+        {"answer": "Elephants", "score": 0.8, "context_index": 0, "start": 0, "end": 9}
+    ]
+
+    results = cascade_processor.process_queries(
+        ["Which season is dry?", "Which animals are strong?", "penguins?"],
+        documents,
+    )
+
+    large_reader.answer_tokenized.assert_called_once_with(
+        ["Which animals are strong?"],
+        [[1]],
+        cascade_processor.tokenized_corpus,
+        cascade_processor.passages,
+    )
+    assert small_reader.answer_tokenized.call_args[0][2] is (
+        cascade_processor.cascade_tokenized_corpus
+    )
+    assert [result["answer"] for result in results] == ["dry", "Elephants", ""]
+    assert cascade_processor.cascaded_queries == 3
+    assert cascade_processor.escalated_queries == 1
+
+
+def test_duplicate_passages_are_read_once_and_cite_every_copy(text_processor):
+    documents = make_documents(3)
+    texts = {
+        "doc-0": "Rainforests can be found in Brazil and Peru.",
+        "doc-1": "Elephants are strong and skilled animals.",
+        "doc-2": "RAINFORESTS can be found in Brazil and Peru!",
+    }
+    text_processor.extract_passages = lambda docs: [
+        passages_of(texts[d["id"]]) for d in docs
+    ]
+    text_processor.reader.answer_tokenized.return_value = [
+        {"answer": "Brazil", "score": 0.9, "context_index": 0, "start": 28, "end": 34}
+    ]
+
+    results = text_processor.process_queries(
+        ["Which countries have rainforests?"], documents
+    )
+
+    assert text_processor.passages == [texts["doc-0"], texts["doc-1"]]
+    assert text_processor.reader.answer_tokenized.call_args[0][1] == [[0]]
+    assert results[0]["source_document"] == [documents[0], documents[2]]
+    assert results[0]["source"]["document_id"] == "doc-0"
+
+
+def test_readers_with_worker_processes_are_loaded_before_returning():
+    with patch("hudson_utils.text_processing.ShardedReader") as sharded_reader:
+        text_processor = TextProcessor(
+            drive_service=MagicMock(),
+            threshold=0.5,
+            reader_workers=2,
+            cascade_model="small-model",
+        )
+        text_processor.load_reader_in_background()
+
+        # Both pools are forked before the caller starts any Drive thread.
+        assert text_processor.reader_loader.loaded
+        assert text_processor.cascade_loader.loaded
+        assert sharded_reader.call_count == 2
+
+
+def test_close_stops_the_loaded_readers(cascade_processor):
+    reader = cascade_processor.reader
+
+    cascade_processor.close()
+
+    reader.close.assert_called_once_with()
+    assert not cascade_processor.cascade_loader.loaded
+
+
+def test_dedup_settings_change_the_answer_fingerprint():
+    fingerprints = set()
+    for dedup_threshold in (0.8, 0.9, None):
+        with patch("hudson_utils.text_processing.BatchedReader"):
+            text_processor = TextProcessor(
+                drive_service=MagicMock(),
+                threshold=0.5,
+                extraction_workers=1,
+                dedup_threshold=dedup_threshold,
+            )
+        text_processor.extract_passages = lambda docs: [
+            passages_of("text") for _ in docs
+        ]
+        text_processor.update_corpus(make_documents(1))
+        fingerprints.add(text_processor.corpus_fingerprint)
+
+    assert len(fingerprints) == 3
+
+
+def test_answers_cached_while_a_document_failed_are_not_reused(text_processor):
+    documents = [dict(document, version="1") for document in make_documents(2)]
+    text_processor.answer_cache = AnswerCache()
+    failing = {"doc-1"}
+    text_processor.extract_passages = lambda docs: [
+        [] if d["id"] in failing else passages_of(f"rainforests of {d['id']}")
+        for d in docs
+    ]
+    text_processor.reader.answer_tokenized.side_effect = lambda queries, *_: [
+        {"answer": "doc", "score": 0.9, "context_index": 0, "start": 0, "end": 3}
+        for _ in queries
+    ]
+
+    text_processor.update_corpus(documents)
+    text_processor.answer_queries(["Where are rainforests?"])
+    failing.clear()
+    text_processor.update_corpus(documents)
+    text_processor.answer_queries(["Where are rainforests?"])
+
+    assert text_processor.reader.answer_tokenized.call_count == 2
@@ -0,0 +1,37 @@
+import os
+
+WORDS = (
+    "the a an and are is in of to which what who where how much many has have "
+    "cerrado dry rainy season seasons brazil brazilian rainforests rainforest "
+    "countries peru colombia amazon elephants elephant strong skilled animals "
+    "spaniel man bookseller temperature average degrees rainwater medicines"
+).split()
+
+
+def build_tiny_qa_model(path, seed=0):
+    """
+    Save a randomly initialized, tiny BERT question-answering model and its
+    tokenizer to `path`, so reader code can run offline in tests.
+    """
+    import torch
+    from transformers import BertConfig, BertForQuestionAnswering, BertTokenizerFast
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += sorted(set(WORDS)) + list("abcdefghijklmnopqrstuvwxyz0123456789?.,'")
+    os.makedirs(path, exist_ok=True)
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w") as file:
+        file.write("\n".join(vocab))
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=512,
+    )
+    BertForQuestionAnswering(config).save_pretrained(path)
+    BertTokenizerFast(vocab_file).save_pretrained(path)
+    return path